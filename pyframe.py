@@ -3,14 +3,6 @@
 import signal
 import time
 
-from kivy.base import stopTouchApp
-from kivy.core.window import Window
-from kivy.logger import Logger
-
-from pyframe import App
-
-
-app = App()
 
 def handler(sig, frame):
     """Close application after SIGINT and SIGTERM signals."""
@@ -20,6 +12,16 @@ def handler(sig, frame):
 
 
 if __name__ == "__main__":
+    # Import kivy and create application only when run as main module. Worker
+    # processes of the index, which are spawned, import the main module as
+    # well and must neither open a window nor create an application.
+    from kivy.base import stopTouchApp
+    from kivy.core.window import Window
+    from kivy.logger import Logger
+
+    from pyframe import App
+
+    app = App()
     # Catch interrupt and term signals and exit gracefully.
     signal.signal(signal.SIGINT, handler)
     signal.signal(signal.SIGTERM, handler)
@@ -12,7 +12,7 @@ import traceback
 import yaml
 
 from importlib import import_module
-from repository import ConfigError, Index, Repository, UuidError, check_param, check_valid_required
+from repository import ConfigError, Index, IoError, OfflineGeocoder, Repository, UuidError, check_param, check_valid_required
 
 from kivy.base import ExceptionManager
 from kivy.core.window import Window
@@ -79,7 +79,7 @@ class App(kivy.app.App, Controller):
 
     # Required and valid configuration parameters
     CONF_REQ_KEYS = {'display_mode', 'display_state', 'display_timeout', 'enable_exception_handler', 'enable_mqtt', 'enable_logging', 'enable_scheduler', 'index', 'log_level', 'log_dir', 'repositories', 'slideshows', 'window_size'} | Slideshow.CONF_REQ_KEYS
-    CONF_VALID_KEYS = {'cache', 'index_update_at', 'index_update_interval', 'mqtt', 'schedule' } | CONF_REQ_KEYS | Slideshow.CONF_VALID_KEYS
+    CONF_VALID_KEYS = {'cache', 'geocoder', 'geocoder_fallback', 'geocoder_limit', 'index_batch_size', 'index_update_at', 'index_update_interval', 'index_workers', 'mqtt', 'schedule' } | CONF_REQ_KEYS | Slideshow.CONF_VALID_KEYS
 
     def __configure_logging(self):
         """Configure logging.
@@ -298,7 +298,10 @@ class App(kivy.app.App, Controller):
         'enable_logging': True,
         'enable_scheduler': True,
         'enable_mqtt': True,
+        'geocoder_fallback': True,
+        'geocoder_limit': 100,
         'index': "./index.sqlite",
+        'index_batch_size': 100,
         'index_update_interval': 0,
         'label_mode': "off",
         'label_content': "full",
@@ -313,6 +316,8 @@ class App(kivy.app.App, Controller):
         'smart_limit': 10,
         'smart_time': 24,
         'order': "name",
+        'weight_rating': 1,
+        'weight_recent': 1,
         'window_size': "full"
     }
 
@@ -339,7 +344,20 @@ class App(kivy.app.App, Controller):
         # Configure logging.
         self.__configure_logging()
         # Create/load index.
-        self._index = Index(self._config['index'])
+        check_param('index_workers', self._config, required=False, is_int=True, gr=0)
+        check_param('index_batch_size', self._config, is_int=True, gr=0)
+        # Load offline geocoder if configured.
+        check_param('geocoder', self._config, required=False, is_str=True)
+        check_param('geocoder_fallback', self._config, is_bool=True)
+        check_param('geocoder_limit', self._config, is_int=True, gr=0)
+        geocoder = None
+        if 'geocoder' in self._config:
+            try:
+                geocoder = OfflineGeocoder(self._config['geocoder'])
+            except IoError as e:
+                Logger.error(f"Configuration: Offline geocoder could not be loaded. {e}")
+        value = self._config['geocoder_fallback']
+        self._index = Index(self._config['index'], self._config.get('index_workers'), self._config['index_batch_size'], geocoder, value == "on" or value is True, self._config['geocoder_limit'])
         # Create background indexer.
         self._indexer = Indexer(self._index)
         # Create repositories.
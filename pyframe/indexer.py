@@ -74,6 +74,9 @@ class Indexer:
         self._rep_data = dict()
         self._thread = None
         self._index = index
+        # Flag indicating whether addresses of locations remain to be looked
+        # up. Initially set to look up locations of files indexed before.
+        self._geocode_pending = True
 
     def _build(self):
         """Build meta data index for queued repositories.
@@ -112,10 +115,17 @@ class Indexer:
                 # Build index for repository if due, but at least once.
                 if data.next < cur_time:
                     # Build meta data index for current repository.
+                    generation = self._index.generation
                     try:
                         self._index.build(rep)
                     except IoError as e:
                         logging.error(f"An I/O error occurred while indexing the repository: {e.exception}")
+                    # Look up locations of new files, which are not cached
+                    # yet, if the index content has changed or locations
+                    # remain from previous runs. The number of lookups per
+                    # run is limited.
+                    if self._geocode_pending or self._index.generation != generation:
+                        self._geocode_pending = self._index.geocode() > 0
                     # Log duration of indexing run.
                     end_time = time()
                     duration = (end_time - cur_time)
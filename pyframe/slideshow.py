@@ -192,8 +192,8 @@ class Slideshow(AnchorLayout):
         if self._iterator is not None:
             return self._iterator.length
         else:
-            # Create temporary iterator otherwise to determine length.
-            return self._index.iterator(**self._criteria).length
+            # Query number of files from index statistics otherwise.
+            return self._index.stats(**self._criteria)['count']
 
     @property
     def current_file(self):
@@ -15,5 +15,6 @@ License: t.b.d.
 
 from .common import ConfigError, UuidError, IoError, check_valid_required, check_param
 from .file import RepositoryFile
+from .geocoder import OfflineGeocoder
 from .repository import Repository, FileIterator
 from .index import SORT_DIR, SORT_ORDER, Index, MetaData
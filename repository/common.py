@@ -2,6 +2,8 @@
 
 import re
 
+from datetime import date
+
 
 class ConfigError(Exception):
     """Pyframe configuration error.
@@ -59,7 +61,7 @@ def check_valid_required(config, valid_keys, required_keys):
     if not required_keys.issubset(keys):
         raise ConfigError(f"As a minimum, the parameters {required_keys} are required, but the parameter(s) {required_keys.difference(keys)} has/have not been specified.")
 
-def check_param(name, value, recurse=False, required=True, is_int=False, is_bool=False, is_str=False, is_color=False, is_time=False, gr=None, ge=None, lo=None, le=None, options=None):
+def check_param(name, value, recurse=False, required=True, is_int=False, is_bool=False, is_str=False, is_color=False, is_time=False, is_date=False, gr=None, ge=None, lo=None, le=None, options=None):
     """Check validity of configuration parameter.
 
     Checks the validity of a configuration parameter based on specified
@@ -92,6 +94,8 @@ def check_param(name, value, recurse=False, required=True, is_int=False, is_bool
     :type is_color: bool
     :param is_time: True if value must be valid time definition
     :type is_time: bool
+    :param is_date: True if value must be valid date definition
+    :type is_date: bool
     :param gr: parameter value must be > gr
     :type gr: numeric
     :param ge: parameter value must be >= ge
@@ -120,7 +124,7 @@ def check_param(name, value, recurse=False, required=True, is_int=False, is_bool
     if isinstance(value, (list,set)):
         if recurse:
             for v in value:
-                check_param(name, v, False, required, is_int, is_bool, is_str, is_color, is_time, gr, ge, lo, le, options)
+                check_param(name, v, False, required, is_int, is_bool, is_str, is_color, is_time, is_date, gr, ge, lo, le, options)
         # Prevent all further tests.
         return
 
@@ -164,6 +168,16 @@ def check_param(name, value, recurse=False, required=True, is_int=False, is_bool
         # Prevent all further tests.
         return
 
+    # Ensure that value is a valid date or date string.
+    if is_date:
+        if not isinstance(value, date):
+            try:
+                date.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ConfigError(f"{prefix} Value must be valid date definition of type [YYYY-MM-DD].", config)
+        # Prevent all further tests.
+        return
+
     # Ensure that value is integer.
     if is_int and not isinstance(value, int):
         raise ConfigError(f"{prefix} Value must be integer.", config)
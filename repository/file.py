@@ -2,21 +2,26 @@
 
 import exifread
 import ffmpeg
-import fnmatch
-import locale
+import io
 import logging
+import math
+import mmap
+import multiprocessing
+import os
+import signal
 
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
 from datetime import datetime
-from geopy.geocoders import Photon
-from geopy.exc import GeopyError
 from iptcinfo3 import IPTCInfo
+from queue import Queue
+from threading import Lock, Thread
 
 from PIL import Image
 
+from . import jpeg, mp4
+from .common import IoError
 
-# Global geolocator instance for reverse location lookups.
-geolocator = Photon()
 
 class RepositoryFile:
     """File within a repository.
@@ -24,6 +29,12 @@ class RepositoryFile:
     Abstract base class providing basic functionality common to all File
     subclasses.
 
+    Instances are lightweight handles consisting of the repository, the UUID
+    and the type of the file. Metadata are kept in a separate record, which is
+    loaded on first access of a metadata property, i.e. looked up from the
+    index or extracted from the file content. Metadata properties may thus
+    raise a repository.IoError.
+
     Properties:
         uuid (str): Universally unique identifier (UUID) of the file. Typically
             the full path of the file within the repository.
@@ -67,61 +78,54 @@ class RepositoryFile:
     ORIENTATION_LANDSCAPE = 0
     ORIENTATION_PORTRAIT = 1
 
-    def __init__(self, uuid, rep, index=None, index_lookup=True):
+    # Flag indicating whether the repository supports partial reads of the
+    # file content. Sub-classes setting the flag implement the method
+    # _read_range(offset, size), which returns up to size bytes of the file
+    # content starting at offset.
+    PARTIAL_READS = False
+
+    # Attributes of the handle. Metadata are kept in a separate record.
+    __slots__ = ('_uuid', '_rep', '_index', '_type', '_index_lookup', '_extract', '_meta', '_loaded')
+
+    def __init__(self, uuid, rep, index=None, index_lookup=True, mdata=None, extract_metadata=True):
         """Initialize file instance.
 
+        Neither looks up nor extracts metadata. See _metadata().
+
         :param uuid: UUID of the file.
         :type uuid: str
         :param rep: Repository containing file
         :type rep: repository.Repository
         :param index: Optional file metadata index. Default is None.
+        :type index: repository.Index
         :param index_lookup: True if file metadata shall be looked up from index.
         :type index_lookup: bool
-        :type index: repository.Index
+        :param mdata: Optional metadata entry of the file, e.g. retrieved by an
+            index iterator. If specified, metadata are assigned from the entry
+            instead of being looked up from the index. Default is None.
+        :type mdata: repository.MetaData
+        :param extract_metadata: Flag indicating whether file metadata shall be
+            extracted from file if not available from index. Default is True.
+        :type extract_metadata: bool
         """
         # Basic initialization.
-        self._in_index = False
         self._uuid = uuid
         self._rep = rep
         self._index = index
-        self._type = RepositoryFile.TYPE_UNKNOWN
-        self._name = str()
-        self._width = 0
-        self._height = 0
-        self._rotation = 0
-        self._orientation = RepositoryFile.ORIENTATION_LANDSCAPE
-        self._creation_date = datetime.today()
-        self._last_modified = datetime.today()
-        self._last_updated = datetime.today()
-        self._description = str()
-        self._rating = None
-        self._coordinates = [ None, None, None ]
-        self._location = None
-        self._tags = list()
-
-        # Attempt to determine type from extension.
-        self._type_from_extension()
-
-        # Try to retrieve metadata from index if available.
-        mdata = None
-        if index is not None and index_lookup is True:
-            mdata = index.lookup(self, rep)
+        self._index_lookup = index_lookup
+        self._extract = extract_metadata
+        self._meta = None
+        self._loaded = False
 
+        # Assign metadata from provided entry. Attributes of the entry are
+        # copied, since the entry may expire once its session is committed.
         if mdata is not None:
             logging.debug(f"Assigning metadata of file '{self._uuid}' from index.")
-            self._in_index = True
             self._type = mdata.type
-            self._width = mdata.width
-            self._height = mdata.height
-            self._rotation = mdata.rotation
-            self._orientation = mdata.orientation
-            self._creation_date = mdata.creation_date
-            self._last_modified = mdata.last_modified
-            self._last_updated = mdata.last_updated
-            self._description = mdata.description
-            self._rating = mdata.rating
-            self._coordinates = [ mdata.latitude, mdata.longitude, mdata.altitude ]
-            self._tags = [tag.name for tag in mdata.tags]
+            self._meta = FileMetadata(mdata)
+        # Attempt to determine type from extension otherwise.
+        else:
+            self._type = _EXT_TYPES.get("." + uuid.rpartition(".")[2].lower(), RepositoryFile.TYPE_UNKNOWN)
 
     def __repr__(self):
         """Provide string representation of file instance.
@@ -135,148 +139,98 @@ class RepositoryFile:
     EXT_IMAGE = ("*.jpg", "*.jpeg", "*.png")
     EXT_VIDEO = ("*.mp4", "*.mv4", "*.mov")
 
-    def _extract_image_metadata(self, path):
-        """Extract image metadata from file content.
+    def _metadata(self):
+        """Return metadata record of the file.
 
-        Uses the exifread library to extract EXIF metadata and IPTCInfo3
-        library to extract IPTC metadata from the image file. Metadata is
-        stored in the corresponding object properties.
-
-        Note the star rating tag is not yet supported by exifread and therefore
-        always remains at the default.
-        """
-        # Save current datetime in property last_updated.
-        self._last_updated = datetime.today()
-
-        # Use PIL to determine image size.
-        with Image.open(path) as image:
-            self._width, self._height = image.size
-
-        # Open image file for reading (binary mode) and extract EXIF information.
-        with open(path, 'rb') as file:
-            tags = exifread.process_file(file)
-
-        # Obtain rotation from metadata if available
-        if 'Image Orientation' in tags:
-            orientation = tags['Image Orientation'].values[0]
-            if orientation == 8:
-                self._rotation = 90
-            elif orientation == 3:
-                self._rotation = 180
-            elif orientation == 6:
-                self._rotation = 270
-
-        # Derive orientation from dimensions and rotation.
-        if (self._width < self._height and (self.rotation == 0 or self.rotation == 180)) or (self._width > self._height and (self.rotation == 90 or self.rotation == 270)):
-            self._orientation = RepositoryFile.ORIENTATION_PORTRAIT
-        else:
-            self._orientation = RepositoryFile.ORIENTATION_LANDSCAPE
+        The record is loaded on first access. Metadata are assigned from the
+        entry provided on initialization or looked up from the index if
+        requested. Repository specific attributes are then loaded and the
+        metadata extracted from the file content if necessary (see
+        _load_metadata()).
 
-        # Etract image description if available.
-        if 'Image ImageDescription' in tags:
-            self._description = tags['Image ImageDescription'].values
+        :return: Metadata record.
+        :rtype: repository.file.FileMetadata
+        :raises: repository.IoError
+        """
+        if self._loaded:
+            return self._meta
+        # Try to retrieve metadata from index if available and not provided.
+        if self._meta is None:
+            mdata = None
+            if self._index is not None and self._index_lookup is True:
+                mdata = self._index.lookup(self, self._rep)
+            if mdata is not None:
+                logging.debug(f"Assigning metadata of file '{self._uuid}' from index.")
+                self._type = mdata.type
+            self._meta = FileMetadata(mdata)
+        # Mark record as loaded before loading repository specific attributes,
+        # which access the record via the properties.
+        self._loaded = True
+        try:
+            self._load_metadata()
+        except Exception:
+            self._loaded = False
+            raise
+        return self._meta
 
-        # Extract image rating if available.
-        if 'Image Rating' in tags:
-            self._rating = tags['Image Rating'].values[0]
+    def _load_metadata(self):
+        """Load repository specific metadata.
 
-        # Extract creation date if available.
-        try:
-            if 'EXIF DateTimeOriginal' in tags:
-                creation_date = tags['EXIF DateTimeOriginal'].values
-                self._creation_date = datetime.strptime(creation_date, "%Y:%m:%d %H:%M:%S")
-            elif 'Image DateTime' in tags:
-                creation_date = tags['Image DateTime'].values
-                self._creation_date = datetime.strptime(creation_date, "%Y:%m:%d %H:%M:%S")
-        except ValueError:
-            logging.error(f"Invalid creation time format '{creation_date}'.")
+        Called on first access of the metadata record. Implemented by
+        subclasses to determine file attributes and to extract metadata from
+        the file content if not available from the index.
 
-        # Extract latitude and longitude from GPS data.
-        if tags.keys() >= {'GPS GPSLatitude', 'GPS GPSLatitudeRef', 'GPS GPSLongitude', 'GPS GPSLongitudeRef'}:
-            try:
-                # Latitude
-                values = tags['GPS GPSLatitude'].values
-                latitude = float(values[0] + values[1]/60 + values[2]/3600)
-                if tags['GPS GPSLatitudeRef'].values[0] == "S": latitude = -latitude
-                self._coordinates[0] = latitude
-                # Longitude
-                values = tags['GPS GPSLongitude'].values
-                longitude = float(values[0] + values[1]/60 + values[2]/3600)
-                if tags['GPS GPSLongitudeRef'].values[0] == "W": longitude = -longitude
-                self._coordinates[1] = longitude
-            except Exception:
-                logging.error(f"Invalid format of GPS coodinates.")
-
-        # Extract altitude from GPS data.
-        if 'GPS GPSAltitude' in tags:
-            altitude = float(tags['GPS GPSAltitude'].values[0])
-            self._coordinates[2] = altitude
-
-        # Extract image tags(keywords) from IPTC tag if available
-        info = IPTCInfo(path, force=True, inp_charset="utf8")
-        self._tags = info["keywords"]
+        :raises: repository.IoError
+        """
+        pass
+
+    def _assign_metadata(self, data):
+        """Assign extracted metadata to the corresponding object properties.
+
+        :param data: Metadata as returned by extract_metadata(). Properties
+            not included in the dictionary retain their current value.
+        :type data: dict
+        """
+        meta = self._metadata()
+        for key, value in data.items():
+            setattr(meta, key, value)
+
+    def _extract_image_metadata(self, path):
+        """Extract image metadata from file content.
+
+        See extract_image_metadata() for details. Metadata is stored in the
+        corresponding object properties.
+        """
+        self._assign_metadata(extract_image_metadata(path))
 
     def _extract_video_metadata(self, path):
         """Extract video metadata from file content.
 
-        Uses the ffmpeg ffprobe command to extract video metadata from the
-        video file and stores metadata in corresponding object properties.
-        """
-        # Save current datetime in property last_updated.
-        self._last_updated = datetime.today()
-
-        # Obtain meta data of all streams (video and audio).
-        streams = ffmpeg.probe(path)['streams']
-        # Find first video stream and return corresponding meta data.
-        for data in streams:
-            if data.get('codec_type') == 'video': break
-
-        # Try to obtain image dimensions from metadata.
-        if data.get('width') is not None:
-            self._width = int(data.get('width'))
-        if data.get('height') is not None:
-            self._height = int(data.get('height'))
-
-        # Stop here if meta data does not contain any tags.
-        if data.get('tags') is None: return
-
-        # Try to obtain rotation from metadata.
-        rotate = data['tags'].get('rotate')
-        if rotate is not None:
-            if rotate == "0":
-                self._rotation = 0
-            elif rotate == "90":
-                self._rotation = 270
-            elif rotate == "180":
-                self._rotation == 180
-            elif rotate == "270":
-                self._rotation = 90
-
-        # Derive orientation from dimensions and rotation.
-        if (self._width < self._height and (self.rotation == 0 or self.rotation == 180)) or (self._width > self._height and (self.rotation == 90 or self.rotation == 270)):
-            self._orientation = RepositoryFile.ORIENTATION_PORTRAIT
-        else:
-            self._orientation = RepositoryFile.ORIENTATION_LANDSCAPE
+        See extract_video_metadata() for details. Metadata is stored in the
+        corresponding object properties.
+        """
+        self._assign_metadata(extract_video_metadata(path))
 
-        # Try to extract creation time from metadata.
-        creation_date = data['tags'].get('creation_time')
-        if creation_date is not None:
-            try:
-                self._creation_date = datetime.strptime(creation_date, "%Y-%m-%dT%H:%M:%S.%fZ")
-            except ValueError:
-                logging.error(f"Invalid creation time format {creation_date}.")
-
-    def _type_from_extension(self):
-        """Determine file type based on file extension."""
-        fname = self._uuid.upper()
-        for pattern in RepositoryFile.EXT_IMAGE:
-            if fnmatch.fnmatch(fname, pattern.upper()):
-                self._type = RepositoryFile.TYPE_IMAGE
-                return
-        for pattern in RepositoryFile.EXT_VIDEO:
-            if fnmatch.fnmatch(fname, pattern.upper()):
-                self._type = RepositoryFile.TYPE_VIDEO
-                return
+    def extract_partial_metadata(self):
+        """Extract metadata from partial reads of the file content.
+
+        Only supported by repositories, which set PARTIAL_READS, and by
+        file formats, which can be parsed from parts of the file content (see
+        extract_metadata_from_reader()). Allows to extract metadata of remote
+        files without downloading the complete file. Metadata are not assigned
+        to the file.
+
+        :return: Metadata as returned by extract_metadata(). None if partial
+            reads are not supported.
+        :rtype: dict
+        :raises: repository.IoError
+        """
+        if not self.PARTIAL_READS:
+            return None
+        reader = RangeReader(self._read_range)
+        data = extract_metadata_from_reader(reader, self.type)
+        logging.debug(f"Read {reader.transferred} bytes of file '{self.uuid}' to extract metadata.")
+        return data
 
     @abstractmethod
     def extract_metadata(self):
@@ -313,7 +267,7 @@ class RepositoryFile:
         :return: Name of the file.
         :rtype: str
         """
-        return self._name
+        return os.path.basename(self._uuid)
 
     @property
     def source(self):
@@ -343,7 +297,7 @@ class RepositoryFile:
         :return: Width of the file content in pixels.
         :rtype: int
         """
-        return self._width
+        return self._metadata().width
 
     @property
     def height(self):
@@ -352,7 +306,7 @@ class RepositoryFile:
         :return: Height of file content in pixels.
         :rtype: int
         """
-        return self._height
+        return self._metadata().height
 
     @property
     def rotation(self):
@@ -362,7 +316,7 @@ class RepositoryFile:
             values are 0, 90, 180 and 270.
         :rtype: int
         """
-        return self._rotation
+        return self._metadata().rotation
 
     @property
     def orientation(self):
@@ -374,7 +328,7 @@ class RepositoryFile:
             ORIENTATION_PORTRAIT: Content heigher than wide.
         :rtype: int
         """
-        return self._orientation
+        return self._metadata().orientation
 
     @property
     def creation_date(self):
@@ -384,7 +338,7 @@ class RepositoryFile:
             necessarily the creation date of the file.
         :rtype: DateTime
         """
-        return self._creation_date
+        return self._metadata().creation_date
 
     @property
     def last_modified(self):
@@ -393,7 +347,7 @@ class RepositoryFile:
         :return: Date of last file modification.
         :rtype: DateTime
         """
-        return self._last_modified
+        return self._metadata().last_modified
 
     @property
     def last_updated(self):
@@ -402,7 +356,7 @@ class RepositoryFile:
         :return: Date of last metadata update.
         :rtype: DateTime
         """
-        return self._last_updated
+        return self._metadata().last_updated
 
     @property
     def description(self):
@@ -411,7 +365,7 @@ class RepositoryFile:
         :return: Description of the file content.
         :rtype: str
         """
-        return self._description
+        return self._metadata().description
 
     @property
     def rating(self):
@@ -421,7 +375,7 @@ class RepositoryFile:
             from 1 to 5.
         :rtype: int
         """
-        return self._rating
+        return self._metadata().rating
 
     @property
     def coordinates(self):
@@ -430,7 +384,7 @@ class RepositoryFile:
         :return: [ latitude, longitude, height ]. Note that elements may be None if information is not available.
         :rtype: list of floats
         """
-        return self._coordinates
+        return self._metadata().coordinates
 
     @property
     def location(self):
@@ -439,32 +393,25 @@ class RepositoryFile:
         May return None if the geographical location is not available.
 
         The geographical location is not stored as part of the file meta data.
-        Since all free geocoding services implement a rate limit, reverse
-        location lookups would slow down the indexing process. The geographical
-        location is thus only looked up once requested.
+        Since all free geocoding services implement a rate limit, locations
+        are looked up in the background after indexing and cached in the
+        index (see repository.Index.geocode). This method only returns cached
+        locations and never accesses the geocoding service.
 
         :return: city/country
         :rtype: str
         """
+        meta = self._metadata()
         # Return cached value if avaialable.
-        if self._location is not None: return self._location
+        if meta.location is not None: return meta.location
         # Return None if no coordinates available.
-        if self._coordinates[0] is None or self._coordinates[1] is None:
+        if meta.coordinates[0] is None or meta.coordinates[1] is None:
             return None
 
-        # Try to obtain location from geocoding service otherwise.
-        try:
-            # Retrieve default language from locale.
-            lc = locale.getdefaultlocale()
-            if len(lc) >= 1 and len(lc[0]) >= 2:
-                lang = lc[0][0:2]
-            else:
-                lang = "en"
-            self._location = geolocator.reverse(self._coordinates[0:2], exactly_one=True, language=lang).address
-        except GeopyError as e:
-            logging.error(f"An error occurred while looking up the location. {e}")
-        finally:
-            return self._location
+        # Try to obtain cached location from index otherwise.
+        if self._index is not None:
+            meta.location = self._index.location(meta.coordinates[0], meta.coordinates[1])
+        return meta.location
 
     @property
     def tags(self):
@@ -473,4 +420,626 @@ class RepositoryFile:
         :return: Tags on the file.
         :rtype: set of str
         """
-        return self._tags
+        return self._metadata().tags
+
+
+# File types by extension of supported files
+_EXT_TYPES = {pattern[1:]: RepositoryFile.TYPE_IMAGE for pattern in RepositoryFile.EXT_IMAGE} | \
+    {pattern[1:]: RepositoryFile.TYPE_VIDEO for pattern in RepositoryFile.EXT_VIDEO}
+
+
+class FileMetadata:
+    """Metadata record of a repository file.
+
+    See repository.RepositoryFile for documentation of attributes. The flag
+    in_index indicates whether the metadata have been retrieved from the
+    index.
+    """
+
+    __slots__ = ('in_index', 'width', 'height', 'rotation', 'orientation', 'creation_date', 'last_modified',
+                 'last_updated', 'description', 'rating', 'coordinates', 'location', 'tags')
+
+    def __init__(self, mdata=None):
+        """Initialize metadata record.
+
+        :param mdata: Optional metadata entry of the index. Default values are
+            assigned if None.
+        :type mdata: repository.MetaData
+        """
+        self.location = None
+        if mdata is not None:
+            self.in_index = True
+            self.width = mdata.width
+            self.height = mdata.height
+            self.rotation = mdata.rotation
+            self.orientation = mdata.orientation
+            self.creation_date = mdata.creation_date
+            self.last_modified = mdata.last_modified
+            self.last_updated = mdata.last_updated
+            self.description = mdata.description
+            self.rating = mdata.rating
+            self.coordinates = [ mdata.latitude, mdata.longitude, mdata.altitude ]
+            self.tags = [tag.name for tag in mdata.tags]
+        else:
+            now = datetime.today()
+            self.in_index = False
+            self.width = 0
+            self.height = 0
+            self.rotation = 0
+            self.orientation = RepositoryFile.ORIENTATION_LANDSCAPE
+            self.creation_date = now
+            self.last_modified = now
+            self.last_updated = now
+            self.description = str()
+            self.rating = None
+            self.coordinates = [ None, None, None ]
+            self.tags = list()
+
+
+def _orientation(width, height, rotation):
+    """Derive orientation of content from dimensions and rotation.
+
+    :return: Orientation of the content. See repository.RepositoryFile for
+        acceptable values.
+    :rtype: int
+    """
+    if (width < height and (rotation == 0 or rotation == 180)) or (width > height and (rotation == 90 or rotation == 270)):
+        return RepositoryFile.ORIENTATION_PORTRAIT
+    else:
+        return RepositoryFile.ORIENTATION_LANDSCAPE
+
+
+def extract_image_metadata(path):
+    """Extract image metadata from file content.
+
+    JPEG files are memory-mapped and only the header segments are read once
+    (see extract_jpeg_metadata()). For all other images, PIL is used to
+    determine the image size, the exifread library to extract EXIF metadata
+    and the IPTCInfo3 library to extract IPTC metadata from the image file.
+
+    :param path: Path of the local image file.
+    :type path: str
+    :return: Metadata with keys named after the properties of class
+        repository.RepositoryFile. Only available metadata are included.
+    :rtype: dict
+    """
+    with open(path, 'rb') as file:
+        try:
+            content = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Empty files cannot be memory-mapped.
+        except ValueError:
+            content = None
+        if content is not None:
+            with content:
+                data = extract_jpeg_metadata(lambda offset, size: content[offset:offset+size])
+            if data is not None:
+                return data
+
+    # Use PIL to determine image size.
+    with Image.open(path) as image:
+        width, height = image.size
+
+    # Open image file for reading (binary mode) and extract EXIF information.
+    with open(path, 'rb') as file:
+        tags = exifread.process_file(file)
+
+    # Extract image tags(keywords) from IPTC tag if available
+    info = IPTCInfo(path, force=True, inp_charset="utf8")
+    return _image_metadata(width, height, tags, info["keywords"])
+
+
+def extract_jpeg_metadata(read):
+    """Extract image metadata from the header segments of a JPEG file.
+
+    Dimensions, EXIF and IPTC metadata are obtained from a single pass through
+    the header segments. EXIF metadata are parsed by the exifread library.
+
+    :param read: Callable read(offset, size), which returns up to size bytes
+        of the file content starting at offset. See repository.jpeg.
+    :type read: callable
+    :return: Metadata with keys named after the properties of class
+        repository.RepositoryFile. Only available metadata are included. None
+        if the file is not a JPEG file.
+    :rtype: dict
+    """
+    header = jpeg.read_header(read)
+    if header is None:
+        return None
+    tags = dict()
+    if header.exif is not None:
+        tags = exifread.process_file(io.BytesIO(header.exif), details=False)
+    return _image_metadata(header.width, header.height, tags, header.keywords or [])
+
+
+def _image_metadata(width, height, tags, keywords):
+    """Compile image metadata.
+
+    Note the star rating tag is not yet supported by exifread and therefore
+    always remains at the default.
+
+    :param width: Width of the image in pixels.
+    :type width: int
+    :param height: Height of the image in pixels.
+    :type height: int
+    :param tags: EXIF tags as returned by exifread.
+    :type tags: dict
+    :param keywords: IPTC keywords.
+    :type keywords: list of str
+    :return: Metadata with keys named after the properties of class
+        repository.RepositoryFile. Only available metadata are included.
+    :rtype: dict
+    """
+    # Save current datetime as date of last metadata update.
+    data = {'last_updated': datetime.today()}
+    data['width'], data['height'] = width, height
+
+    # Obtain rotation from metadata if available
+    rotation = 0
+    if 'Image Orientation' in tags:
+        orientation = tags['Image Orientation'].values[0]
+        if orientation == 8:
+            rotation = 90
+        elif orientation == 3:
+            rotation = 180
+        elif orientation == 6:
+            rotation = 270
+    data['rotation'] = rotation
+
+    # Derive orientation from dimensions and rotation.
+    data['orientation'] = _orientation(width, height, rotation)
+
+    # Etract image description if available.
+    if 'Image ImageDescription' in tags:
+        data['description'] = tags['Image ImageDescription'].values
+
+    # Extract image rating if available.
+    if 'Image Rating' in tags:
+        data['rating'] = tags['Image Rating'].values[0]
+
+    # Extract creation date if available.
+    try:
+        if 'EXIF DateTimeOriginal' in tags:
+            creation_date = tags['EXIF DateTimeOriginal'].values
+            data['creation_date'] = datetime.strptime(creation_date, "%Y:%m:%d %H:%M:%S")
+        elif 'Image DateTime' in tags:
+            creation_date = tags['Image DateTime'].values
+            data['creation_date'] = datetime.strptime(creation_date, "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        logging.error(f"Invalid creation time format '{creation_date}'.")
+
+    # Extract latitude and longitude from GPS data.
+    coordinates = [ None, None, None ]
+    if tags.keys() >= {'GPS GPSLatitude', 'GPS GPSLatitudeRef', 'GPS GPSLongitude', 'GPS GPSLongitudeRef'}:
+        try:
+            # Latitude
+            values = tags['GPS GPSLatitude'].values
+            latitude = float(values[0] + values[1]/60 + values[2]/3600)
+            if tags['GPS GPSLatitudeRef'].values[0] == "S": latitude = -latitude
+            coordinates[0] = latitude
+            # Longitude
+            values = tags['GPS GPSLongitude'].values
+            longitude = float(values[0] + values[1]/60 + values[2]/3600)
+            if tags['GPS GPSLongitudeRef'].values[0] == "W": longitude = -longitude
+            coordinates[1] = longitude
+        except Exception:
+            logging.error(f"Invalid format of GPS coodinates.")
+
+    # Extract altitude from GPS data.
+    if 'GPS GPSAltitude' in tags:
+        coordinates[2] = float(tags['GPS GPSAltitude'].values[0])
+    data['coordinates'] = coordinates
+
+    # Assign image tags (keywords) from IPTC data.
+    data['tags'] = keywords
+    return data
+
+
+def extract_video_metadata(path):
+    """Extract video metadata from file content.
+
+    MP4 and QuickTime files are memory-mapped and only the movie header is
+    read (see extract_mp4_metadata()). For all other containers, the ffmpeg
+    ffprobe command is used to extract video metadata from the video file.
+
+    :param path: Path of the local video file.
+    :type path: str
+    :return: Metadata with keys named after the properties of class
+        repository.RepositoryFile. Only available metadata are included.
+    :rtype: dict
+    """
+    with open(path, 'rb') as file:
+        try:
+            content = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Empty files cannot be memory-mapped.
+        except ValueError:
+            content = None
+        if content is not None:
+            with content:
+                data = extract_mp4_metadata(lambda offset, size: content[offset:offset+size])
+            if data is not None:
+                return data
+
+    # Save current datetime as date of last metadata update.
+    data = {'last_updated': datetime.today()}
+
+    # Obtain meta data of all streams (video and audio).
+    streams = ffmpeg.probe(path)['streams']
+    # Find first video stream and return corresponding meta data.
+    for stream in streams:
+        if stream.get('codec_type') == 'video': break
+
+    # Try to obtain image dimensions from metadata.
+    width, height = 0, 0
+    if stream.get('width') is not None:
+        width = data['width'] = int(stream.get('width'))
+    if stream.get('height') is not None:
+        height = data['height'] = int(stream.get('height'))
+
+    # Stop here if meta data does not contain any tags.
+    if stream.get('tags') is None: return data
+
+    # Try to obtain rotation from metadata.
+    rotation = 0
+    rotate = stream['tags'].get('rotate')
+    if rotate is not None:
+        if rotate == "0":
+            rotation = 0
+        elif rotate == "90":
+            rotation = 270
+        elif rotate == "180":
+            rotation = 180
+        elif rotate == "270":
+            rotation = 90
+        data['rotation'] = rotation
+
+    # Derive orientation from dimensions and rotation.
+    data['orientation'] = _orientation(width, height, rotation)
+
+    # Try to extract creation time from metadata.
+    creation_date = stream['tags'].get('creation_time')
+    if creation_date is not None:
+        try:
+            data['creation_date'] = datetime.strptime(creation_date, "%Y-%m-%dT%H:%M:%S.%fZ")
+        except ValueError:
+            logging.error(f"Invalid creation time format {creation_date}.")
+    return data
+
+
+def extract_mp4_metadata(read):
+    """Extract video metadata from the movie header of an MP4 or QuickTime file.
+
+    Dimensions, rotation and creation time are obtained from the movie and
+    track header boxes of the first video track without spawning ffprobe.
+
+    :param read: Callable read(offset, size), which returns up to size bytes
+        of the file content starting at offset. See repository.mp4.
+    :type read: callable
+    :return: Metadata with keys named after the properties of class
+        repository.RepositoryFile. Only available metadata are included. None
+        if the file is not an MP4 or QuickTime file.
+    :rtype: dict
+    """
+    header = mp4.read_header(read)
+    if header is None:
+        return None
+    # Save current datetime as date of last metadata update.
+    data = {'last_updated': datetime.today()}
+    data['width'], data['height'] = header.width, header.height
+
+    # Derive rotation from transformation matrix. The display rotation
+    # corresponds to the rotate tag reported by ffprobe.
+    a, b, _, _ = header.matrix
+    rotate = round(math.degrees(math.atan2(b, a))) % 360
+    rotation = (360 - rotate) % 360 if rotate in (0, 90, 180, 270) else 0
+    data['rotation'] = rotation
+
+    # Derive orientation from dimensions and rotation.
+    data['orientation'] = _orientation(header.width, header.height, rotation)
+
+    # Assign creation time if available.
+    if header.creation_time is not None:
+        data['creation_date'] = header.creation_time
+    return data
+
+
+class RangeReader:
+    """Read callable serving partial reads of a file from cached windows.
+
+    Reads are served from windows of the file content, which are fetched
+    using the provided fetch(offset, size) callable. The window at the start
+    of the file grows by doubling its size as long as reads continue beyond
+    its end. Reads elsewhere in the file are served from separate windows.
+    Parsers reading the file content sequentially thus only fetch a small
+    multiple of the bytes actually read.
+    """
+
+    # Initial size of windows in bytes
+    WINDOW_SIZE = 64 * 1024
+
+    def __init__(self, fetch):
+        """Initialize reader.
+
+        :param fetch: Callable fetch(offset, size), which returns up to size
+            bytes of the file content starting at offset. Returns fewer bytes
+            only at the end of the file.
+        :type fetch: callable
+        """
+        self._fetch = fetch
+        self._windows = list()
+        self._eof = None
+        self.transferred = 0
+
+    def _fetch_window(self, offset, size):
+        """Fetch window of the file content and record end of file."""
+        data = bytes(self._fetch(offset, size))
+        self.transferred = self.transferred + len(data)
+        if len(data) < size:
+            self._eof = offset + len(data)
+        return data
+
+    def __call__(self, offset, size):
+        """Read part of the file content.
+
+        :param offset: Offset of the first byte.
+        :type offset: int
+        :param size: Number of bytes.
+        :type size: int
+        :return: Up to size bytes. Fewer bytes only at the end of the file.
+        :rtype: bytes
+        """
+        end = offset + size if self._eof is None else min(offset + size, self._eof)
+        if offset >= end:
+            return b""
+        for i, (start, data) in enumerate(self._windows):
+            if start <= offset <= start + len(data):
+                if end > start + len(data):
+                    # Grow window by doubling its size or as required.
+                    grow = max(end - start, 2 * len(data)) - len(data)
+                    data = data + self._fetch_window(start + len(data), grow)
+                    self._windows[i] = (start, data)
+                return data[offset - start:end - start]
+        # Fetch new window otherwise.
+        data = self._fetch_window(offset, max(size, RangeReader.WINDOW_SIZE))
+        self._windows.append((offset, data))
+        return data[:size]
+
+
+def extract_metadata_from_reader(read, type):
+    """Extract metadata from partial reads of the file content.
+
+    :param read: Callable read(offset, size), which returns up to size bytes
+        of the file content starting at offset. Returns fewer bytes only at
+        the end of the file.
+    :type read: callable
+    :param type: Type of the file. See repository.RepositoryFile for
+        acceptable values.
+    :type type: int
+    :return: Metadata with keys named after the properties of class
+        repository.RepositoryFile. Only available metadata are included. None
+        if the file format cannot be parsed from partial reads.
+    :rtype: dict
+    """
+    if type == RepositoryFile.TYPE_IMAGE:
+        return extract_jpeg_metadata(read)
+    elif type == RepositoryFile.TYPE_VIDEO:
+        return extract_mp4_metadata(read)
+    else:
+        return None
+
+
+def extract_metadata(path, type):
+    """Extract metadata from file content.
+
+    Module-level function, which can be executed by worker processes, e.g. by
+    repository.Index to extract metadata of multiple files in parallel.
+
+    :param path: Path of the local file.
+    :type path: str
+    :param type: Type of the file. See repository.RepositoryFile for
+        acceptable values.
+    :type type: int
+    :return: Metadata with keys named after the properties of class
+        repository.RepositoryFile. Only available metadata are included.
+    :rtype: dict
+    """
+    if type == RepositoryFile.TYPE_IMAGE:
+        return extract_image_metadata(path)
+    elif type == RepositoryFile.TYPE_VIDEO:
+        return extract_video_metadata(path)
+    else:
+        return dict()
+
+
+def _pool_worker(conn):
+    """Serve metadata extraction requests of a worker pool.
+
+    Executed by the worker processes of repository.file.WorkerPool. Requests
+    (path, type) are received via the connection and answered with tuples
+    (True, metadata) or (False, error message). Returns once None or end of
+    file is received.
+
+    :param conn: Connection to the pool.
+    :type conn: multiprocessing.connection.Connection
+    """
+    # Start new process group, so that hanging ffprobe processes can be
+    # killed together with the worker.
+    os.setpgrp()
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        try:
+            conn.send((True, extract_metadata(*request)))
+        # Exceptions are not necessarily picklable and thus passed as message.
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class WorkerPool:
+    """Pool of long-lived worker processes extracting metadata from files.
+
+    Worker processes are started once and serve requests until the pool is
+    closed. Process startup and the import of the extraction libraries are
+    thus amortized over all files. Note that ffprobe, which is still used for
+    video containers other than MP4 and QuickTime, is started per request.
+
+    Worker processes are started by a fork server or spawned, since forking a
+    multi-threaded process may deadlock on locks held by other threads.
+    Requests are queued in a bounded queue, i.e. submit() blocks while all
+    workers are busy and the queue is full. Requests, which do not complete
+    within their timeout, fail and the respective worker process is replaced
+    including its child processes.
+    """
+
+    # Maximum number of queued requests per worker
+    QUEUE_SIZE = 2
+    # Default timeout per request in seconds
+    TIMEOUT = 60.0
+    # Preferred start method of worker processes. Falls back to "spawn" if
+    # not available on the platform.
+    START_METHOD = "forkserver"
+
+    def __init__(self, workers=None, timeout=TIMEOUT):
+        """Initialize worker pool and start worker processes.
+
+        :param workers: Number of worker processes. Default (None) is the
+            number of CPUs.
+        :type workers: int
+        :param timeout: Default timeout per request in seconds. Default is
+            TIMEOUT.
+        :type timeout: float
+        """
+        self._workers = workers if workers is not None else (os.cpu_count() or 1)
+        self._timeout = timeout
+        method = WorkerPool.START_METHOD if WorkerPool.START_METHOD in multiprocessing.get_all_start_methods() else "spawn"
+        self._context = multiprocessing.get_context(method)
+        # Preload extraction libraries once in the fork server.
+        if method == "forkserver":
+            self._context.set_forkserver_preload([__name__])
+        self._queue = Queue(maxsize=WorkerPool.QUEUE_SIZE*self._workers)
+        # Each worker process is served by a thread forwarding the requests.
+        self._threads = [Thread(name=f"extraction-{i}", target=self._serve, daemon=True) for i in range(self._workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _start(self):
+        """Start worker process.
+
+        :return: Worker process and connection to the process.
+        :rtype: tuple
+        """
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_pool_worker, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, conn
+
+    @staticmethod
+    def _kill(process, conn):
+        """Kill worker process including its child processes."""
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            process.kill()
+        process.join()
+        conn.close()
+
+    def _serve(self):
+        """Forward requests from the queue to a worker process.
+
+        Executed by the threads of the pool. Returns once None is received.
+        """
+        process, conn = self._start()
+        while True:
+            item = self._queue.get()
+            if item is None: break
+            path, type, timeout, future = item
+            if not future.set_running_or_notify_cancel(): continue
+            try:
+                conn.send((path, type))
+                if conn.poll(timeout):
+                    success, result = conn.recv()
+                else:
+                    success, result = False, f"Timeout after {timeout} seconds."
+                    WorkerPool._kill(process, conn)
+                    process, conn = self._start()
+            # Replace worker process if terminated unexpectedly.
+            except (EOFError, OSError) as e:
+                success, result = False, f"Worker process terminated. {e}"
+                WorkerPool._kill(process, conn)
+                process, conn = self._start()
+            if success:
+                future.set_result(result)
+            else:
+                future.set_exception(IoError(f"An error occurred while extracting metadata from file '{path}'. {result}", None))
+        # Stop worker process.
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+        process.join()
+        conn.close()
+
+    def submit(self, path, type, timeout=None):
+        """Submit request to extract metadata from a local file.
+
+        Blocks while the queue is full.
+
+        :param path: Path of the local file.
+        :type path: str
+        :param type: Type of the file. See repository.RepositoryFile for
+            acceptable values.
+        :type type: int
+        :param timeout: Timeout in seconds. Default (None) is the default
+            timeout of the pool.
+        :type timeout: float
+        :return: Future providing the metadata as returned by
+            extract_metadata(). Fails with repository.IoError.
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        self._queue.put((path, type, timeout if timeout is not None else self._timeout, future))
+        return future
+
+    def close(self):
+        """Stop worker processes once all queued requests are served."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    @property
+    def workers(self):
+        """Return number of worker processes.
+
+        :return: Number of worker processes.
+        :rtype: int
+        """
+        return self._workers
+
+
+# Worker pool shared by all users of worker_pool(). Created on first use.
+_worker_pool = None
+_worker_pool_lock = Lock()
+
+
+def worker_pool(workers=None):
+    """Return worker pool shared within the process.
+
+    The pool is created on first use and kept for the lifetime of the
+    process, e.g. across subsequent builds of repository.Index.
+
+    :param workers: Number of worker processes if the pool is created.
+        Default (None) is the number of CPUs.
+    :type workers: int
+    :return: Shared worker pool.
+    :rtype: repository.file.WorkerPool
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = WorkerPool(workers)
+        return _worker_pool
@@ -0,0 +1,219 @@
+"""Module providing reverse geocoding of geographical coordinates.
+
+Coordinates are resolved offline using a local place dataset in the format of
+the GeoNames cities dumps [1], e.g. "cities15000.txt". If available, the files
+"admin1CodesASCII.txt" and "countryInfo.txt" from the same directory are used
+to resolve region and country names. Otherwise, codes are used instead.
+
+The dataset is converted into a k-d tree once and saved next to the dataset.
+The k-d tree is memory-mapped, so that lookups neither require loading the
+complete dataset nor network access.
+
+The Photon geocoder [2] provided by the optional geopy package may be used as
+online fallback.
+
+References;
+----------
+1. https://download.geonames.org/export/dump/
+2. https://photon.komoot.io/
+"""
+
+import locale
+import logging
+import math
+import mmap
+import os
+import struct
+
+from array import array
+
+from .common import IoError
+
+# Global geolocator instance for online reverse location lookups. None if the
+# geopy package is not installed.
+try:
+    from geopy.exc import GeopyError
+    from geopy.geocoders import Photon
+    geolocator = Photon()
+except ImportError:
+    GeopyError = Exception
+    geolocator = None
+
+
+def default_language():
+    """Return language of the current locale.
+
+    :return: Two letter language code. "en" if the locale is not set.
+    :rtype: str
+    """
+    lc = locale.getdefaultlocale()
+    if len(lc) >= 1 and lc[0] is not None and len(lc[0]) >= 2:
+        return lc[0][0:2]
+    else:
+        return "en"
+
+
+class OfflineGeocoder:
+    """Offline reverse geocoder based on a local place dataset.
+
+    Places are stored as unit vectors in a k-d tree. The tree is laid out
+    implicitly, i.e. the median of each sub-range of places is the root of the
+    respective sub-tree. Nearest neighbours by chord distance are nearest
+    neighbours by great-circle distance as well.
+    """
+
+    # Magic number and version of the k-d tree file format
+    MAGIC = b"PFGEO001"
+    # Maximum distance in km to the nearest place. Coordinates further away
+    # are not resolved.
+    MAX_DISTANCE = 50.0
+    # Mean radius of the earth in km
+    EARTH_RADIUS = 6371.0
+
+    def __init__(self, path):
+        """Initialize offline geocoder.
+
+        Builds the k-d tree if it does not exist yet or is older than the
+        dataset.
+
+        :param path: Path of the place dataset.
+        :type path: str
+        :raises: repository.IoError
+        """
+        self._path = path
+        tree_path = path + ".kdtree"
+        try:
+            if not os.path.exists(tree_path) or os.path.getmtime(tree_path) < os.path.getmtime(path):
+                self._build(tree_path)
+            with open(tree_path, "rb") as file:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError as e:
+            raise IoError(f"An exception occurred while loading the place dataset '{path}'. {e}", e)
+        # Map coordinates, offsets and names of places without copying.
+        magic, self._size = struct.unpack_from("<8sQ", self._mmap)
+        if magic != OfflineGeocoder.MAGIC:
+            raise IoError(f"The k-d tree '{tree_path}' has an unknown format.", None)
+        start = struct.calcsize("<8sQ")
+        end = start + 24 * self._size
+        self._coords = memoryview(self._mmap)[start:end].cast('d')
+        start, end = end, end + 4 * (self._size + 1)
+        self._offsets = memoryview(self._mmap)[start:end].cast('I')
+        self._names = memoryview(self._mmap)[end:]
+
+    def _build(self, tree_path):
+        """Build k-d tree from place dataset and save it.
+
+        :param tree_path: Path of the k-d tree.
+        :type tree_path: str
+        :raises: OSError
+        """
+        logging.info(f"Building k-d tree for place dataset '{self._path}'.")
+        directory = os.path.dirname(self._path)
+        regions = self._load_names(os.path.join(directory, "admin1CodesASCII.txt"), 0, 1)
+        countries = self._load_names(os.path.join(directory, "countryInfo.txt"), 0, 4)
+        places = list()
+        with open(self._path, encoding="utf-8") as file:
+            for line in file:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 11: continue
+                name, lat, lon, country, region = fields[1], float(fields[4]), float(fields[5]), fields[8], fields[10]
+                address = f"{name}, {regions.get(f'{country}.{region}', region)}, {countries.get(country, country)}"
+                places.append((OfflineGeocoder._vector(lat, lon), address))
+
+        # Arrange places such that the median of each sub-range is the root of
+        # the respective sub-tree.
+        def arrange(lo, hi, depth):
+            if hi - lo <= 1: return
+            places[lo:hi] = sorted(places[lo:hi], key=lambda place: place[0][depth % 3])
+            mid = (lo + hi) // 2
+            arrange(lo, mid, depth + 1)
+            arrange(mid + 1, hi, depth + 1)
+        arrange(0, len(places), 0)
+
+        coords = array('d', (value for vector, _ in places for value in vector))
+        names = bytearray()
+        offsets = array('I', [0])
+        for _, address in places:
+            names.extend(address.encode("utf-8"))
+            offsets.append(len(names))
+        # Write to temporary file first to prevent use of incomplete trees.
+        with open(tree_path + ".tmp", "wb") as file:
+            file.write(struct.pack("<8sQ", OfflineGeocoder.MAGIC, len(places)))
+            file.write(coords.tobytes())
+            file.write(offsets.tobytes())
+            file.write(names)
+        os.replace(tree_path + ".tmp", tree_path)
+        logging.info(f"Built k-d tree with {len(places)} places.")
+
+    @staticmethod
+    def _load_names(path, key_column, name_column):
+        """Load names from tab separated GeoNames file if available.
+
+        :param path: Path of the file.
+        :type path: str
+        :param key_column: Column containing the key.
+        :type key_column: int
+        :param name_column: Column containing the name.
+        :type name_column: int
+        :return: Dictionary mapping keys to names. Empty if the file does not
+            exist.
+        :rtype: dict
+        """
+        names = dict()
+        if not os.path.exists(path): return names
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.startswith("#"): continue
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) > max(key_column, name_column):
+                    names[fields[key_column]] = fields[name_column]
+        return names
+
+    @staticmethod
+    def _vector(latitude, longitude):
+        """Convert geographical coordinates to unit vector."""
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+    def reverse(self, latitude, longitude):
+        """Return address of the nearest place.
+
+        :param latitude: Latitude in degrees.
+        :type latitude: float
+        :param longitude: Longitude in degrees.
+        :type longitude: float
+        :return: Address of type "place, region, country". None if there is no
+            place within MAX_DISTANCE.
+        :rtype: str
+        """
+        query = OfflineGeocoder._vector(latitude, longitude)
+        coords = self._coords
+        # Squared chord distance corresponding to the maximum distance.
+        chord = 2 * math.sin(OfflineGeocoder.MAX_DISTANCE / OfflineGeocoder.EARTH_RADIUS / 2)
+        best = [chord * chord, None]
+
+        def search(lo, hi, depth):
+            if lo >= hi: return
+            mid = (lo + hi) // 2
+            x, y, z = coords[3*mid], coords[3*mid + 1], coords[3*mid + 2]
+            distance = (x - query[0])**2 + (y - query[1])**2 + (z - query[2])**2
+            if distance <= best[0]:
+                best[0], best[1] = distance, mid
+            diff = query[depth % 3] - coords[3*mid + depth % 3]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            search(*near, depth + 1)
+            # Search the other side only if it may contain a nearer place.
+            if diff * diff <= best[0]:
+                search(*far, depth + 1)
+
+        search(0, self._size, 0)
+        if best[1] is None:
+            return None
+        return bytes(self._names[self._offsets[best[1]]:self._offsets[best[1] + 1]]).decode("utf-8")
+
+    def close(self):
+        """Release the memory-mapped k-d tree."""
+        self._coords.release()
+        self._offsets.release()
+        self._names.release()
+        self._mmap.close()
@@ -9,18 +9,28 @@ References;
 1. https://bytefish.de/blog/first_steps_with_sqlalchemy/
 """
 
+import hashlib
 import logging
+import math
+import os
 import random
 import time
 
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
 from enum import Enum
-from sqlalchemy import asc, create_engine, desc, event, func, update, delete, or_, Column, DateTime, Float, ForeignKey, Integer, String, Boolean
+from queue import Queue
+from threading import Lock, Thread
+from sqlalchemy import and_, asc, cast, column, create_engine, desc, event, exists, func, insert, select, table, tuple_, update, delete, or_, Column, DateTime, Float, ForeignKey, Integer, String, Boolean
 from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import backref, relationship, sessionmaker, scoped_session
+from sqlalchemy.orm import backref, joinedload, relationship, selectinload, sessionmaker, scoped_session
 
-from .common import UuidError, check_param, check_valid_required
-from .file import RepositoryFile
+from .common import ConfigError, UuidError, check_param, check_valid_required
+from .file import RepositoryFile, extract_metadata, worker_pool
+from .geocoder import GeopyError, default_language, geolocator
 from .repository import Repository
 
 
@@ -35,6 +45,33 @@ def set_sqlite_pragma(conn, *largs):
     cursor.execute("PRAGMA journal_mode=WAL")
     cursor.execute("PRAGMA foreign_keys=ON")
     cursor.close()
+    # Provide great-circle distance as SQL function.
+    conn.create_function("distance", 4, distance, deterministic=True)
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Return great-circle distance between two coordinates.
+
+    :param lat1: Latitude of first coordinate in degrees.
+    :type lat1: float
+    :param lon1: Longitude of first coordinate in degrees.
+    :type lon1: float
+    :param lat2: Latitude of second coordinate in degrees.
+    :type lat2: float
+    :param lon2: Longitude of second coordinate in degrees.
+    :type lon2: float
+    :return: Distance in km. None if any coordinate is None.
+    :rtype: float
+    """
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1)/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1)/2)**2
+    return 2 * EARTH_RADIUS * math.asin(min(1, math.sqrt(a)))
+
+
+# Mean radius of the earth in km
+EARTH_RADIUS = 6371.0
 
 """
 # Install listener to record time prior to execution of statements.
@@ -72,8 +109,18 @@ class MetaData(Base):
         orientation(Integer): Orientation of the content considering rotation.
             See repository.RepositoryFile for acceptable values.
         creation_date(DateTime): Creation date of the file content.
+        month_day(Integer): Month and day of the creation date encoded as
+            month * 100 + day. Used for "on this day" iterations.
+        week(Integer): ISO calendar week of the creation date. Used for "on
+            this day" iterations.
         last_modified(DateTime): Date of last file modification.
         last_updated(DateTime): Date of last metadata update.
+        size(Integer): Size of the file in bytes. Part of the file
+            fingerprint.
+        mtime_ns(Integer): Time of last file modification in nanoseconds.
+            Part of the file fingerprint.
+        inode(Integer): Inode number of the file. Not compared when
+            detecting modified files.
         description(String(255)): Description of the file.
         rating(Integer): Star rating of the file content.
         latitude(Float): Latitude of geographical coordinates
@@ -83,6 +130,10 @@ class MetaData(Base):
           starting points of smart order index iterations.
         verified(Boolean): Verification flag set during index building. True if
             file exists. False if not yet verified or does not exist.
+        deleted(DateTime): Date of deletion. Entries of files, which no longer
+            exist, are kept as tombstones for a limited time. Tombstones are
+            restored without extracting metadata if the file reappears with
+            the same fingerprint. None if the file exists.
     """
 
     __tablename__ = "files"
@@ -98,6 +149,8 @@ class MetaData(Base):
     rotation = Column(Integer)
     orientation = Column(Integer)
     creation_date = Column(DateTime, index=True)
+    month_day = Column(Integer)
+    week = Column(Integer)
     description = Column(String(255))
     rating = Column(Integer)
     latitude = Column(Float)
@@ -106,10 +159,25 @@ class MetaData(Base):
     random_number = Column(Float, index=True)
     last_modified = Column(DateTime)
     last_updated = Column(DateTime)
+    size = Column(Integer)
+    mtime_ns = Column(Integer)
+    inode = Column(Integer)
     verified = Column(Boolean)
+    deleted = Column(DateTime)
     tags = relationship("MetaDataTag", secondary="tag_file", backref=backref("files", lazy="dynamic"))
 
 
+# R*Tree side table of the files table indexing the geographical coordinates.
+# Created and kept in sync by triggers (see _migrate_rtree()). Not managed by
+# Base.metadata.
+files_rtree = table("files_rtree", column("id"), column("min_lat"), column("max_lat"), column("min_lon"), column("max_lon"))
+
+# FTS5 full text index of name, description and tags of files. Created and kept
+# in sync by triggers (see _migrate_fts()). Not managed by Base.metadata. The
+# hidden column named like the table is used for MATCH queries.
+files_fts = table("files_fts", column("rowid"), column("files_fts"), column("rank"))
+
+
 class MetaDataTag(Base):
     """Database model for tags in file metadata.
 
@@ -135,18 +203,361 @@ class Link(Base):
     file_id = Column(Integer, ForeignKey('files.id', ondelete="CASCADE"), primary_key=True)
 
 
+class Staging(Base):
+    """Database model for staged repository listings.
+
+    Used by Index.build() to reconcile the index with the content of a
+    repository using set-based queries. The listing of the repository is
+    bulk-loaded into the staging table and compared with existing metadata
+    entries. Entries are removed once the index has been built.
+
+    Properties:
+        rep_uuid(String(36)): Universally unique identifier of the repository
+            containing the file.
+        file_uuid(String(255)): Universally unique identifier of the file.
+        last_modified(DateTime): Date of last file modification.
+        size(Integer): Size of the file in bytes.
+        mtime_ns(Integer): Time of last file modification in nanoseconds.
+        inode(Integer): Inode number of the file.
+    """
+
+    __tablename__ = "staging"
+    rep_uuid = Column(String(Repository.MAX_LEN_UUID), primary_key=True)
+    file_uuid = Column(String(255), primary_key=True)
+    last_modified = Column(DateTime)
+    size = Column(Integer)
+    mtime_ns = Column(Integer)
+    inode = Column(Integer)
+
+
+class Location(Base):
+    """Database model for cached reverse geocoding results.
+
+    Addresses are cached per cell of a coordinate grid (see
+    Index.GEOCODE_GRID) and language.
+
+    Properties:
+        lat_cell(Integer): Latitude of the grid cell.
+        lon_cell(Integer): Longitude of the grid cell.
+        language(String(8)): Language of the address.
+        address(String(255)): Address of the grid cell. Empty if no address
+            is available.
+        last_updated(DateTime): Date of the lookup.
+    """
+
+    __tablename__ = "locations"
+    lat_cell = Column(Integer, primary_key=True)
+    lon_cell = Column(Integer, primary_key=True)
+    language = Column(String(8), primary_key=True)
+    address = Column(String(255))
+    last_updated = Column(DateTime)
+
+
+class Generation(Base):
+    """Database model for the generation of the index content.
+
+    Consists of a single row, which is incremented whenever changes to the
+    index content have been committed. Enables instances of Index in other
+    threads or processes to detect changes of the shared database.
+
+    Properties:
+        id(Integer): Identifier of the row. Always 0.
+        value(Integer): Generation of the index content.
+    """
+
+    __tablename__ = "generation"
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer)
+
+
+class ShuffleState(Base):
+    """Database model for the state of shuffled iterations.
+
+    Enables shuffled iterations to resume after a restart without repeating
+    files. The state is identified by a key derived from the filter criteria.
+
+    Properties:
+        key(String(40)): Hash of the normalized filter criteria.
+        seed(Integer): Seed of the current permutation.
+        size(Integer): Size of the id range covered by the current permutation.
+        cursor(Integer): Position within the current permutation from which
+            the iteration resumes.
+    """
+
+    __tablename__ = "shuffle"
+    key = Column(String(40), primary_key=True)
+    seed = Column(Integer)
+    size = Column(Integer)
+    cursor = Column(Integer)
+
+
+def _add_column(conn, table, column, type):
+    """Add column to existing database table unless already existing.
+
+    :param conn: Database connection.
+    :type conn: sqlalchemy.engine.Connection
+    :param table: Name of the table.
+    :type table: str
+    :param column: Name of the column.
+    :type column: str
+    :param type: SQL type of the column.
+    :type type: str
+    """
+    columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {type}")
+
+
+def _migrate_fingerprint(conn):
+    """Schema version 1: Add file fingerprint to files and staging table."""
+    for table in ("files", "staging"):
+        _add_column(conn, table, "size", "INTEGER")
+        _add_column(conn, table, "mtime_ns", "INTEGER")
+        _add_column(conn, table, "inode", "INTEGER")
+
+
+def _migrate_indexes(conn):
+    """Schema version 2: Add indexes tuned to the index queries.
+
+    - Files are looked up and reconciled by repository and file uuid, which
+      need to be unique.
+    - Index.build() resets and sweeps verification flags per repository.
+    - IndexIterator filters by type and orientation and sorts by creation date
+      or upper case name.
+    - Tags are matched by lower case name and joined to files by file id.
+    """
+    # Remove duplicate entries, which may have been left behind by earlier
+    # versions, prior to creating the unique index.
+    conn.exec_driver_sql("DELETE FROM files WHERE id NOT IN (SELECT MAX(id) FROM files GROUP BY rep_uuid, file_uuid)")
+    conn.exec_driver_sql("CREATE UNIQUE INDEX IF NOT EXISTS ix_files_rep_uuid_file_uuid ON files (rep_uuid, file_uuid)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_files_rep_uuid_verified ON files (rep_uuid, verified)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_files_type_orientation_creation_date ON files (type, orientation, creation_date)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_files_upper_name ON files (upper(name))")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tags_lower_name ON tags (lower(name))")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_tag_file_file_id ON tag_file (file_id, tag_id)")
+    # Update statistics used by the query planner.
+    conn.exec_driver_sql("ANALYZE")
+
+
+def _migrate_tombstones(conn):
+    """Schema version 3: Add deletion date for tombstones to files table."""
+    _add_column(conn, "files", "deleted", "DATETIME")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_files_rep_uuid_deleted ON files (rep_uuid, deleted)")
+
+
+def _migrate_calendar(conn):
+    """Schema version 4: Add month, day and calendar week to files table.
+
+    Values are derived from the creation date of existing entries. Indexes on
+    month and day or week with the creation date allow to select files from
+    the same day or week in previous years from the index only.
+    """
+    _add_column(conn, "files", "month_day", "INTEGER")
+    _add_column(conn, "files", "week", "INTEGER")
+    rows = conn.exec_driver_sql("SELECT id, creation_date FROM files WHERE creation_date IS NOT NULL AND month_day IS NULL").fetchall()
+    values = [calendar_keys(datetime.fromisoformat(creation_date)) + (id,) for id, creation_date in rows]
+    if len(values) > 0:
+        conn.exec_driver_sql("UPDATE files SET month_day = ?, week = ? WHERE id = ?", values)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_files_month_day_creation_date ON files (month_day, creation_date)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_files_week_creation_date ON files (week, creation_date)")
+
+
+def _migrate_filter_indexes(conn):
+    """Schema version 5: Add indexes for rating and dimension criteria."""
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_files_rating_creation_date ON files (rating, creation_date)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_files_width_height ON files (width, height)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_files_height_width ON files (height, width)")
+    # Update statistics used by the query planner.
+    conn.exec_driver_sql("ANALYZE")
+
+
+def _migrate_rtree(conn):
+    """Schema version 6: Add R*Tree side table for geographical coordinates.
+
+    The R*Tree table is kept in sync with the files table by triggers and
+    allows for bounding box queries in logarithmic time. Coordinates are
+    stored as degenerate boxes.
+    """
+    conn.exec_driver_sql("CREATE VIRTUAL TABLE IF NOT EXISTS files_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+    conn.exec_driver_sql("DELETE FROM files_rtree")
+    conn.exec_driver_sql("INSERT INTO files_rtree SELECT id, latitude, latitude, longitude, longitude FROM files WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
+    conn.exec_driver_sql("""CREATE TRIGGER IF NOT EXISTS files_rtree_insert AFTER INSERT ON files
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO files_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END""")
+    conn.exec_driver_sql("""CREATE TRIGGER IF NOT EXISTS files_rtree_update AFTER UPDATE OF latitude, longitude ON files BEGIN
+        DELETE FROM files_rtree WHERE id = old.id;
+        INSERT INTO files_rtree SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END""")
+    conn.exec_driver_sql("""CREATE TRIGGER IF NOT EXISTS files_rtree_delete AFTER DELETE ON files BEGIN
+        DELETE FROM files_rtree WHERE id = old.id;
+        END""")
+
+
+def _migrate_fts(conn):
+    """Schema version 7: Add FTS5 full text index of files.
+
+    The full text index covers name, description and tags of files. Tags are
+    stored as space separated list. The index is kept in sync with the files
+    and tag_file tables by triggers.
+    """
+    tags = "(SELECT group_concat(tags.name, ' ') FROM tag_file JOIN tags ON tags.id = tag_file.tag_id WHERE tag_file.file_id = {})"
+    conn.exec_driver_sql("CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(name, description, tags, tokenize='unicode61 remove_diacritics 2')")
+    conn.exec_driver_sql("DELETE FROM files_fts")
+    conn.exec_driver_sql(f"INSERT INTO files_fts (rowid, name, description, tags) SELECT id, name, description, {tags.format('files.id')} FROM files")
+    conn.exec_driver_sql("""CREATE TRIGGER IF NOT EXISTS files_fts_insert AFTER INSERT ON files BEGIN
+        INSERT INTO files_fts (rowid, name, description, tags) VALUES (new.id, new.name, new.description, NULL);
+        END""")
+    conn.exec_driver_sql("""CREATE TRIGGER IF NOT EXISTS files_fts_update AFTER UPDATE OF name, description ON files BEGIN
+        UPDATE files_fts SET name = new.name, description = new.description WHERE rowid = new.id;
+        END""")
+    conn.exec_driver_sql("""CREATE TRIGGER IF NOT EXISTS files_fts_delete AFTER DELETE ON files BEGIN
+        DELETE FROM files_fts WHERE rowid = old.id;
+        END""")
+    conn.exec_driver_sql(f"""CREATE TRIGGER IF NOT EXISTS tag_file_fts_insert AFTER INSERT ON tag_file BEGIN
+        UPDATE files_fts SET tags = {tags.format('new.file_id')} WHERE rowid = new.file_id;
+        END""")
+    conn.exec_driver_sql(f"""CREATE TRIGGER IF NOT EXISTS tag_file_fts_delete AFTER DELETE ON tag_file BEGIN
+        UPDATE files_fts SET tags = {tags.format('old.file_id')} WHERE rowid = old.file_id;
+        END""")
+
+
+def fts_query(text):
+    """Convert search text to FTS5 query.
+
+    Words are quoted to prevent interpretation of FTS5 query syntax and
+    matched as prefixes. All words need to match. Words without letters or
+    digits are ignored, since the tokenizer does not index punctuation.
+
+    :param text: Search text.
+    :type text: str
+    :return: FTS5 query. Empty if the text does not contain any words.
+    :rtype: str
+    """
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split() if any(c.isalnum() for c in word))
+
+
+def calendar_keys(date):
+    """Return month and day as well as calendar week of a date.
+
+    :param date: Date.
+    :type date: datetime.datetime or datetime.date
+    :return: Month and day encoded as month * 100 + day and ISO calendar week.
+        None for both values if date is None.
+    :rtype: tuple
+    """
+    if date is None:
+        return (None, None)
+    return (date.month * 100 + date.day, date.isocalendar()[1])
+
+
+def to_datetime(value):
+    """Convert date criterion to date and time.
+
+    :param value: Date, date and time or ISO format string.
+    :type value: datetime.date, datetime.datetime or str
+    :return: Date and time. Midnight if value does not specify a time.
+    :rtype: datetime.datetime
+    """
+    if isinstance(value, datetime):
+        return value
+    elif isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    else:
+        return datetime.fromisoformat(value)
+
+
+# Schema migrations of the index database in order of schema versions. See
+# Index._migrate(). Migrations must be idempotent and must not rely on the
+# current declaration of database models.
+MIGRATIONS = [
+    _migrate_fingerprint,
+    _migrate_indexes,
+    _migrate_tombstones,
+    _migrate_calendar,
+    _migrate_filter_indexes,
+    _migrate_rtree,
+    _migrate_fts
+]
+
+
 class SORT_DIR(str, Enum):
     """Enumeration of index sort directions."""
     ASC = "ascending"
     DESC = "descending"
 
 
+class ON_THIS_DAY(str, Enum):
+    """Enumeration of "on this day" periods."""
+    DAY = "day"
+    WEEK = "week"
+
+
 class SORT_ORDER(str, Enum):
     """Enumeration of index sort orders."""
     DATE = "date"
     NAME = "name"
     RANDOM = "random"
+    SHUFFLE = "shuffle"
     SMART = "smart"
+    WEIGHTED = "weighted"
+
+
+class Permutation:
+    """Pseudo-random permutation of the range 0..size-1.
+
+    The permutation is computed position by position using a balanced Feistel
+    network over the smallest even number of bits covering the range. Values
+    outside of the range are mapped into the range by cycle walking, i.e. by
+    applying the network repeatedly. No memory proportional to the size of the
+    range is required.
+    """
+
+    # Number of rounds of the Feistel network
+    ROUNDS = 4
+
+    def __init__(self, size, seed):
+        """Initialize permutation.
+
+        :param size: Size of the range.
+        :type size: int
+        :param seed: Seed from which the round keys are derived.
+        :type seed: int
+        """
+        self._size = size
+        bits = max(2, (size - 1).bit_length())
+        self._half = (bits + 1) // 2
+        self._mask = (1 << self._half) - 1
+        generator = random.Random(seed)
+        self._keys = [generator.getrandbits(32) for _ in range(Permutation.ROUNDS)]
+
+    def _encrypt(self, value):
+        """Apply Feistel network to a value."""
+        left, right = value >> self._half, value & self._mask
+        for key in self._keys:
+            # Integer hash of the right half as round function.
+            hash = ((right ^ key) * 0x45d9f3b) & 0xffffffff
+            hash = hash ^ (hash >> 16)
+            left, right = right, left ^ (hash & self._mask)
+        return (left << self._half) | right
+
+    def __getitem__(self, position):
+        """Return value at position of the permutation.
+
+        :param position: Position in the range 0..size-1.
+        :type position: int
+        :return: Value in the range 0..size-1.
+        :rtype: int
+        """
+        value = self._encrypt(position)
+        while value >= self._size:
+            value = self._encrypt(value)
+        return value
+
+    def __len__(self):
+        """Return size of the range."""
+        return self._size
 
 
 class Index:
@@ -162,15 +573,59 @@ class Index:
 
     # Required and valid index filter and sort criteria
     CRIT_REQ_KEYS = set()
-    CRIT_VALID_KEYS = {'direction', 'excluded_tags', 'most_recent', 'order', 'orientation', 'repositories', 'smart_limit', 'smart_time', 'tags', 'types'} | CRIT_REQ_KEYS
-
-    def __init__(self, dbname="index.sqlite"):
+    CRIT_VALID_KEYS = {'date_from', 'date_to', 'direction', 'excluded_tags', 'min_height', 'min_rating', 'min_width', 'most_recent', 'near', 'on_this_day', 'order', 'orientation', 'repositories', 'search', 'smart_distance', 'smart_limit', 'smart_time', 'tags', 'types', 'weight_rating', 'weight_recent'} | CRIT_REQ_KEYS
+    # Criteria, which only affect the order, but not the selection of files
+    CRIT_ORDER_KEYS = {'direction', 'order', 'smart_distance', 'smart_limit', 'smart_time', 'weight_rating', 'weight_recent'}
+
+    # Number of listing entries inserted into the staging table at once
+    STAGING_CHUNK_SIZE = 1000
+    # Number of days for which tombstones of deleted files are kept
+    TOMBSTONE_RETENTION = 30
+    # Maximum number of cached query results
+    CACHE_SIZE = 32
+    # Number of cells per degree of the coordinate grid used to cache reverse
+    # geocoding results
+    GEOCODE_GRID = 100
+    # Delay in seconds between subsequent requests to the geocoding service
+    GEOCODE_DELAY = 1.0
+    # Default maximum number of requests to the geocoding service per call of
+    # geocode()
+    GEOCODE_LIMIT = 100
+
+    def __init__(self, dbname="index.sqlite", workers=None, batch_size=100, geocoder=None, geocoder_fallback=True, geocoder_limit=GEOCODE_LIMIT):
         """Initialize file index.
 
         :param dbname: Name of database. Default is "index.sqlite".
         :type dbname: str
+        :param workers: Number of worker processes used to extract metadata
+            while building the index. Default (None) is the number of CPUs. A
+            value of 1 extracts metadata in the building thread.
+        :type workers: int
+        :param batch_size: Number of metadata entries written to the database
+            per transaction while building the index. Default is 100.
+        :type batch_size: int
+        :param geocoder: Optional offline geocoder used to resolve locations
+            of files. Default is None.
+        :type geocoder: repository.geocoder.OfflineGeocoder
+        :param geocoder_fallback: Flag indicating whether locations, which
+            cannot be resolved offline, shall be looked up from the online
+            geocoding service. Default is True.
+        :type geocoder_fallback: bool
+        :param geocoder_limit: Maximum number of requests to the online
+            geocoding service per call of geocode(). Default is GEOCODE_LIMIT.
+        :type geocoder_limit: int
         """
         self._dbname = dbname
+        self._geocoder = geocoder
+        self._geocoder_fallback = geocoder_fallback
+        self._geocoder_limit = geocoder_limit
+        self._workers = workers if workers is not None else (os.cpu_count() or 1)
+        self._batch_size = batch_size
+        # Last known generation of the index content and cache of query
+        # results, which are valid for a specific generation only.
+        self._generation = 0
+        self._cache = OrderedDict()
+        self._cache_lock = Lock()
         try:
             logging.info(f"Opening file index database '{dbname}'")
             # Determine whether we want verbose SQL debugging information.
@@ -181,6 +636,11 @@ class Index:
             self._engine = create_engine(f"sqlite:///{dbname}", echo=echo_flag)
             # Create base class metadata
             Base.metadata.create_all(self._engine)
+            # Upgrade schema of existing databases.
+            self._migrate()
+            # Create row holding the generation of the index content.
+            with self._engine.begin() as conn:
+                conn.execute(insert(Generation).prefix_with("OR IGNORE").values(id=0, value=0))
             # Open database session
             self._session_factory = sessionmaker(bind=self._engine)
             self._scoped_session = scoped_session(self._session_factory)
@@ -191,6 +651,24 @@ class Index:
     def __del__(self):
         self.close()
 
+    def _migrate(self):
+        """Upgrade schema of the index database to the latest version.
+
+        The schema version is stored in the user_version field of the SQLite
+        database header. All migrations newer than the current version are
+        applied in order. Migrations are also applied to new databases, since
+        they create indexes and other objects not covered by
+        Base.metadata.create_all().
+        """
+        with self._engine.begin() as conn:
+            version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+            if version > len(MIGRATIONS):
+                logging.warning(f"Index database '{self._dbname}' has unknown schema version {version}. The latest known version is {len(MIGRATIONS)}.")
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                logging.info(f"Upgrading index database '{self._dbname}' to schema version {number}.")
+                migration(conn)
+                conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+
     def build(self, rep, rebuild=False):
         """Build metadata index.
 
@@ -198,6 +676,10 @@ class Index:
         the background. The method thus creates its own session and prevents
         files from looking up metadata from the index.
 
+        The index is reconciled with the repository listing using set-based
+        queries on a staging table. Metadata are only extracted for files,
+        which have been added or modified since the last update.
+
         :param rep: Repository for which to build the index.
         :type rep: repository.Repository
         :param rebuild: Indicates whether index is to be completely rebuilt.
@@ -206,6 +688,8 @@ class Index:
         """
         # Create new session since build may be called from different thread.
         session = self._scoped_session()
+        # Flag indicating whether the content of the index has been modified.
+        modified = False
 
         # Delete all metadata for the specified repository.
         if rebuild:
@@ -215,13 +699,7 @@ class Index:
                 # Delete all file entries for the specified repository.
                 session.query(MetaData).filter(MetaData.rep_uuid == rep.uuid).delete()
                 session.commit()
-                # Delete all unused tags.
-                tags = session.query(MetaDataTag).all()
-                for tag in tags:
-                    if tag.files.count() == 0:
-                        logging.info(f"Deleting unused tag '{tag.name}'.")
-                        session.delete(tag)
-                session.commit()
+                self._increment_generation()
             except Exception as e:
                 logging.error(f"An error occurred while deleting metadata of repository {rep.uuid} from index: {e}")
         # Mark existing metadata entries for verification.
@@ -235,70 +713,265 @@ class Index:
             except Exception as e:
                 logging.error(f"An error occurred while marking metadata entries of repository '{rep.uuid}' for verification: {e}")
 
-        # Iterate through all files in the repository.
-        for file in rep.iterator(index_lookup=False, extract_metadata=False):
-            try:
-                # Create new metadata entry for file if not included in the
-                # index yet or outdated.
-                mdata = session.query(MetaData).filter(MetaData.rep_uuid == rep.uuid).filter(MetaData.file_uuid == file.uuid).first()
-                if mdata is None or mdata.last_updated < file.last_modified:
-                    # Extract metadata from file.
-                    file.extract_metadata()
-
-                    # Create all necessary tags in database.
-                    tags = list()
-                    if file.tags:
-                        for name in file.tags:
-                            # Try to query tag from database.
-                            tag = session.query(MetaDataTag).filter(MetaDataTag.name == name).first()
-                            # Create and add tag to database otherwise.
-                            if tag is None:
-                                logging.info(f"Adding tag '{name}'.")
-                                tag = MetaDataTag(name=name)
-                            tags.append(tag)
-
-                    # Create/update metadata entry with file metadata.
-                    if mdata is None:
-                        logging.info(f"Adding metadata of file '{file.uuid}' to index.")
-                    else:
-                        logging.info(f"Updating metadata of file '{file.uuid}' in index.")
-                    mdata = MetaData(rep_uuid=file.rep.uuid,
-                        file_uuid=file.uuid,
-                        name=file.name,
-                        type=file.type,
-                        width=file.width,
-                        height=file.height,
-                        rotation=file.rotation,
-                        orientation=file.orientation,
-                        creation_date=file.creation_date,
-                        last_modified=file.last_modified,
-                        last_updated=file.last_updated,
-                        description=file.description, rating=file.rating,
-                        latitude=file._coordinates[0],
-                        longitude=file._coordinates[1],
-                        altitude=file._coordinates[2],
-                        random_number=random.random(),
-                        verified=True,
-                        tags=tags)
-                    session.add(mdata)
-                    # Commit all changes to the database.
-                    session.commit()
-                else:
-                    logging.debug(f"Skipping file '{file.uuid} as already included in index.")
-                    # Mark entry as verified.
-                    query = update(MetaData).where(MetaData.rep_uuid == rep.uuid).where(MetaData.file_uuid == file.uuid).values(verified=True)
-                    session.execute(query)
-                    # Do not immediately commit update for performance reasons.
-#                    session.commit()
-            except Exception as e:
-                logging.error(f"An error occurred while building the metadata index: {e}")
-
-        # Delete entries which have not been successfulyy verified.
-        query = delete(MetaData).where(MetaData.verified == False)
+        # Bulk-load the repository listing into the staging table.
+        try:
+            logging.debug(f"Staging listing of repository '{rep.uuid}'.")
+            session.execute(delete(Staging).where(Staging.rep_uuid == rep.uuid))
+            rows = list()
+            for entry in rep.listing():
+                rows.append({'rep_uuid': rep.uuid, 'file_uuid': entry['uuid'], 'last_modified': entry['last_modified'], 'size': entry['size'], 'mtime_ns': entry.get('mtime_ns'), 'inode': entry.get('inode')})
+                if len(rows) >= Index.STAGING_CHUNK_SIZE:
+                    session.execute(insert(Staging), rows)
+                    rows = list()
+            if len(rows) > 0:
+                session.execute(insert(Staging), rows)
+            session.commit()
+        except Exception:
+            # Do not touch the index if the listing is incomplete. Otherwise,
+            # all files not listed would be removed from the index.
+            session.rollback()
+            session.close()
+            raise
+
+        # Mark all entries as verified, which are included in the listing and
+        # have not been modified since the last update. Files are considered
+        # unmodified if their fingerprints match. Inode numbers are not
+        # compared, since network file systems may assign new inode numbers
+        # after a remount. The last modification date is compared with the
+        # date of the last update if no fingerprint is available. Matching
+        # tombstones are restored.
+        try:
+            logging.debug(f"Verifying unchanged metadata entries of repository '{rep.uuid}'.")
+            fingerprint_match = and_(Staging.mtime_ns != None, MetaData.mtime_ns != None,
+                Staging.mtime_ns == MetaData.mtime_ns, Staging.size == MetaData.size)
+            date_match = and_(or_(Staging.mtime_ns == None, MetaData.mtime_ns == None),
+                Staging.last_modified <= MetaData.last_updated)
+            unchanged = exists().where(Staging.rep_uuid == MetaData.rep_uuid).where(Staging.file_uuid == MetaData.file_uuid).where(or_(fingerprint_match, date_match))
+            query = update(MetaData).where(MetaData.rep_uuid == rep.uuid).where(MetaData.deleted == None).where(unchanged).values(verified=True)
+            session.execute(query)
+            query = update(MetaData).where(MetaData.rep_uuid == rep.uuid).where(MetaData.deleted != None).where(unchanged).values(verified=True, deleted=None)
+            result = session.execute(query)
+            if result.rowcount > 0:
+                logging.info(f"Restored metadata of {result.rowcount} file(s) in repository '{rep.uuid}'.")
+                modified = True
+            # Complete missing fingerprints of unchanged entries, e.g. entries
+            # created prior to the introduction of fingerprints.
+            staged = session.query(Staging).filter(Staging.rep_uuid == MetaData.rep_uuid).filter(Staging.file_uuid == MetaData.file_uuid)
+            query = update(MetaData).where(MetaData.rep_uuid == rep.uuid).where(MetaData.verified == True).where(MetaData.mtime_ns == None) \
+                .where(staged.exists().where(Staging.mtime_ns != None)) \
+                .values(size=staged.with_entities(Staging.size).scalar_subquery(),
+                    mtime_ns=staged.with_entities(Staging.mtime_ns).scalar_subquery(),
+                    inode=staged.with_entities(Staging.inode).scalar_subquery())
+            session.execute(query)
+            session.commit()
+        except Exception as e:
+            logging.error(f"An error occurred while verifying metadata entries of repository '{rep.uuid}': {e}")
+
+        # Determine files, which are not included in the index yet or whose
+        # metadata entries are outdated, i.e. could not be verified.
+        changed = session.query(Staging.file_uuid, Staging.size, Staging.mtime_ns, Staging.inode, MetaData.id) \
+            .outerjoin(MetaData, and_(MetaData.rep_uuid == Staging.rep_uuid, MetaData.file_uuid == Staging.file_uuid)) \
+            .filter(Staging.rep_uuid == rep.uuid) \
+            .filter(or_(MetaData.id == None, MetaData.verified == False)) \
+            .all()
+        # End read transaction, since metadata are written by a separate thread.
+        session.commit()
+        logging.info(f"{len(changed)} file(s) of repository '{rep.uuid}' need to be added or updated.")
+
+        # Extract metadata of added and modified files only. Metadata are
+        # extracted by a pool of worker processes and written to the database
+        # in batches by a separate writer thread.
+        if len(changed) > 0:
+            self._extract(rep, changed)
+
+        # Turn entries of the repository, which have not been successfully
+        # verified, into tombstones and purge expired tombstones.
+        now = datetime.today()
+        query = update(MetaData).where(MetaData.rep_uuid == rep.uuid).where(MetaData.verified == False).where(MetaData.deleted == None).values(deleted=now)
+        result = session.execute(query)
+        if result.rowcount > 0:
+            logging.info(f"Marked metadata of {result.rowcount} file(s) in repository '{rep.uuid}' as deleted.")
+            modified = True
+        query = delete(MetaData).where(MetaData.rep_uuid == rep.uuid).where(MetaData.deleted < now - timedelta(days=Index.TOMBSTONE_RETENTION))
         session.execute(query)
+        # Clear the staging table.
+        session.execute(delete(Staging).where(Staging.rep_uuid == rep.uuid))
+        # Delete tags, which are no longer in use.
+        self._delete_unused_tags(session)
         # Commit pending changes and close session
         session.commit()
         session.close()
+        if modified:
+            self._increment_generation()
+
+    def _delete_unused_tags(self, session):
+        """Delete unused tags and dangling links between files and tags.
+
+        Each runs as a single set-based statement. Dangling links are normally
+        deleted by cascade, but may remain if foreign key constraints were
+        not enforced.
+
+        :param session: Database session.
+        :type session: sqlalchemy.orm.Session
+        """
+        try:
+            query = delete(Link).where(~exists().where(MetaData.id == Link.file_id))
+            session.execute(query)
+            query = delete(MetaDataTag).where(~exists().where(Link.tag_id == MetaDataTag.id))
+            result = session.execute(query)
+            if result.rowcount > 0:
+                logging.info(f"Deleted {result.rowcount} unused tag(s).")
+        except Exception as e:
+            session.rollback()
+            logging.error(f"An error occurred while deleting unused tags from index: {e}")
+
+    def _extract(self, rep, changed):
+        """Extract metadata of files and write them to the index.
+
+        Files are created and, if necessary, downloaded in the calling thread.
+        Metadata are extracted by the shared pool of worker processes (see
+        repository.file.worker_pool()) and passed on to a writer thread, which
+        inserts them into the database in batches.
+        Metadata of remote files, which support partial reads, are extracted
+        in the calling thread without downloading the files.
+
+        :param rep: Repository containing the files.
+        :type rep: repository.Repository
+        :param changed: List of staged entries with the file uuid, the
+            fingerprint and the id of the outdated metadata entry to be
+            replaced. The id is None for files not included in the index yet.
+        :type changed: list of sqlalchemy.engine.Row
+        """
+        # Start writer thread.
+        queue = Queue(maxsize=2*self._batch_size)
+        writer = Thread(name="index-writer", target=self._write, args=(queue,), daemon=True)
+        writer.start()
+
+        # Use pool of worker processes if more than one worker requested. The
+        # pool is kept across builds.
+        pool = None
+        if self._workers > 1 and len(changed) > 1:
+            pool = worker_pool(self._workers)
+
+        def complete(file, entry, future):
+            """Assign extracted metadata to file and queue file for writing."""
+            try:
+                file._assign_metadata(future.result())
+                queue.put((file, entry))
+            except Exception as e:
+                logging.error(f"An error occurred while extracting metadata of file '{file.uuid}': {e}")
+
+        try:
+            pending = deque()
+            for entry in changed:
+                try:
+                    # Create file and obtain path of (local copy of) file.
+                    file = rep.file_by_uuid(entry.file_uuid, index_lookup=False, extract_metadata=False)
+                    logging.debug(f"Extracting metadata of file '{file.uuid}' from file content.")
+                    data = file.extract_partial_metadata()
+                    if data is not None:
+                        future = Future()
+                        future.set_result(data)
+                    elif pool is not None:
+                        future = pool.submit(file.source, file.type)
+                    else:
+                        future = Future()
+                        future.set_result(extract_metadata(file.source, file.type))
+                    pending.append((file, entry, future))
+                except Exception as e:
+                    logging.error(f"An error occurred while building the metadata index: {e}")
+                # Limit the number of pending files, which keep local copies
+                # of remote files.
+                while len(pending) > 2*self._workers or (len(pending) > 0 and pending[0][2].done()):
+                    complete(*pending.popleft())
+            while len(pending) > 0:
+                complete(*pending.popleft())
+        finally:
+            # Signal end of queue to writer thread and wait for completion.
+            queue.put(None)
+            writer.join()
+
+    def _write(self, queue):
+        """Write metadata of files in the queue to the index.
+
+        Executed by the writer thread. Metadata are inserted in transactions
+        of up to batch_size entries. Returns once None is received.
+
+        :param queue: Queue of (file, staged entry) tuples. See _extract().
+        :type queue: queue.Queue
+        """
+        # Create new session since executed in separate thread.
+        session = self._scoped_session()
+        batch = list()
+        while True:
+            item = queue.get()
+            if item is not None:
+                batch.append(item)
+            if len(batch) > 0 and (item is None or len(batch) >= self._batch_size):
+                try:
+                    self._write_batch(session, batch)
+                except Exception as e:
+                    session.rollback()
+                    logging.error(f"An error occurred while writing metadata to the index: {e}")
+                batch = list()
+            if item is None: break
+        session.close()
+        self._scoped_session.remove()
+
+    def _write_batch(self, session, batch):
+        """Write metadata of a batch of files to the index in one transaction.
+
+        :param session: Database session.
+        :type session: sqlalchemy.orm.Session
+        :param batch: List of (file, staged entry) tuples. See _extract().
+        :type batch: list of tuple
+        """
+        # Delete outdated metadata entries.
+        ids = [entry.id for _, entry in batch if entry.id is not None]
+        if len(ids) > 0:
+            session.execute(delete(MetaData).where(MetaData.id.in_(ids)))
+
+        # Query existing tags and create missing tags in database.
+        names = {name for file, _ in batch if file.tags for name in file.tags}
+        tags = {tag.name: tag for tag in session.query(MetaDataTag).filter(MetaDataTag.name.in_(names))}
+        for name in names - tags.keys():
+            logging.info(f"Adding tag '{name}'.")
+            tags[name] = MetaDataTag(name=name)
+
+        # Create metadata entries with file metadata.
+        for file, entry in batch:
+            if entry.id is None:
+                logging.info(f"Adding metadata of file '{file.uuid}' to index.")
+            else:
+                logging.info(f"Updating metadata of file '{file.uuid}' in index.")
+            month_day, week = calendar_keys(file.creation_date)
+            mdata = MetaData(rep_uuid=file.rep.uuid,
+                file_uuid=file.uuid,
+                name=file.name,
+                type=file.type,
+                width=file.width,
+                height=file.height,
+                rotation=file.rotation,
+                orientation=file.orientation,
+                creation_date=file.creation_date,
+                month_day=month_day,
+                week=week,
+                last_modified=file.last_modified,
+                last_updated=file.last_updated,
+                size=entry.size,
+                mtime_ns=entry.mtime_ns,
+                inode=entry.inode,
+                description=file.description, rating=file.rating,
+                latitude=file.coordinates[0],
+                longitude=file.coordinates[1],
+                altitude=file.coordinates[2],
+                random_number=random.random(),
+                verified=True,
+                tags=[tags[name] for name in dict.fromkeys(file.tags or [])])
+            session.add(mdata)
+        # Commit all changes to the database.
+        session.commit()
+        self._increment_generation()
 
     def close(self):
         try:
@@ -325,73 +998,291 @@ class Index:
         :return type: repository.MetaData
         """
         try:
-            mdata = self._session.query(MetaData).filter(MetaData.rep_uuid == rep.uuid).filter(MetaData.file_uuid == file.uuid).first()
+            mdata = self._session.query(MetaData).filter(MetaData.rep_uuid == rep.uuid).filter(MetaData.file_uuid == file.uuid).filter(MetaData.deleted == None).first()
             return mdata
         except Exception as e:
             logging.error(f"An error ocurred while looking up metadata from index for file '{file.uuid}' in repository '{rep.uuid}': {e}")
             return None
 
+    def location(self, latitude, longitude, language=None):
+        """Return address of geographical coordinates.
+
+        Returns the address cached from the online geocoding service if
+        available and resolves the address using the offline geocoder
+        otherwise. Never accesses the online geocoding service. Addresses are
+        cached in the background by geocode().
+
+        :param latitude: Latitude in degrees.
+        :type latitude: float
+        :param longitude: Longitude in degrees.
+        :type longitude: float
+        :param language: Optional language of the address. Default is the
+            language of the current locale.
+        :type language: str
+        :return: Address if available. None otherwise.
+        :rtype: str
+        """
+        language = language or default_language()
+        lat_cell, lon_cell = Index.grid_cell(latitude, longitude)
+        try:
+            result = self._session.query(Location.address).filter(Location.lat_cell == lat_cell) \
+                .filter(Location.lon_cell == lon_cell).filter(Location.language == language).first()
+        except Exception as e:
+            logging.error(f"An error ocurred while looking up the location of coordinates ({latitude}, {longitude}): {e}")
+            result = None
+        if result is not None and result.address:
+            return result.address
+        if self._geocoder is not None:
+            return self._geocoder.reverse(latitude, longitude)
+        return None
+
+    def geocode(self, language=None, limit=None):
+        """Cache addresses of grid cells containing files.
+
+        Looks up addresses of grid cells, which are not cached yet, from the
+        online geocoding service. Cells resolved by the offline geocoder are
+        skipped. Does nothing if the fallback to the online geocoding service
+        is disabled or the geopy package is not installed. Subsequent requests
+        are delayed by GEOCODE_DELAY seconds to respect the rate limit of the
+        service. Stops after limit requests or at the first error, e.g. if the
+        service is not reachable. Remaining cells are looked up during the next
+        call.
+
+        Method may be called from a different thread, e.g. after building the
+        index in the background.
+
+        :param language: Optional language of the addresses. Default is the
+            language of the current locale.
+        :type language: str
+        :param limit: Optional maximum number of requests. Default is the
+            limit specified on initialization.
+        :type limit: int
+        :return: Number of grid cells remaining to be looked up.
+        :rtype: int
+        """
+        if not self._geocoder_fallback or geolocator is None: return 0
+        language = language or default_language()
+        limit = limit if limit is not None else self._geocoder_limit
+        session = self._scoped_session()
+        try:
+            # Determine grid cells of files without cached address.
+            lat_cell = cast((MetaData.latitude + 90) * Index.GEOCODE_GRID, Integer)
+            lon_cell = cast((MetaData.longitude + 180) * Index.GEOCODE_GRID, Integer)
+            cached = exists().where(Location.lat_cell == lat_cell).where(Location.lon_cell == lon_cell).where(Location.language == language)
+            cells = session.query(lat_cell, lon_cell).filter(MetaData.deleted == None) \
+                .filter(MetaData.latitude != None).filter(MetaData.longitude != None).filter(~cached).distinct().all()
+            if len(cells) > 0:
+                logging.info(f"Looking up addresses of {len(cells)} location(s).")
+            requests, pending, failed = 0, 0, False
+            for lat_cell, lon_cell in cells:
+                # Look up address of the center of the grid cell.
+                coordinates = ((lat_cell + 0.5) / Index.GEOCODE_GRID - 90, (lon_cell + 0.5) / Index.GEOCODE_GRID - 180)
+                if self._geocoder is not None and self._geocoder.reverse(*coordinates) is not None:
+                    continue
+                # Count cells remaining for the next call.
+                if failed or requests >= limit:
+                    pending = pending + 1
+                    continue
+                if requests > 0: time.sleep(Index.GEOCODE_DELAY)
+                requests = requests + 1
+                try:
+                    result = geolocator.reverse(coordinates, exactly_one=True, language=language)
+                except GeopyError as e:
+                    logging.error(f"An error occurred while looking up the location. {e}")
+                    failed, pending = True, pending + 1
+                    continue
+                session.merge(Location(lat_cell=lat_cell, lon_cell=lon_cell, language=language,
+                    address=result.address if result is not None else "", last_updated=datetime.now()))
+                session.commit()
+            if pending > 0:
+                logging.info(f"Addresses of {pending} location(s) remain to be looked up.")
+            return pending
+        finally:
+            session.close()
+
+    @staticmethod
+    def grid_cell(latitude, longitude):
+        """Return grid cell of geographical coordinates.
+
+        Coordinates are offset to positive values and truncated consistent
+        with the conversion of floating point values to integers by SQLite.
+
+        :param latitude: Latitude in degrees.
+        :type latitude: float
+        :param longitude: Longitude in degrees.
+        :type longitude: float
+        :return: Latitude and longitude of the grid cell.
+        :rtype: tuple of int
+        """
+        return (int((latitude + 90) * Index.GEOCODE_GRID), int((longitude + 180) * Index.GEOCODE_GRID))
+
     def count(self):
-        """Count the number of rows in the index.
+        """Count the number of files in the index (excluding tombstones).
 
-        :return: Number of rows in the index.
+        :return: Number of files in the index.
         :return type: int
         """
-        return self._session.query(MetaData).count()
+        return self._session.query(MetaData).filter(MetaData.deleted == None).count()
 
-    def iterator(self, **criteria):
-        """Return selective iterator.
+    def _increment_generation(self):
+        """Increment the generation of the index content.
 
-        Return selective iterator which allows to traverse through a
-        sub-population of files in the index according to specified criteria.
+        Needs to be called whenever changes to the index content have been
+        committed. The generation is stored in the database and thus shared
+        with other instances using the same database. Invalidates all cached
+        query results. Changes written to the database without using Index are
+        not detected.
+        """
+        with self._engine.begin() as conn:
+            conn.execute(update(Generation).where(Generation.id == 0).values(value=Generation.value + 1))
+        self._current_generation()
 
-        :param criteria: Selection criteria
+    def _current_generation(self):
+        """Return the generation of the index content stored in the database.
+
+        Cached query results are discarded if the generation has been
+        incremented since the last call, e.g. by another instance of Index in
+        a different process.
+
+        :return: Generation of the index content.
+        :rtype: int
+        """
+        with self._engine.connect() as conn:
+            generation = conn.execute(select(Generation.value).where(Generation.id == 0)).scalar() or 0
+        with self._cache_lock:
+            if generation != self._generation:
+                self._generation = generation
+                self._cache.clear()
+        return generation
+
+    def _cached(self, key, function):
+        """Return cached query result or execute and cache query.
+
+        Results are cached for the current generation of the index content. The
+        least recently used results are discarded once CACHE_SIZE results have
+        been cached.
+
+        :param key: Key of the query result. Typically derived from criteria
+            using criteria_key().
+        :type key: tuple
+        :param function: Function, which executes the query and returns the
+            result.
+        :type function: callable
+        :return: Query result.
+        """
+        generation = self._current_generation()
+        with self._cache_lock:
+            if generation == self._generation and key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = function()
+        with self._cache_lock:
+            # Do not cache results, which may be outdated already.
+            if generation == self._generation:
+                self._cache[key] = result
+                if len(self._cache) > Index.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def criteria_key(criteria, kind):
+        """Return normalized key for criteria.
+
+        Criteria which do not affect the selection of files (see
+        CRIT_ORDER_KEYS) are ignored. Lists and sets of values are sorted. The
+        current date is added for "on this day" iterations.
+
+        :param criteria: Selection criteria.
         :type criteria: dict
-        :return: Selective iterator
-        :return type: repository.IndexIterator
+        :param kind: Kind of query result, e.g. "ids" or "count".
+        :type kind: str
+        :return: Normalized key.
+        :rtype: tuple
         """
-        return IndexIterator(self._session, **criteria)
+        def normalize(value):
+            if isinstance(value, (list, set, tuple)):
+                return tuple(sorted((normalize(v) for v in value), key=repr))
+            elif isinstance(value, Enum):
+                return value.value
+            else:
+                return value
+        # Order of coordinates and radius matters for the near criterion.
+        items = sorted((key, tuple(value) if key == 'near' else normalize(value)) for key, value in criteria.items() if key not in Index.CRIT_ORDER_KEYS)
+        if 'on_this_day' in criteria:
+            items.append(('date', date.today().isoformat()))
+        return (kind,) + tuple(items)
 
+    @property
+    def generation(self):
+        """Return generation of the index content.
 
-class IndexIterator:
-    """Selective index iterator.
+        The generation is incremented whenever changes to the index content
+        have been committed by any instance using the same database.
 
-    Selective iterator which allows to traverse through a sub-population of
-    files in the index according to specified filter and order criteria.
-    """
+        :return: Generation of the index content.
+        :rtype: int
+        """
+        return self._current_generation()
 
-    def __init__(self, session, **criteria):
-        """Initialize selective index iterator.
+    @staticmethod
+    def check_criteria(criteria):
+        """Check iteration criteria for valid parameters.
 
-        :param session: SQLAlchemy database session
-        :type session: sqlalchemy.orm.Session
-        :param criteria: dictionary containing iteration criteria
+        :param criteria: Iteration criteria.
         :type criteria: dict
         :raises: ConfigError
         """
-        self._criteria = criteria
-        self._result = None
-        self._length = 0
-        self._position = 0
-
         # Check the configuration for valid and required parameters.
         check_valid_required(criteria, Index.CRIT_VALID_KEYS, Index.CRIT_REQ_KEYS)
         # Check parameters.
+        check_param('date_from', criteria, required=False, is_date=True)
+        check_param('date_to', criteria, required=False, is_date=True)
         check_param('direction', criteria, required=False, options={ item.value for item in SORT_DIR })
         check_param('excluded_tags', criteria, required=False, recurse=True, is_str=True)
+        check_param('min_height', criteria, required=False, is_int=True, gr=0)
+        check_param('min_rating', criteria, required=False, is_int=True, ge=0, le=5)
+        check_param('min_width', criteria, required=False, is_int=True, gr=0)
         check_param('most_recent', criteria, required=False, gr=0)
+        if 'near' in criteria:
+            value = criteria['near']
+            if not isinstance(value, (list, tuple)) or len(value) != 3 or not all(isinstance(v, (int, float)) for v in value):
+                raise ConfigError(f"Invalid value '{value}' for parameter 'near' specified. Value must be of type [latitude, longitude, radius].", criteria)
+            check_param('near', value[0], ge=-90, le=90)
+            check_param('near', value[1], ge=-180, le=180)
+            check_param('near', value[2], gr=0)
+        check_param('on_this_day', criteria, required=False, options={ item.value for item in ON_THIS_DAY })
         check_param('order', criteria, required=False, options={ item.value for item in SORT_ORDER })
         check_param('orientation', criteria, required=False, options={ RepositoryFile.ORIENTATION_PORTRAIT, RepositoryFile.ORIENTATION_LANDSCAPE })
         check_param('repositories', criteria, required=False, recurse=True, is_str=True)
+        check_param('search', criteria, required=False, is_str=True)
+        if 'search' in criteria and fts_query(criteria['search']) == "":
+            raise ConfigError(f"Invalid value '{criteria['search']}' for parameter 'search' specified. Value must contain at least one word.", criteria)
         check_param('tags', criteria, required=False, recurse=True, is_str=True)
         check_param('types', criteria, required=False, options={ RepositoryFile.TYPE_IMAGE, RepositoryFile.TYPE_VIDEO })
         # Check smart order related parameters.
         if criteria.get('orientation') == SORT_ORDER.SMART:
             check_param('smart_limit', criteria, required=True, is_int=True, gr=0)
             check_param('smart_time', criteria, required=True, gr=0)
+        check_param('smart_distance', criteria, required=False, gr=0)
+        # Check weighted order related parameters.
+        check_param('weight_rating', criteria, required=False, ge=0)
+        check_param('weight_recent', criteria, required=False, ge=0)
 
-        # Initialize query.
-        query = session.query(MetaData.file_uuid, MetaData.rep_uuid, MetaData.creation_date)
+    @staticmethod
+    def filter_query(query, criteria):
+        """Extend query by filters according to iteration criteria.
+
+        Tombstones of deleted files are always excluded. Order criteria are
+        ignored.
+
+        :param query: Query on metadata entries.
+        :type query: sqlalchemy.orm.Query
+        :param criteria: Iteration criteria.
+        :type criteria: dict
+        :return: Filtered query.
+        :rtype: sqlalchemy.orm.Query
+        """
+        query = query.filter(MetaData.deleted == None)
 
         # Extend query based on iteration criteria.
         for key, value in criteria.items():
@@ -414,6 +1305,57 @@ class IndexIterator:
             elif key == "orientation":
                 query = query.filter(MetaData.orientation == value)
 
+            # Limit iteration to files created within a date range. Dates
+            # without time include the complete day.
+            elif key == "date_from":
+                query = query.filter(MetaData.creation_date >= to_datetime(value))
+            elif key == "date_to":
+                limit = to_datetime(value)
+                if not isinstance(value, datetime) and limit.time() == datetime.min.time():
+                    query = query.filter(MetaData.creation_date < limit + timedelta(days=1))
+                else:
+                    query = query.filter(MetaData.creation_date <= limit)
+
+            # Filter for minimum rating and dimensions of content.
+            elif key == "min_rating":
+                query = query.filter(MetaData.rating >= value)
+            elif key == "min_width":
+                query = query.filter(MetaData.width >= value)
+            elif key == "min_height":
+                query = query.filter(MetaData.height >= value)
+
+            # Limit iteration to files within a radius around a location.
+            # Candidates are selected by their bounding box using the R*Tree
+            # table prior to checking the exact distance.
+            elif key == "near":
+                lat, lon, radius = value
+                dlat = math.degrees(radius / EARTH_RADIUS)
+                cos_lat = math.cos(math.radians(lat))
+                dlon = math.degrees(radius / (EARTH_RADIUS * cos_lat)) if cos_lat > 0 else 180
+                # Do not limit longitude if box crosses the poles or the
+                # antimeridian.
+                lon_min, lon_max = (lon - dlon, lon + dlon) if abs(lon) + dlon <= 180 and abs(lat) + dlat <= 90 else (-180, 180)
+                box = select(files_rtree.c.id).where(files_rtree.c.max_lat >= lat - dlat, files_rtree.c.min_lat <= lat + dlat,
+                    files_rtree.c.max_lon >= lon_min, files_rtree.c.min_lon <= lon_max)
+                query = query.filter(MetaData.id.in_(box)).filter(func.distance(MetaData.latitude, MetaData.longitude, lat, lon) <= radius)
+
+            # Limit iteration to files matching the search text in name,
+            # description or tags using the full text index.
+            elif key == "search":
+                match = select(files_fts.c.rowid).where(files_fts.c.files_fts.op("MATCH")(fts_query(value)))
+                query = query.filter(MetaData.id.in_(match))
+
+            # Limit iteration to files created on the same day or in the same
+            # calendar week in previous years.
+            elif key == "on_this_day":
+                today = date.today()
+                month_day, week = calendar_keys(today)
+                if value == ON_THIS_DAY.WEEK:
+                    query = query.filter(MetaData.week == week)
+                else:
+                    query = query.filter(MetaData.month_day == month_day)
+                query = query.filter(MetaData.creation_date < datetime(today.year, 1, 1))
+
             # Limit iteration to files with specified tags.
             elif key == "tags":
                 # Convert to list if single value specified.
@@ -426,29 +1368,237 @@ class IndexIterator:
                 if type(value) == str: value = [value]
                 query = query.filter(or_(~MetaData.tags.any(func.lower(MetaDataTag.name).in_([tag.lower() for tag in value])), MetaData.tags == None))
 
-        # Determine limiting date to limit iteration to the n most recent files
-        # based on the creation date. Outside of the loop since query needs to
-        # be executed after all filters, but prior to specifying any order
-        # (see below).
+        # Limit iteration to the n most recent files based on the creation
+        # date. The limiting date is determined by a subquery on the filtered
+        # files. Outside of the loop since the subquery needs to include all
+        # filters, but no order.
         if 'most_recent' in criteria:
             value = criteria['most_recent']
-            result = query.order_by(desc(MetaData.creation_date)).limit(value).all()
-            if len(result) > 0:
-                date_limit = result[-1].creation_date
-                query = query.filter(MetaData.creation_date >= date_limit)
+            recent = query.with_entities(MetaData.creation_date.label("creation_date")).order_by(desc(MetaData.creation_date)).limit(value).subquery()
+            date_limit = query.session.query(func.min(recent.c.creation_date)).scalar_subquery()
+            query = query.filter(MetaData.creation_date >= date_limit)
 
-        # Retrieve files in a specific or random order.
+        return query
+
+    def stats(self, **criteria):
+        """Return statistics on files matching the criteria.
+
+        The statistics comprise the total number of matching files and
+        breakdowns of this number by file type, orientation and repository.
+        All numbers are determined by the database. Results are cached for the
+        current generation of the index content.
+
+        :param criteria: Filter criteria as for iterator(). Order criteria are
+            ignored.
+        :type criteria: dict
+        :return: Dictionary with keys 'count', 'types', 'orientations' and
+            'repositories'. Breakdowns map values to numbers of files.
+        :rtype: dict
+        :raises: ConfigError
+        """
+        Index.check_criteria(criteria)
+        def query_stats():
+            query = Index.filter_query(self._session.query(MetaData), criteria)
+            # Count files per type, orientation and repository in a single
+            # query and derive the breakdowns from the groups.
+            rows = query.with_entities(MetaData.type, MetaData.orientation, MetaData.rep_uuid, func.count()).group_by(MetaData.type, MetaData.orientation, MetaData.rep_uuid).all()
+            stats = { 'count': 0, 'types': {}, 'orientations': {}, 'repositories': {} }
+            for type, orientation, rep_uuid, count in rows:
+                stats['count'] = stats['count'] + count
+                for key, value in (('types', type), ('orientations', orientation), ('repositories', rep_uuid)):
+                    stats[key][value] = stats[key].get(value, 0) + count
+            return stats
+        return self._cached(Index.criteria_key(criteria, "stats"), query_stats)
+
+    def search(self, text, limit=50, **criteria):
+        """Search files by name, description and tags.
+
+        Words of the search text are matched as prefixes of words in the name,
+        description or tags of files using the full text index. All words need
+        to match. Results are ranked by relevance.
+
+        :param text: Search text.
+        :type text: str
+        :param limit: Maximum number of files returned. Default is 50.
+        :type limit: int
+        :param criteria: Optional filter criteria as for iterator(). Order
+            criteria are ignored.
+        :type criteria: dict
+        :return: Matching files in order of relevance. Empty if the search
+            text does not contain any words.
+        :rtype: list of repository.RepositoryFile
+        :raises: ConfigError
+        """
+        Index.check_criteria(criteria)
+        if fts_query(text) == "":
+            return list()
+        query = Index.filter_query(self._session.query(MetaData), criteria)
+        query = query.join(files_fts, files_fts.c.rowid == MetaData.id).filter(files_fts.c.files_fts.op("MATCH")(fts_query(text)))
+        files = list()
+        for mdata in query.options(selectinload(MetaData.tags)).order_by(files_fts.c.rank).limit(limit):
+            try:
+                files.append(Repository.by_uuid(mdata.rep_uuid).file_by_uuid(mdata.file_uuid, mdata=mdata))
+            # Skip files, which are no longer available.
+            except UuidError:
+                logging.warn(f"Skipping invalid file '{mdata.file_uuid}' in repository '{mdata.rep_uuid}'. The metadata index may be outdated.")
+        return files
+
+    def iterator(self, **criteria):
+        """Return selective iterator.
+
+        Return selective iterator which allows to traverse through a
+        sub-population of files in the index according to specified criteria.
+
+        :param criteria: Selection criteria
+        :type criteria: dict
+        :return: Selective iterator
+        :return type: repository.IndexIterator
+        """
+        return IndexIterator(self._session, self, **criteria)
+
+
+# Row of a shuffled iteration with its position in the permutation as sort key
+ShuffledRow = namedtuple("ShuffledRow", ("MetaData", "sort_key"))
+
+
+class AliasTable:
+    """Sampler drawing values with probabilities proportional to weights.
+
+    Implements the alias method by Vose. Building the table takes linear time.
+    Afterwards, each draw takes constant time.
+    """
+
+    def __init__(self, values, weights):
+        """Initialize alias table.
+
+        :param values: Values to draw from.
+        :type values: list of int
+        :param weights: Positive weights of the values.
+        :type weights: list of float
+        """
+        size = len(values)
+        self._values = array('q', values)
+        self._probabilities = array('d', [1.0]) * size
+        self._aliases = array('q', [0]) * size
+        if size == 0: return
+        # Scale weights to an average of 1 and distribute the excess of large
+        # weights to the columns of small weights.
+        total = sum(weights)
+        scaled = [weight * size / total for weight in weights]
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while len(small) > 0 and len(large) > 0:
+            i, j = small.pop(), large.pop()
+            self._probabilities[i] = scaled[i]
+            self._aliases[i] = j
+            scaled[j] = scaled[j] + scaled[i] - 1
+            if scaled[j] < 1:
+                small.append(j)
+            else:
+                large.append(j)
+        # Remaining columns are full apart from rounding errors.
+        for i in small + large:
+            self._probabilities[i] = 1.0
+
+    def draw(self):
+        """Draw random value.
+
+        :return: Drawn value.
+        :rtype: int
+        """
+        i = random.randrange(len(self._values))
+        return self._values[i] if random.random() < self._probabilities[i] else self._values[self._aliases[i]]
+
+    def __len__(self):
+        """Return number of values."""
+        return len(self._values)
+
+
+class IndexIterator:
+    """Selective index iterator.
+
+    Selective iterator which allows to traverse through a sub-population of
+    files in the index according to specified filter and order criteria.
+
+    Iterations sorted by date or name are streamed, i.e. only a window of up
+    to WINDOW_SIZE rows is kept in memory. Pages of PAGE_SIZE rows are fetched
+    as required using keyset pagination. All other iterations are kept as
+    compact array of metadata ids. Metadata are retrieved one file at a time.
+
+    Shuffled iterations are streamed as well. Files are drawn from a seeded
+    pseudo-random permutation of the id range. Seed and cursor of the
+    permutation are saved in the index, so that the iteration resumes without
+    repeating files after a restart. Files added after the permutation has been
+    started are included once the next permutation is started.
+
+    Weighted iterations draw files at random, but favor files with higher
+    rating and more recent files. Files are drawn from an alias table, which is
+    built once per criteria and generation of the index content.
+    """
+
+    # Number of rows fetched per page in streamed iterations
+    PAGE_SIZE = 50
+    # Maximum number of rows kept in memory in streamed iterations
+    WINDOW_SIZE = 150
+    # Number of positions of the permutation looked up at once in shuffled
+    # iterations
+    SHUFFLE_BATCH_SIZE = 500
+    # Number of days after which the weight of recent files is halved in
+    # weighted iterations
+    WEIGHT_HALF_LIFE = 365
+
+    def __init__(self, session, index=None, **criteria):
+        """Initialize selective index iterator.
+
+        :param session: SQLAlchemy database session
+        :type session: sqlalchemy.orm.Session
+        :param index: Optional index used to cache query results. Default is
+            None.
+        :type index: repository.Index
+        :param criteria: dictionary containing iteration criteria
+        :type criteria: dict
+        :raises: ConfigError
+        """
+        self._criteria = criteria
+        self._session = session
+        self._ids = None
+        self._last = None
+        self._permutation = None
+        self._sampler = None
+        self._length = 0
+        self._position = 0
+
+        # Check criteria and initialize query. Exclude tombstones of deleted
+        # files and extend query based on filter criteria.
+        Index.check_criteria(criteria)
+        query = session.query(MetaData.file_uuid, MetaData.rep_uuid, MetaData.creation_date)
+        query = Index.filter_query(query, criteria)
+
+        # Retrieve files in a specific or random order. Files sorted by date
+        # or name are streamed in pages using keyset pagination on the sort
+        # key and id. Shuffled files are streamed by drawing from a
+        # permutation. All other iterations are retrieved at once.
+        self._keys = None
+        self._descending = False
+        ids_query = None
         if 'order' in criteria:
             order = criteria['order']
-            dir = criteria.get('direction', SORT_DIR.ASC)
-            map = { SORT_DIR.ASC: asc, SORT_DIR.DESC: desc }
-            dir_fun = map[dir]
-            if order == SORT_ORDER.RANDOM:
-                query = query.order_by(func.random())
-            elif order == SORT_ORDER.DATE:
-                query = query.order_by(dir_fun(MetaData.creation_date))
+            self._descending = criteria.get('direction', SORT_DIR.ASC) == SORT_DIR.DESC
+            if order == SORT_ORDER.DATE:
+                self._keys = (MetaData.creation_date, MetaData.id)
             elif order == SORT_ORDER.NAME:
-                query = query.order_by(dir_fun(func.upper(MetaData.name)))
+                self._keys = (func.upper(MetaData.name), MetaData.id)
+            elif order == SORT_ORDER.SHUFFLE:
+                # Resume from the saved state of the permutation for the
+                # criteria. Start a new permutation covering all ids assigned
+                # so far if none exists yet or the last one is completed.
+                self._shuffle_key = hashlib.sha1(repr(Index.criteria_key(criteria, "shuffle")).encode()).hexdigest()
+                state = session.query(ShuffleState.seed, ShuffleState.size, ShuffleState.cursor).filter(ShuffleState.key == self._shuffle_key).first()
+                if state is None or state.cursor is None or state.cursor >= state.size:
+                    self._start_permutation()
+                else:
+                    self._permutation = Permutation(state.size, state.seed)
+                    self._cursor = state.cursor
             elif order == SORT_ORDER.SMART:
                 logging.debug("Determine start date for smart order iteration.")
                 # Metadata entries have been assigned a random number in the
@@ -460,12 +1610,238 @@ class IndexIterator:
                 if result is None:
                     result = query.filter(MetaData.random_number <= random_number).order_by(desc(MetaData.random_number)).first()
                 if result is not None:
-                    query = query.order_by(MetaData.creation_date).filter(MetaData.creation_date >= result.creation_date).limit(criteria['smart_limit'])
+                    logging.debug("Determine series of files for smart order iteration.")
+                    # Compute the complete series in the database. The series
+                    # comprises up to smart_limit files in chronological order
+                    # from the starting point onwards. It ends before the first
+                    # file, which has been created more than smart_time hours
+                    # after its predecessor or, if smart_distance is
+                    # specified, more than smart_distance km away from its
+                    # predecessor. The gaps between files are determined using
+                    # the LAG window function and gaps, which exceed the
+                    # limits, are counted by a running total. Files without
+                    # coordinates never exceed the distance limit.
+                    series = query.with_entities(MetaData.id.label("id"), MetaData.creation_date.label("creation_date"), MetaData.latitude.label("latitude"), MetaData.longitude.label("longitude")) \
+                        .filter(MetaData.creation_date >= result.creation_date).order_by(MetaData.creation_date, MetaData.id).limit(criteria['smart_limit']).subquery()
+                    order_by = (series.c.creation_date, series.c.id)
+                    series = session.query(series.c.id, series.c.creation_date, series.c.latitude, series.c.longitude,
+                        func.lag(series.c.creation_date).over(order_by=order_by).label("prev_date"),
+                        func.lag(series.c.latitude).over(order_by=order_by).label("prev_lat"),
+                        func.lag(series.c.longitude).over(order_by=order_by).label("prev_lon")).subquery()
+                    gap = func.julianday(series.c.creation_date) - func.julianday(series.c.prev_date) > criteria['smart_time']/24
+                    if 'smart_distance' in criteria:
+                        gap = or_(gap, func.distance(series.c.latitude, series.c.longitude, series.c.prev_lat, series.c.prev_lon) > criteria['smart_distance'])
+                    order_by = (series.c.creation_date, series.c.id)
+                    series = session.query(series.c.id, series.c.creation_date, func.total(gap).over(order_by=order_by).label("gaps")).subquery()
+                    ids_query = session.query(series.c.id).filter(series.c.gaps == 0).order_by(series.c.creation_date, series.c.id)
+
+        # Window of rows retrieved from the database and position of the
+        # first row in the window within the iteration.
+        self._window = list()
+        self._offset = 0
+        def cached(kind, function):
+            """Execute query via cache of index if available."""
+            if index is None or criteria.get('order') == SORT_ORDER.SMART:
+                return function()
+            return index._cached(Index.criteria_key(criteria, kind), function)
+
+        if self._keys is not None:
+            logging.debug("Counting files for new paged iteration.")
+            self._length = cached("count", query.count)
+            # Retrieve complete metadata entries including tags per page.
+            self._query = query.with_entities(MetaData, self._keys[0].label("sort_key")).options(selectinload(MetaData.tags))
+        elif self._permutation is not None:
+            logging.debug("Counting files for new shuffled iteration.")
+            self._length = cached("count", query.count)
+            # Retrieve complete metadata entries including tags per batch.
+            self._query = query.with_entities(MetaData).options(selectinload(MetaData.tags))
+        elif criteria.get('order') == SORT_ORDER.WEIGHTED:
+            # Draw ids from alias table as required. Drawn ids are kept to
+            # allow retrieval of previous files.
+            logging.debug("Building alias table for new weighted iteration.")
+            weight_rating = criteria.get('weight_rating', 1)
+            weight_recent = criteria.get('weight_recent', 1)
+            def alias_table():
+                now = datetime.now()
+                ids, weights = list(), list()
+                for row in query.with_entities(MetaData.id, MetaData.rating, MetaData.creation_date):
+                    # Star ratings range from 0 to 5. Recency decays
+                    # exponentially with the age of the file.
+                    weight = 1 + weight_rating * (row.rating or 0) / 5
+                    if row.creation_date is not None:
+                        age = max((now - row.creation_date).days, 0)
+                        weight = weight + weight_recent * 0.5 ** (age / IndexIterator.WEIGHT_HALF_LIFE)
+                    ids.append(row.id)
+                    weights.append(weight)
+                return AliasTable(ids, weights)
+            self._sampler = cached(("alias", weight_rating, weight_recent), alias_table)
+            self._ids = array('q')
+            self._length = len(self._sampler)
+        else:
+            # Query ids only and save them as compact array.
+            logging.debug("Querying files for new iteration.")
+            if ids_query is None:
+                ids_query = query.with_entities(MetaData.id)
+            ids = cached("ids", lambda: array('q', (row.id for row in ids_query)))
+            # Copy cached ids since they may be shuffled.
+            self._ids = array('q', ids)
+            self._length = len(self._ids)
+            # Shuffle ids for random order instead of sorting in the database.
+            if criteria.get('order') == SORT_ORDER.RANDOM:
+                random.shuffle(self._ids)
+        logging.debug(f"New iteration has {self._length} files.")
+
+    def _fetch(self, forward=True):
+        """Fetch next or previous page of rows for paged iterations.
+
+        :param forward: True if the page following the current window shall be
+            fetched. False if the page preceding the current window shall be
+            fetched.
+        :type forward: bool
+        :return: Page of rows in iteration order. Empty if there are no
+            further rows or the iteration is not paged.
+        :return type: list of sqlalchemy.engine.Row
+        """
+        if self._permutation is not None: return self._draw(forward)
+        if self._keys is None: return list()
+        query = self._query
+        ascending = forward != self._descending
+        # Continue after the last or before the first row in the window.
+        if len(self._window) > 0:
+            row = self._window[-1] if forward else self._window[0]
+            keys, values = tuple_(*self._keys), tuple_(row.sort_key, row.MetaData.id)
+            query = query.filter(keys > values if ascending else keys < values)
+        elif not forward:
+            return list()
+        dir_fun = asc if ascending else desc
+        rows = query.order_by(*[dir_fun(key) for key in self._keys]).limit(IndexIterator.PAGE_SIZE).all()
+        if not forward: rows.reverse()
+        return rows
+
+    def _draw(self, forward=True):
+        """Draw next or previous rows from the permutation of shuffled iterations.
+
+        Positions of the permutation are mapped to ids, which are looked up
+        SHUFFLE_BATCH_SIZE at a time. Ids of files, which do not match the
+        criteria or no longer exist, are skipped. Up to PAGE_SIZE rows are
+        returned. Further rows are drawn again by the next call.
+
+        :param forward: True if the rows following the current window shall be
+            drawn. False if the rows preceding the current window shall be
+            drawn.
+        :type forward: bool
+        :return: Rows in iteration order. Empty if the beginning or end of the
+            permutation is reached.
+        :return type: list of repository.index.ShuffledRow
+        """
+        if len(self._window) > 0:
+            position = self._window[-1].sort_key + 1 if forward else self._window[0].sort_key - 1
+        elif forward:
+            position = self._cursor
+        else:
+            return list()
+        size = len(self._permutation)
+        rows = list()
+        while len(rows) == 0 and 0 <= position < size:
+            if forward:
+                positions = range(position, min(position + IndexIterator.SHUFFLE_BATCH_SIZE, size))
+            else:
+                positions = range(position, max(position - IndexIterator.SHUFFLE_BATCH_SIZE, -1), -1)
+            # Ids start from 1, positions of the permutation from 0.
+            ids = { self._permutation[position] + 1: position for position in positions }
+            rows = [ShuffledRow(mdata, ids[mdata.id]) for mdata in self._query.filter(MetaData.id.in_(ids.keys()))]
+            position = positions[-1] + (1 if forward else -1)
+        # Start a new permutation if nothing can be drawn from the resumed
+        # cursor, e.g. since the remaining ids have been deleted or do not
+        # match the criteria. Mark the permutation as completed once its end
+        # is reached otherwise, so that the next iteration starts a new one.
+        if len(rows) == 0 and forward:
+            if len(self._window) == 0 and self._cursor > 0:
+                self._start_permutation()
+                return self._draw(forward)
+            self._save_cursor(size)
+        rows.sort(key=lambda row: row.sort_key)
+        # Limit number of rows to the size of a page, so that the window never
+        # needs to be trimmed beyond the requested position.
+        return rows[:IndexIterator.PAGE_SIZE] if forward else rows[-IndexIterator.PAGE_SIZE:]
+
+    def _start_permutation(self):
+        """Start new permutation for shuffled iterations.
+
+        The permutation covers all ids assigned so far. Its seed is saved in
+        the index together with a cursor at the start of the permutation.
+        """
+        logging.debug("Starting new permutation for shuffled iteration.")
+        seed = random.getrandbits(63)
+        size = self._session.query(func.max(MetaData.id)).scalar() or 0
+        self._permutation = Permutation(size, seed)
+        self._cursor = 0
+        try:
+            with self._session.get_bind().begin() as conn:
+                conn.execute(insert(ShuffleState).prefix_with("OR REPLACE").values(key=self._shuffle_key, seed=seed, size=size, cursor=0))
+        except Exception as e:
+            logging.error(f"An error ocurred while saving the state of the shuffled iteration: {e}")
+
+    def _save_cursor(self, cursor):
+        """Save cursor of shuffled iterations to resume after a restart.
 
-        # Query data and save list of metadata objects.
-        logging.debug("Querying files for new iteration.")
-        self._result = query.all()
-        logging.debug(f"New iteration has {len(self._result)} files.")
+        Uses a separate connection to keep loaded metadata entries.
+
+        :param cursor: Position within the permutation from which the
+            iteration resumes.
+        :type cursor: int
+        """
+        try:
+            with self._session.get_bind().begin() as conn:
+                conn.execute(update(ShuffleState).where(ShuffleState.key == self._shuffle_key).values(cursor=cursor))
+        except Exception as e:
+            logging.error(f"An error ocurred while saving the state of the shuffled iteration: {e}")
+
+    def _row(self, position):
+        """Return row at the specified position of the iteration.
+
+        Fetches pages as required for paged iterations and limits the window
+        to WINDOW_SIZE rows. Retrieves the metadata entry including tags by its
+        id otherwise.
+
+        :param position: Position within the iteration.
+        :type position: int
+        :return: Metadata entry at the specified position. None if the entry
+            no longer exists.
+        :return type: repository.MetaData
+        :raises: StopIteration if the position is beyond the end of the
+            iteration.
+        """
+        if self._ids is not None:
+            # Draw files of weighted iterations as required.
+            if self._sampler is not None:
+                while len(self._ids) <= position < self._length:
+                    self._ids.append(self._sampler.draw())
+            if position >= len(self._ids): raise StopIteration()
+            # Reuse last entry, e.g. when evaluating smart order criteria.
+            if self._last is not None and self._last[0] == position:
+                return self._last[1]
+            mdata = self._session.query(MetaData).options(joinedload(MetaData.tags)) \
+                .filter(MetaData.id == self._ids[position]).filter(MetaData.deleted == None).first()
+            self._last = (position, mdata)
+            return mdata
+        while position < self._offset:
+            rows = self._fetch(forward=False)
+            if len(rows) == 0: raise StopIteration()
+            self._window[0:0] = rows
+            self._offset = self._offset - len(rows)
+            # Drop rows following the requested position only.
+            del self._window[max(IndexIterator.WINDOW_SIZE, position - self._offset + 1):]
+        while position >= self._offset + len(self._window):
+            rows = self._fetch(forward=True)
+            if len(rows) == 0: raise StopIteration()
+            self._window.extend(rows)
+            # Drop rows preceding the requested position only.
+            excess = min(len(self._window) - IndexIterator.WINDOW_SIZE, position - self._offset)
+            if excess > 0:
+                del self._window[:excess]
+                self._offset = self._offset + excess
+        return self._window[position - self._offset].MetaData
 
     def __iter__(self):
         """Return self as iterator.
@@ -484,29 +1860,21 @@ class IndexIterator:
         """
         # Repeat until we have a valid file or end of iteration is reached.
         while True:
-            # Retrieve next metadata object in iteration.
-            if self._position < len(self._result):
-                mdata = self._result[self._position]
-                self._position = self._position + 1
-            # Raise exception if end of iteration is reached.
-            else:
-                raise StopIteration()
-            # Evaluate smart order termination criteria from second file onwards.
-            if self._criteria.get('order') == SORT_ORDER.SMART and self._position > 1:
-                # Obtain meta data of previous file.
-                prev_mdata = self._result[self._position - 2]
-                # Stop iteration if delta in creation date between current and
-                # previous file exceeds smart time limit.
-                delta = mdata.creation_date - prev_mdata.creation_date
-                delta = delta.seconds/3600 + delta.days*24
-                if delta > self._criteria['smart_time']:
-                    logging.debug("Ending iteration early due to smart time criterion.")
-                    raise StopIteration()
-                # We additionally plan to implement a smart distance criterion
-                # at a later point in time once location meta data are supported.
-            # Try to obtain corresponding file.
+            # Retrieve next metadata object in iteration. Raises exception if
+            # end of iteration is reached.
+            mdata = self._row(self._position)
+            self._position = self._position + 1
+            # Skip files, which have been removed from the index in the
+            # meantime.
+            if mdata is None: continue
+            # Save cursor of shuffled iterations to resume after a restart.
+            if self._permutation is not None:
+                self._cursor = self._window[self._position - 1 - self._offset].sort_key + 1
+                self._save_cursor(self._cursor)
+            # Try to obtain corresponding file. Metadata are assigned from the
+            # retrieved entry without looking them up again.
             try:
-                return Repository.by_uuid(mdata.rep_uuid).file_by_uuid(mdata.file_uuid)
+                return Repository.by_uuid(mdata.rep_uuid).file_by_uuid(mdata.file_uuid, mdata=mdata)
             # Catch any invalid uuid errors in case the file is no longer
             # available in the repository and continue.
             except UuidError:
@@ -516,7 +1884,7 @@ class IndexIterator:
     @property
     def length(self):
         """Return number of files in index."""
-        return len(self._result)
+        return self._length
 
     def previous(self, n=1):
         """Return previous file in iteration.
@@ -0,0 +1,143 @@
+"""Module providing a parser for JPEG header segments.
+
+The parser reads only the segments preceding the compressed image data, i.e.
+the image dimensions from the start of frame (SOF) segment, the EXIF data from
+the APP1 segment and the IPTC data from the APP13 segment. File content is
+accessed via a read(offset, size) callable. The parser can thus be used with
+memory-mapped local files as well as with range requests to remote files.
+
+References;
+----------
+1. https://www.w3.org/Graphics/JPEG/itu-t81.pdf
+2. https://www.iptc.org/std/IIM/4.2/specification/IIMV4.2.pdf
+"""
+
+import struct
+
+from collections import namedtuple
+
+
+# Header data of a JPEG file. EXIF data are provided as TIFF structure without
+# the leading "Exif" identifier. Keywords are taken from the IPTC data.
+JpegHeader = namedtuple("JpegHeader", ("width", "height", "exif", "keywords"))
+
+# Start of frame markers, which contain the image dimensions. Markers 0xC4
+# (DHT), 0xC8 (JPG) and 0xCC (DAC) share the range, but are no frame markers.
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Start of scan marker, after which the compressed image data follow
+SOS_MARKER = 0xDA
+# Application segment markers for EXIF and IPTC data
+APP1_MARKER = 0xE1
+APP13_MARKER = 0xED
+# Identifiers of application segments
+EXIF_ID = b"Exif\x00\x00"
+PHOTOSHOP_ID = b"Photoshop 3.0\x00"
+# Photoshop image resource containing IPTC data
+IPTC_RESOURCE = 0x0404
+# IPTC record and dataset numbers of keywords and coded character set
+IPTC_KEYWORDS = (2, 25)
+IPTC_CHARSET = (1, 90)
+
+
+def read_header(read):
+    """Read header segments of a JPEG file.
+
+    Segments are read one after another until the start of the compressed
+    image data. The image data are never read.
+
+    :param read: Callable read(offset, size), which returns up to size bytes
+        of the file content starting at offset. Returns fewer bytes only at
+        the end of the file.
+    :type read: callable
+    :return: Header data. None if the file is not a JPEG file or the header
+        is incomplete.
+    :rtype: repository.jpeg.JpegHeader
+    """
+    if read(0, 2) != b"\xff\xd8":
+        return None
+    width, height, exif, keywords = None, None, None, None
+    offset = 2
+    while True:
+        marker = read(offset, 4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            break
+        # Skip fill bytes preceding markers.
+        if marker[1] == 0xFF:
+            offset = offset + 1
+            continue
+        code = marker[1]
+        # Markers without length, i.e. TEM and RST0..RST7.
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            offset = offset + 2
+            continue
+        if code == SOS_MARKER:
+            break
+        length = struct.unpack(">H", marker[2:4])[0]
+        if code in SOF_MARKERS:
+            segment = read(offset + 4, 5)
+            if len(segment) == 5:
+                height, width = struct.unpack(">HH", segment[1:5])
+        elif code == APP1_MARKER and exif is None:
+            segment = read(offset + 4, length - 2)
+            if segment.startswith(EXIF_ID):
+                exif = bytes(segment[len(EXIF_ID):])
+        elif code == APP13_MARKER and keywords is None:
+            segment = read(offset + 4, length - 2)
+            if segment.startswith(PHOTOSHOP_ID):
+                keywords = _iptc_keywords(segment, len(PHOTOSHOP_ID))
+        offset = offset + 2 + length
+    if width is None:
+        return None
+    return JpegHeader(width, height, exif, keywords)
+
+
+def _iptc_keywords(segment, offset):
+    """Extract keywords from IPTC data in Photoshop image resources.
+
+    :param segment: Content of the APP13 segment.
+    :type segment: bytes
+    :param offset: Offset of the first image resource.
+    :type offset: int
+    :return: Keywords. Empty if the resources do not contain IPTC data.
+    :rtype: list of str
+    """
+    # Find IPTC resource among image resources.
+    while offset + 12 <= len(segment) and segment[offset:offset+4] == b"8BIM":
+        id = struct.unpack(">H", segment[offset+4:offset+6])[0]
+        # Skip resource name (Pascal string padded to even length).
+        name_length = segment[offset+6]
+        offset = offset + 6 + name_length + 1 + ((name_length + 1) % 2)
+        size = struct.unpack(">I", segment[offset:offset+4])[0]
+        offset = offset + 4
+        if id == IPTC_RESOURCE:
+            return _iptc_datasets(segment[offset:offset+size])
+        offset = offset + size + (size % 2)
+    return []
+
+
+def _iptc_datasets(data):
+    """Extract keywords from IPTC datasets.
+
+    :param data: IPTC datasets.
+    :type data: bytes
+    :return: Keywords.
+    :rtype: list of str
+    """
+    keywords = list()
+    encoding = "utf-8"
+    offset = 0
+    while offset + 5 <= len(data) and data[offset] == 0x1C:
+        record, dataset, size = data[offset+1], data[offset+2], struct.unpack(">H", data[offset+3:offset+5])[0]
+        offset = offset + 5
+        # Extended datasets specify the number of bytes holding the size.
+        if size & 0x8000:
+            count = size & 0x7FFF
+            size = int.from_bytes(data[offset:offset+count], "big")
+            offset = offset + count
+        value = data[offset:offset+size]
+        offset = offset + size
+        if (record, dataset) == IPTC_CHARSET and value != b"\x1b%G":
+            encoding = "latin-1"
+        elif (record, dataset) == IPTC_KEYWORDS:
+            keywords.append(bytes(value).decode(encoding, errors="replace"))
+    return keywords
@@ -1,11 +1,13 @@
 """Module for local repository files."""
 
 import logging
+import os
 import os.path
 import repository
 
 from repository import UuidError
 from datetime import datetime
+from stat import S_ISREG
 
 
 class RepositoryFile(repository.RepositoryFile):
@@ -18,7 +20,10 @@ class RepositoryFile(repository.RepositoryFile):
     See repository.File for documentation of properties.
     """
 
-    def __init__(self, uuid, rep, index=None, index_lookup=True, extract_metadata=True):
+    # Modification and creation time from the stat call on initialization
+    __slots__ = ('_mtime', '_ctime')
+
+    def __init__(self, uuid, rep, index=None, index_lookup=True, extract_metadata=True, mdata=None):
         """Initialize the repository file.
 
         :param rep: local repository
@@ -33,27 +38,36 @@ class RepositoryFile(repository.RepositoryFile):
         :param extract_metadata: Flag indicating whether file metadata shall be
             extracted from file if not available from index. Default is True.
         :type extract_metadata: bool
+        :param mdata: Optional metadata entry of the file. If specified,
+            metadata are not looked up from the index. Default is None.
+        :type mdata: repository.MetaData
         :raises: repository.UuidError, repository.IoError
         """
         # Call constructor of parent class.
-        super().__init__(uuid, rep, index, index_lookup)
-
-        # Throw exception if file does not exist.
-        self._path = os.path.join(rep.root, uuid)
-        if not os.path.isfile(self._path):
-            raise UuidError("There is no file with UUID '{uuid}'.", uuid)
+        super().__init__(uuid, rep, index, index_lookup, mdata, extract_metadata)
 
-        # Set file name from uuid.
-        self._name = os.path.basename(uuid)
+        # Throw exception if file does not exist. A single stat call provides
+        # all required file attributes.
+        try:
+            stat = os.stat(self.source)
+        except OSError:
+            stat = None
+        if stat is None or not S_ISREG(stat.st_mode):
+            raise UuidError(f"There is no file with UUID '{uuid}'.", uuid)
+        self._mtime, self._ctime = stat.st_mtime, stat.st_ctime
 
+    def _load_metadata(self):
+        """Load file attributes and extract metadata if outdated."""
         # Determine last modification and file creation date.
-        last_modified = datetime.fromtimestamp(os.path.getmtime(self._path))
-        if not self._in_index or self.last_updated < last_modified:
-            self._last_modified = last_modified
-            self._creation_date = datetime.fromtimestamp(os.path.getctime(self._path))
+        meta = self._meta
+        last_modified = datetime.fromtimestamp(self._mtime)
+        outdated = not meta.in_index or meta.last_updated < last_modified
+        if outdated:
+            meta.last_modified = last_modified
+            meta.creation_date = datetime.fromtimestamp(self._ctime)
 
         # Attempt to extract metadata from file content.
-        if (not self._in_index or self.last_updated < last_modified) and extract_metadata:
+        if outdated and self._extract:
             self.extract_metadata()
 
     def extract_metadata(self):
@@ -61,9 +75,9 @@ class RepositoryFile(repository.RepositoryFile):
         logging.debug(f"Extracting metadata of file '{self.uuid}' from file content.")
         # If image try to extract metadata from EXIF tag.
         if self._type == repository.RepositoryFile.TYPE_IMAGE:
-            self._extract_image_metadata(self._path)
+            self._extract_image_metadata(self.source)
         elif self._type == repository.RepositoryFile.TYPE_VIDEO:
-            self._extract_video_metadata(self._path)
+            self._extract_video_metadata(self.source)
 
     @property
     def source(self):
@@ -72,4 +86,4 @@ class RepositoryFile(repository.RepositoryFile):
         :return: full path
         :rtype: str
         """
-        return self._path
+        return os.path.join(self._rep.root, self._uuid)
@@ -5,6 +5,7 @@ import os.path
 import logging
 import repository
 
+from datetime import datetime
 from repository import ConfigError, IoError, check_param, check_valid_required
 
 from .file import RepositoryFile
@@ -59,7 +60,43 @@ class Repository(repository.Repository):
         """
         return FileIterator(self, index_lookup, extract_metadata)
 
-    def file_by_uuid(self, uuid, index_lookup=True, extract_metadata=True):
+    def listing(self):
+        """Provide listing of all files in the repository.
+
+        Walks through the directory tree and derives the file attributes
+        including the fingerprint (size, mtime_ns, inode) from the directory
+        entries. No file objects are created. A single stat call is made per
+        file.
+
+        :return: Listing of files in the repository. See
+            repository.Repository.listing for the format of entries.
+        :rtype: iterable of dict
+        :raises: repository.IoError
+        """
+        dir_list = [self._root]
+        while len(dir_list) > 0:
+            dir = dir_list.pop()
+            try:
+                with os.scandir(dir) as iterator:
+                    for entry in iterator:
+                        # Save all sub-directories for later.
+                        if entry.is_dir():
+                            dir_list.append(entry.path)
+                        elif entry.is_file():
+                            # Directory entries provide the file type and the
+                            # inode without system call on POSIX systems. Size
+                            # and modification time require one stat call.
+                            stat = entry.stat()
+                            yield {
+                                'uuid': os.path.relpath(entry.path, start=self._root),
+                                'last_modified': datetime.fromtimestamp(stat.st_mtime),
+                                'size': stat.st_size,
+                                'mtime_ns': stat.st_mtime_ns,
+                                'inode': entry.inode() or None }
+            except OSError as e:
+                raise IoError(f"An exception occurred while scanning directory '{dir}'. {e}", e)
+
+    def file_by_uuid(self, uuid, index_lookup=True, extract_metadata=True, mdata=None):
         """Return file within the repository by its UUID.
 
         Raises a UuidError if the file with UUID does not exist. And raises an
@@ -73,11 +110,14 @@ class Repository(repository.Repository):
         :param extract_metadata: Flag indicating whether file metadata shall be
             extracted from file if not available from index. Default is True.
         :type extract_metadata: bool
+        :param mdata: Optional metadata entry of the file. If specified,
+            metadata are not looked up from the index. Default is None.
+        :type mdata: repository.MetaData
         :return: file with matching UUID
         :rtype: repository.RepositoryFile
         :raises: repository.UuidError, repository.IoError
         """
-        return RepositoryFile(uuid, self, self._index, index_lookup, extract_metadata)
+        return RepositoryFile(uuid, self, self._index, index_lookup, extract_metadata, mdata)
 
     @property
     def root(self):
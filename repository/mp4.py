@@ -0,0 +1,199 @@
+"""Module providing a parser for MP4 and QuickTime movie headers.
+
+The parser reads only the box (atom) headers of the ISO base media file format
+and the movie (mvhd) and track (tkhd) header boxes within the movie box
+(moov), i.e. the dimensions, the transformation matrix and the creation time
+of the first video track. Media data are never read. File content is accessed
+via a read(offset, size) callable. The parser can thus be used with
+memory-mapped local files as well as with range requests to remote files.
+
+References;
+----------
+1. ISO/IEC 14496-12, ISO base media file format
+2. https://developer.apple.com/documentation/quicktime-file-format
+"""
+
+import struct
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+
+# Header data of the first video track. The matrix contains the elements
+# (a, b, c, d) of the transformation matrix, which describe rotation and
+# scaling. The creation time is provided in UTC.
+MovieHeader = namedtuple("MovieHeader", ("width", "height", "matrix", "creation_time"))
+
+# Types of boxes, which may appear at the top level of MP4 and QuickTime files
+TOP_LEVEL_BOXES = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot", b"uuid"}
+# Handler type of video tracks
+VIDEO_HANDLER = b"vide"
+# Epoch of creation times
+EPOCH = datetime(1904, 1, 1)
+
+
+def read_header(read):
+    """Read movie header of an MP4 or QuickTime file.
+
+    Top-level boxes are skipped until the movie box, which may be located
+    before or after the media data.
+
+    :param read: Callable read(offset, size), which returns up to size bytes
+        of the file content starting at offset. Returns fewer bytes only at
+        the end of the file.
+    :type read: callable
+    :return: Header data. None if the file is not an MP4 or QuickTime file or
+        does not contain an uncompressed movie box with a video track.
+    :rtype: repository.mp4.MovieHeader
+    """
+    offset = 0
+    while True:
+        box = _box(read, offset, None)
+        if box is None or (offset == 0 and box[0] not in TOP_LEVEL_BOXES):
+            return None
+        type, start, end = box
+        if type == b"moov":
+            return _movie(read, start, end)
+        # Box extends to the end of the file.
+        if end is None:
+            return None
+        offset = end
+
+
+def _box(read, offset, limit):
+    """Read box header.
+
+    :param read: Callable read(offset, size).
+    :type read: callable
+    :param offset: Offset of the box.
+    :type offset: int
+    :param limit: End of the enclosing box. None at the top level.
+    :type limit: int
+    :return: Tuple (type, start, end) with type of the box and offsets of
+        start and end of its payload. End is None if the box extends to the
+        end of the file. None if there is no valid box at offset.
+    :rtype: tuple
+    """
+    if limit is not None and offset + 8 > limit:
+        return None
+    header = read(offset, 16)
+    if len(header) < 8:
+        return None
+    size, type = struct.unpack(">I4s", header[0:8])
+    start = offset + 8
+    # Size of 1 indicates a 64 bit size, size of 0 a box extending to the end
+    # of the file or the enclosing box.
+    if size == 1:
+        if len(header) < 16:
+            return None
+        size = struct.unpack(">Q", header[8:16])[0]
+        start = offset + 16
+    elif size == 0:
+        return (type, start, limit)
+    if offset + size < start:
+        return None
+    return (type, start, offset + size)
+
+
+def _children(read, start, end):
+    """Iterate over boxes contained in a box.
+
+    :param read: Callable read(offset, size).
+    :type read: callable
+    :param start: Start of the payload of the enclosing box.
+    :type start: int
+    :param end: End of the payload of the enclosing box.
+    :type end: int
+    :return: Tuples (type, start, end) of the contained boxes.
+    :rtype: iterable of tuple
+    """
+    offset = start
+    while True:
+        box = _box(read, offset, end)
+        if box is None or box[2] > end:
+            return
+        yield box
+        offset = box[2]
+
+
+def _movie(read, start, end):
+    """Read header data of the first video track from the movie box.
+
+    :param read: Callable read(offset, size).
+    :type read: callable
+    :param start: Start of the payload of the movie box.
+    :type start: int
+    :param end: End of the payload of the movie box.
+    :type end: int
+    :return: Header data. None if there is no video track.
+    :rtype: repository.mp4.MovieHeader
+    """
+    if end is None:
+        return None
+    creation_time = None
+    for type, box_start, box_end in _children(read, start, end):
+        if type == b"mvhd":
+            # Creation time of the movie as fallback for the track.
+            payload = read(box_start, 12)
+            if len(payload) == 12:
+                creation_time = _time(payload[0], payload[4:12])
+        elif type == b"trak":
+            header = _track(read, box_start, box_end)
+            if header is not None:
+                if header.creation_time is None:
+                    header = header._replace(creation_time=creation_time)
+                return header
+    return None
+
+
+def _track(read, start, end):
+    """Read header data of a video track from the track box.
+
+    :param read: Callable read(offset, size).
+    :type read: callable
+    :param start: Start of the payload of the track box.
+    :type start: int
+    :param end: End of the payload of the track box.
+    :type end: int
+    :return: Header data. None if the track is not a video track.
+    :rtype: repository.mp4.MovieHeader
+    """
+    header, handler = None, None
+    for type, box_start, box_end in _children(read, start, end):
+        if type == b"tkhd":
+            payload = read(box_start, 96)
+            # Fields following the times are shifted by 12 bytes in version 1.
+            shift = 12 if len(payload) > 0 and payload[0] == 1 else 0
+            if len(payload) < 84 + shift:
+                return None
+            a, b, _, c, d = struct.unpack(">iiiii", payload[40+shift:60+shift])
+            width, height = struct.unpack(">II", payload[76+shift:84+shift])
+            header = MovieHeader(width >> 16, height >> 16, (a / 65536, b / 65536, c / 65536, d / 65536),
+                                 _time(payload[0], payload[4:12]))
+        elif type == b"mdia":
+            for mdia_type, mdia_start, _ in _children(read, box_start, box_end):
+                # Handler type follows version, flags and pre-defined field.
+                if mdia_type == b"hdlr":
+                    handler = read(mdia_start + 8, 4)
+    if handler != VIDEO_HANDLER:
+        return None
+    return header
+
+
+def _time(version, value):
+    """Convert creation time of box to datetime.
+
+    :param version: Version of the box.
+    :type version: int
+    :param value: Raw creation time. 8 bytes in version 1, 4 bytes otherwise.
+    :type value: bytes
+    :return: Creation time in UTC. None if not set.
+    :rtype: datetime
+    """
+    seconds = struct.unpack(">Q", value[0:8])[0] if version == 1 else struct.unpack(">I", value[0:4])[0]
+    if seconds == 0:
+        return None
+    try:
+        return EPOCH + timedelta(seconds=seconds)
+    except OverflowError:
+        return None
@@ -3,11 +3,12 @@
 import logging
 import os.path
 import repository
+import subprocess
 import tempfile
 
 from datetime import datetime
 from rclone_python import rclone
-from repository import IoError, UuidError
+from repository import IoError
 
 
 class RepositoryFile(repository.RepositoryFile):
@@ -16,7 +17,13 @@ class RepositoryFile(repository.RepositoryFile):
     See repository.File for documentation of properties.
     """
 
-    def __init__(self, uuid, rep, index=None, index_lookup=True, extract_metadata=True):
+    # Partial reads via "rclone cat"
+    PARTIAL_READS = True
+
+    # Local cache file and its path
+    __slots__ = ('_cache_file', '_path')
+
+    def __init__(self, uuid, rep, index=None, index_lookup=True, extract_metadata=True, mdata=None):
         """Initialize the repository file.
 
         The python rclone wrapper does not distinguish between failure modes,
@@ -35,37 +42,42 @@ class RepositoryFile(repository.RepositoryFile):
         :param extract_metadata: Flag indicating whether file metadata shall be
             extracted from file if not available from index. Default is True.
         :type extract_metadata: bool
+        :param mdata: Optional metadata entry of the file. If specified,
+            metadata are not looked up from the index. Default is None.
+        :type mdata: repository.MetaData
         :raises: repository.IoError
         """
         # Call constructor of parent class.
-        super().__init__(uuid, rep, index, index_lookup)
+        super().__init__(uuid, rep, index, index_lookup, mdata, extract_metadata)
 
         # Basic initialization.
         self._cache_file = None
         self._path = None
 
-        # Set file name from uuid
-        self._name = os.path.basename(uuid)
+    def _load_metadata(self):
+        """Load file attributes and extract metadata if not in index.
 
+        :raises: repository.IoError
+        """
         # Attempt to determine last modification date.
-        if not self._in_index:
+        if not self._meta.in_index:
             try:
-                info = rclone.ls(f'"{os.path.join(rep.root, uuid)}"', max_depth=1)[0]
+                info = rclone.ls(f'"{os.path.join(self._rep.root, self._uuid)}"', max_depth=1)[0]
             except Exception as e:
-                raise IoError(f"An exception occurred while retrieving attributes of file {'uuid'}. {e}", e)
+                raise IoError(f"An exception occurred while retrieving attributes of file '{self._uuid}'. {e}", e)
             try:
                 last_modified = info.get('ModTime')
                 last_modified = datetime.strptime(last_modified, "%Y-%m-%dT%H:%M:%SZ")
-                self._last_modified = last_modified
+                self._meta.last_modified = last_modified
                 # We use the same value for the creation date since rclone
                 # does not report the creation date.
-                self._creation_date = last_modified
+                self._meta.creation_date = last_modified
             except (ValueError, TypeError):
                 logging.warn(f"Failed to convert last modified date string '{last_modified}' to datetime.")
                 last_modified = self.last_modified
 
         # Attempt to extract metadata from file content.
-        if not self._in_index and extract_metadata:
+        if not self._meta.in_index and self._extract:
             self.extract_metadata()
 
     def __del__(self):
@@ -99,17 +111,42 @@ class RepositoryFile(repository.RepositoryFile):
             except Exception as e:
                 raise repository.IoError(f"An exception occurred while downloading file '{self._uuid}' from rclone remote. {e}", e)
 
+    def _read_range(self, offset, size):
+        """Read part of the file content using "rclone cat".
+
+        :param offset: Offset of the first byte.
+        :type offset: int
+        :param size: Number of bytes.
+        :type size: int
+        :return: Up to size bytes. Fewer bytes only at the end of the file.
+        :rtype: bytes
+        :raises: repository.IoError
+        """
+        try:
+            result = subprocess.run(["rclone", "cat", "--offset", str(offset), "--count", str(size), os.path.join(self._rep.root, self._uuid)], capture_output=True, check=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise IoError(f"An exception occurred while reading file '{self._uuid}' from rclone remote. {e}", e)
+        return result.stdout
+
     def extract_metadata(self):
-        """Extract metadata from file content."""
+        """Extract metadata from file content.
+
+        Metadata are extracted from partial reads of the file content if
+        supported by the file format. The file is downloaded otherwise.
+        """
+        # Attempt to extract metadata from partial reads first.
+        logging.debug(f"Extracting metadata of file '{self.uuid}' from file content.")
+        data = self.extract_partial_metadata()
+        if data is not None:
+            self._assign_metadata(data)
+            return
         # Download file if file type is supported.
         if self.type in (repository.RepositoryFile.TYPE_IMAGE, repository.RepositoryFile.TYPE_VIDEO):
             self._download()
         # Attempt to extract metadata from file content.
-        logging.debug(f"Extracting metadata of file '{self.uuid}' from file content.")
         if self._type == repository.RepositoryFile.TYPE_IMAGE:
             self._extract_image_metadata(self._path)
         elif self._type == repository.RepositoryFile.TYPE_VIDEO:
-            self._download()
             self._extract_video_metadata(self._path)
 
     @property
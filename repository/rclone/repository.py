@@ -4,6 +4,7 @@ import logging
 import repository
 import tempfile
 
+from datetime import datetime
 from rclone_python import rclone
 from repository import ConfigError, IoError, check_param, check_valid_required
 
@@ -79,7 +80,35 @@ class Repository(repository.Repository):
         """
         return FileIterator(self, index_lookup, extract_metadata)
 
-    def file_by_uuid(self, uuid, index_lookup=True, extract_metadata=True):
+    def listing(self):
+        """Provide listing of all files in the repository.
+
+        Derives the file attributes from a single recursive rclone listing. No
+        file objects are created and no additional requests are made per file.
+
+        :return: Listing of files in the repository. See
+            repository.Repository.listing for the format of entries.
+        :rtype: iterable of dict
+        :raises: repository.IoError
+        """
+        try:
+            # See FileIterator for the choice of max_depth.
+            file_list = rclone.ls(f"'{self._root}'", max_depth=1000)
+        except Exception as e:
+            raise IoError(f"An exception occurred while listing the root directory. {e}", e)
+        for entry in file_list:
+            # Skip all directories.
+            if entry['IsDir']: continue
+            # Attempt to determine last modified date. Use the current date
+            # otherwise to enforce an update of the metadata.
+            try:
+                last_modified = datetime.strptime(entry.get('ModTime'), "%Y-%m-%dT%H:%M:%SZ")
+            except (ValueError, TypeError):
+                logging.warn(f"Failed to convert last modified date string '{entry.get('ModTime')}' to datetime.")
+                last_modified = datetime.today()
+            yield {'uuid': entry['Path'], 'last_modified': last_modified, 'size': entry.get('Size')}
+
+    def file_by_uuid(self, uuid, index_lookup=True, extract_metadata=True, mdata=None):
         """Return file within the repository by its UUID.
 
         Raises an IoError if the file with UUID does not exist/cannot be
@@ -93,11 +122,14 @@ class Repository(repository.Repository):
         :param extract_metadata: Flag indicating whether file metadata shall be
             extracted from file if not available from index. Default is True.
         :type extract_metadata: bool
+        :param mdata: Optional metadata entry of the file. If specified,
+            metadata are not looked up from the index. Default is None.
+        :type mdata: repository.MetaData
         :return: file with matching UUID
         :rtype: repository.RepositoryFile
         :raises: repository.IoError
         """
-        return RepositoryFile(uuid, self, self._index, index_lookup, extract_metadata)
+        return RepositoryFile(uuid, self, self._index, index_lookup, extract_metadata, mdata)
 
     @property
     def root(self):
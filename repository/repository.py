@@ -68,6 +68,36 @@ class Repository(ABC):
         """
         pass
 
+    def listing(self):
+        """Provide listing of all files in the repository.
+
+        The listing is used by repository.Index to reconcile the index with the
+        repository content without creating file objects. Each entry is a
+        dictionary with the following keys:
+            uuid (str): UUID of the file.
+            last_modified (datetime): Date of last file modification.
+            size (int): Size of the file in bytes. None if not available.
+            mtime_ns (int): Optional time of last file modification in
+                nanoseconds. Omitted or None if not available.
+            inode (int): Optional inode number of the file. Omitted or None if
+                not available.
+
+        The size and mtime_ns form the fingerprint of the file, which is
+        compared with the fingerprint stored in the index to detect modified
+        files. The inode is stored, but not compared, since network file
+        systems may assign new inode numbers after a remount. If mtime_ns is not available, the last modification
+        date is compared with the date of the last metadata update instead.
+
+        The default implementation derives the listing from the file iterator.
+        Sub-classes should provide a cheaper implementation if possible.
+
+        :return: Listing of files in the repository.
+        :rtype: iterable of dict
+        :raises: repository.IoError
+        """
+        for file in self.iterator(index_lookup=False, extract_metadata=False):
+            yield {'uuid': file.uuid, 'last_modified': file.last_modified, 'size': None}
+
     def __iter__(self):
         """Provide iterator which allows to traverse through all files in the repository.
 
@@ -105,7 +135,7 @@ class Repository(ABC):
             raise UuidError(f"There is no repository with UUID '{uuid}'", uuid)
 
     @abstractmethod
-    def file_by_uuid(self, uuid, index_lookup=True, extract_metadata=True):
+    def file_by_uuid(self, uuid, index_lookup=True, extract_metadata=True, mdata=None):
         """Return a file within the repository by its UUID. Raises a UuidError
         if the repository does not contain a file with the specified UUID.
 
@@ -116,6 +146,10 @@ class Repository(ABC):
         :param extract_metadata: True if metadata shall be extracted from the
           file if not available from the index.
         :type extract_metadata: bool
+        :param mdata: Optional metadata entry of the file, e.g. retrieved by an
+            index iterator. If specified, metadata are not looked up from the
+            index. Default is None.
+        :type mdata: repository.MetaData
         :return: File with matching UUID.
         :rtype: repository.RepositoryFile
         :raises: UuidError
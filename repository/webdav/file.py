@@ -1,13 +1,13 @@
 """Module for WebDAV repository files."""
 
 import logging
-import os
-import os.path
 import repository
 import tempfile
 
 from datetime import datetime
-from repository import IoError, UuidError
+from repository import IoError
+from webdav3.exceptions import ResponseErrorCode
+from webdav3.urn import Urn
 
 
 class RepositoryFile(repository.RepositoryFile):
@@ -16,7 +16,13 @@ class RepositoryFile(repository.RepositoryFile):
     See repository.File for documentation of properties.
     """
 
-    def __init__(self, uuid, rep, index=None, index_lookup=True, extract_metadata=True):
+    # Partial reads via HTTP range requests
+    PARTIAL_READS = True
+
+    # Local cache file and its path
+    __slots__ = ('_cache_file', '_path')
+
+    def __init__(self, uuid, rep, index=None, index_lookup=True, extract_metadata=True, mdata=None):
         """Initialize the repository file.
 
         :param rep: WebDAV repository
@@ -31,20 +37,25 @@ class RepositoryFile(repository.RepositoryFile):
         :param extract_metadata: Flag indicating whether file metadata shall be
             extracted from file if not available from index. Default is True.
         :type extract_metadata: bool
-        :raises: repository.UuidError, repository.IoError
+        :param mdata: Optional metadata entry of the file. If specified,
+            metadata are not looked up from the index. Default is None.
+        :type mdata: repository.MetaData
+        :raises: repository.IoError
         """
         # Call constructor of parent class.
-        super().__init__(uuid, rep, index, index_lookup)
+        super().__init__(uuid, rep, index, index_lookup, mdata, extract_metadata)
 
         # Basic initialization.
         self._cache_file = None
         self._path = None
 
-        # Set file name from uuid
-        self._name = os.path.basename(uuid)
+    def _load_metadata(self):
+        """Load file attributes and extract metadata if not in index.
 
+        :raises: repository.IoError
+        """
         # Attempt to determine last modification and file creation date.
-        if not self._in_index:
+        if not self._meta.in_index:
             # Attempt to retrieve file attributes.
             try:
                 info = self._rep.client.info(self.uuid)
@@ -54,7 +65,7 @@ class RepositoryFile(repository.RepositoryFile):
             try:
                 modified = info.get('modified')
                 last_modified = datetime.strptime(modified, "%a, %d %b %Y %H:%M:%S %Z")
-                self._last_modified = last_modified
+                self._meta.last_modified = last_modified
             except (ValueError, TypeError):
                 logging.warn(f"Failed to convert last modified date string '{modified}' to datetime.")
                 last_modified = self.last_modified
@@ -62,12 +73,12 @@ class RepositoryFile(repository.RepositoryFile):
             try:
                 created = info.get('created')
                 creation_date = datetime.strptime(created, "%a, %d %b %Y %H:%M:%S %Z")
-                self._creation_date = creation_date
+                self._meta.creation_date = creation_date
             except (ValueError, TypeError):
                 logging.warn(f"Failed to convert created date string '{created}' to datetime.")
 
         # Attempt to extract metadata from file content.
-        if not self._in_index and extract_metadata:
+        if not self._meta.in_index and self._extract:
             self.extract_metadata()
 
     def __del__(self):
@@ -101,17 +112,83 @@ class RepositoryFile(repository.RepositoryFile):
             except Exception as e:
                 raise repository.IoError(f"An exception occurred while downloading file '{self._uuid}' from WebDAV repository. {e}", e)
 
+    def _read_range(self, offset, size):
+        """Read part of the file content using an HTTP range request.
+
+        If the server does not support range requests, the repository is
+        marked accordingly and the file is downloaded once. Parts are read from
+        the local cache file in this case.
+
+        :param offset: Offset of the first byte.
+        :type offset: int
+        :param size: Number of bytes.
+        :type size: int
+        :return: Up to size bytes. Fewer bytes only at the end of the file.
+        :rtype: bytes
+        :raises: repository.IoError
+        """
+        # Read from local cache file if already downloaded or if the server
+        # does not support range requests.
+        if self._cache_file is not None or not self._rep.range_requests:
+            return self._read_cache(offset, size)
+        try:
+            response = self._rep.client.execute_request('download', Urn(self._uuid).quote(), headers_ext=[f"Range: bytes={offset}-{offset + size - 1}"])
+        except ResponseErrorCode as e:
+            # Range starts beyond the end of the file.
+            if e.code == 416: return b""
+            raise IoError(f"An exception occurred while reading file '{self._uuid}' from WebDAV repository. {e}", e)
+        except Exception as e:
+            raise IoError(f"An exception occurred while reading file '{self._uuid}' from WebDAV repository. {e}", e)
+        try:
+            if response.status_code == 206:
+                return response.content[:size]
+        finally:
+            response.close()
+        # Server ignored the range. Avoid further range requests.
+        logging.info(f"WebDAV server of repository '{self._rep.uuid}' does not support range requests. Files will be downloaded.")
+        self._rep.range_requests = False
+        return self._read_cache(offset, size)
+
+    def _read_cache(self, offset, size):
+        """Read part of the file content from the local cache file.
+
+        Downloads the file if not done yet.
+
+        :param offset: Offset of the first byte.
+        :type offset: int
+        :param size: Number of bytes.
+        :type size: int
+        :return: Up to size bytes. Fewer bytes only at the end of the file.
+        :rtype: bytes
+        :raises: repository.IoError
+        """
+        self._download()
+        try:
+            with open(self._path, "rb") as file:
+                file.seek(offset)
+                return file.read(size)
+        except OSError as e:
+            raise IoError(f"An exception occurred while reading local cache file of '{self._uuid}'. {e}", e)
+
     def extract_metadata(self):
-        """Extract metadata from file content."""
+        """Extract metadata from file content.
+
+        Metadata are extracted from partial reads of the file content if
+        supported by the file format. The file is downloaded otherwise.
+        """
+        # Attempt to extract metadata from partial reads first.
+        logging.debug(f"Extracting metadata of file '{self.uuid}' from file content.")
+        data = self.extract_partial_metadata()
+        if data is not None:
+            self._assign_metadata(data)
+            return
         # Download file if file type is supported.
         if self.type in (repository.RepositoryFile.TYPE_IMAGE, repository.RepositoryFile.TYPE_VIDEO):
             self._download()
         # Attempt to extract metadata from file content.
-        logging.debug(f"Extracting metadata of file '{self.uuid}' from file content.")
         if self._type == repository.RepositoryFile.TYPE_IMAGE:
             self._extract_image_metadata(self._path)
         elif self._type == repository.RepositoryFile.TYPE_VIDEO:
-            self._download()
             self._extract_video_metadata(self._path)
 
     @property
@@ -4,6 +4,7 @@ import logging
 import repository
 import tempfile
 
+from datetime import datetime
 from repository import ConfigError, IoError, check_param, check_valid_required
 from webdav3.client import Client
 
@@ -36,6 +37,9 @@ class Repository(repository.Repository):
         self._user = config['user']
         self._password = config['password']
         self._root = config.get('root', "/")
+        # Servers are assumed to support range requests until a response
+        # without partial content is received.
+        self._range_requests = True
 
         # Create temporary directory for file caching.
         self._cache_dir = tempfile.TemporaryDirectory(dir=config['cache'], prefix=f"{uuid}-")
@@ -72,6 +76,24 @@ class Repository(repository.Repository):
         """
         return self._cache_dir.name
 
+    @property
+    def range_requests(self):
+        """Return whether the server supports HTTP range requests.
+
+        :return: True if range requests are supported
+        :rtype: bool
+        """
+        return self._range_requests
+
+    @range_requests.setter
+    def range_requests(self, value):
+        """Set whether the server supports HTTP range requests.
+
+        :param value: True if range requests are supported
+        :type value: bool
+        """
+        self._range_requests = value
+
     @property
     def client(self):
         """Return WebDAV client session of the repository.
@@ -104,7 +126,44 @@ class Repository(repository.Repository):
         """
         return FileIterator(self, index_lookup, extract_metadata)
 
-    def file_by_uuid(self, uuid, index_lookup=True, extract_metadata=True):
+    def listing(self):
+        """Provide listing of all files in the repository.
+
+        Derives the file attributes from the WebDAV directory listings. No file
+        objects are created and no additional requests are made per file.
+
+        :return: Listing of files in the repository. See
+            repository.Repository.listing for the format of entries.
+        :rtype: iterable of dict
+        :raises: repository.IoError
+        """
+        dir_list = [self._root]
+        while len(dir_list) > 0:
+            dir = dir_list.pop()
+            try:
+                file_list = self._client.list(dir, get_info=True)
+            except Exception as e:
+                raise IoError(f"An exception occurred while listing directory '{dir}'. {e}", e)
+            for entry in file_list:
+                # Save all sub-directories for later.
+                if entry['isdir']:
+                    dir_list.append(entry['path'])
+                    continue
+                # Attempt to determine last modified date. Use the current
+                # date otherwise to enforce an update of the metadata.
+                try:
+                    last_modified = datetime.strptime(entry.get('modified'), "%a, %d %b %Y %H:%M:%S %Z")
+                except (ValueError, TypeError):
+                    logging.warn(f"Failed to convert last modified date string '{entry.get('modified')}' to datetime.")
+                    last_modified = datetime.today()
+                # Attempt to determine file size.
+                try:
+                    size = int(entry.get('size'))
+                except (ValueError, TypeError):
+                    size = None
+                yield {'uuid': entry['path'], 'last_modified': last_modified, 'size': size}
+
+    def file_by_uuid(self, uuid, index_lookup=True, extract_metadata=True, mdata=None):
         """Return file within the repository by its UUID.
 
         :param uuid: UUID of file
@@ -115,11 +174,14 @@ class Repository(repository.Repository):
         :param extract_metadata: Flag indicating whether file metadata shall be
             extracted from file if not available from index. Default is True.
         :type extract_metadata: bool
+        :param mdata: Optional metadata entry of the file. If specified,
+            metadata are not looked up from the index. Default is None.
+        :type mdata: repository.MetaData
         :return: file with matching UUID
         :rtype: repository.RepositoryFile
         :raises: repository.UuidError, repository.IoError
         """
-        return RepositoryFile(uuid, self, self._index, index_lookup, extract_metadata)
+        return RepositoryFile(uuid, self, self._index, index_lookup, extract_metadata, mdata)
 
 
 class FileIterator(repository.FileIterator):
@@ -0,0 +1,83 @@
+"""Shared fixtures of the test suite."""
+
+import itertools
+import os
+import sys
+
+import pytest
+
+from datetime import datetime, timedelta
+
+# Make packages importable when running pytest from any directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from repository import Index
+from repository.local import Repository
+
+
+# Counter used to create unique repository UUIDs.
+_counter = itertools.count()
+
+
+def write_jpeg(path, width=8, height=6, date=None, description=None, rating=None, coordinates=None, orientation=None):
+    """Write JPEG image with EXIF metadata.
+
+    :param path: Path of the image.
+    :type path: str
+    :param coordinates: Optional latitude and longitude in degrees.
+    :type coordinates: tuple of float
+    """
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    if description is not None:
+        exif[0x010E] = description
+    if date is not None:
+        exif[0x0132] = date.strftime("%Y:%m:%d %H:%M:%S")
+    if coordinates is not None:
+        def dms(value):
+            value = abs(value)
+            return (int(value), int(value * 60) % 60, round(value * 3600 % 60, 4))
+        latitude, longitude = coordinates
+        exif[0x8825] = {1: 'N' if latitude >= 0 else 'S', 2: dms(latitude), 3: 'E' if longitude >= 0 else 'W', 4: dms(longitude)}
+    Image.new("RGB", (width, height), (128, 64, 32)).save(path, exif=exif.tobytes())
+
+
+def write_places(path, places):
+    """Write places (name, latitude, longitude, country, region) in GeoNames format."""
+    with open(path, "w", encoding="utf-8") as file:
+        for i, (name, lat, lon, country, region) in enumerate(places):
+            fields = [str(i), name, name, "", str(lat), str(lon), "P", "PPL", country, "", region, "", "", "", "0", "", "0", "UTC", "2020-01-01"]
+            file.write("\t".join(fields) + "\n")
+
+
+@pytest.fixture
+def library(tmp_path):
+    """Return factory of indexed local repositories.
+
+    The factory creates count JPEG images named f0000.jpg, f0001.jpg, ... with
+    creation dates one hour apart unless dates are specified and optional
+    coordinates, builds the index and returns the index and the repository.
+    Keyword arguments are passed on to Index.
+    """
+    created = list()
+
+    def create(count, dates=None, coordinates=None, **kwargs):
+        number = next(_counter)
+        root = tmp_path / f"rep{number}"
+        root.mkdir()
+        for i in range(count):
+            date = dates[i] if dates is not None else datetime(2020, 1, 1) + timedelta(hours=i)
+            write_jpeg(str(root / f"f{i:04d}.jpg"), date=date, coordinates=coordinates[i] if coordinates is not None else None)
+        kwargs.setdefault('workers', 1)
+        index = Index(str(tmp_path / f"index{number}.sqlite"), **kwargs)
+        rep = Repository(f"test{number}", {'root': str(root)}, index)
+        index.build(rep)
+        created.append((index, rep))
+        return index, rep
+
+    yield create
+    for index, rep in created:
+        index.close()
@@ -0,0 +1,109 @@
+"""Tests of the reconciliation of the index with repository listings."""
+
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from datetime import datetime, timedelta
+
+from conftest import write_jpeg
+from repository import Index
+
+
+@pytest.fixture
+def extracted(monkeypatch):
+    """Record UUIDs of files, for which metadata are extracted.
+
+    Apply before creating the library and clear after the initial build.
+    """
+    uuids = list()
+    extract = Index._extract
+
+    def record(self, rep, changed):
+        uuids.extend(row.file_uuid for row in changed)
+        return extract(self, rep, changed)
+
+    monkeypatch.setattr(Index, "_extract", record)
+    return uuids
+
+
+def rows(index):
+    """Return file UUIDs and deletion flags of all entries."""
+    conn = sqlite3.connect(index._dbname)
+    try:
+        return dict(conn.execute("SELECT file_uuid, deleted IS NOT NULL FROM files"))
+    finally:
+        conn.close()
+
+
+def test_unchanged_files_are_not_extracted(library, extracted):
+    index, rep = library(5)
+    extracted.clear()
+    generation = index.generation
+    index.build(rep)
+    assert extracted == []
+    assert index.count() == 5
+    assert index.generation == generation
+
+
+def test_modified_file_is_extracted(library, extracted):
+    index, rep = library(5)
+    extracted.clear()
+    path = os.path.join(rep.root, "f0002.jpg")
+    write_jpeg(path, description="Updated")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    index.build(rep)
+    assert extracted == ["f0002.jpg"]
+    assert index.stats(search="updated")['count'] == 1
+
+
+def test_deleted_file_becomes_tombstone(library, extracted, tmp_path):
+    index, rep = library(5)
+    extracted.clear()
+    path = os.path.join(rep.root, "f0001.jpg")
+    os.rename(path, tmp_path / "moved.jpg")
+    index.build(rep)
+    assert index.count() == 4
+    assert rows(index)["f0001.jpg"] == 1
+    assert "f0001.jpg" not in [file.name for file in index.iterator(order="name")]
+    # Tombstone is restored without extracting metadata again.
+    os.rename(tmp_path / "moved.jpg", path)
+    index.build(rep)
+    assert index.count() == 5
+    assert rows(index)["f0001.jpg"] == 0
+    assert extracted == []
+
+
+def test_expired_tombstones_are_purged(library):
+    index, rep = library(3)
+    os.remove(os.path.join(rep.root, "f0000.jpg"))
+    index.build(rep)
+    conn = sqlite3.connect(index._dbname)
+    expired = datetime.today() - timedelta(days=Index.TOMBSTONE_RETENTION + 1)
+    conn.execute("UPDATE files SET deleted = ? WHERE file_uuid = 'f0000.jpg'", (expired.isoformat(" "),))
+    conn.commit()
+    conn.close()
+    index.build(rep)
+    assert sorted(rows(index)) == ["f0001.jpg", "f0002.jpg"]
+
+
+def test_new_inode_does_not_modify_file(library, extracted, tmp_path):
+    index, rep = library(3)
+    extracted.clear()
+    # Copies with preserved modification time get new inode numbers as files
+    # on network file systems after a remount.
+    path = os.path.join(rep.root, "f0001.jpg")
+    shutil.copy2(path, tmp_path / "copy.jpg")
+    os.remove(path)
+    index.build(rep)
+    assert rows(index)["f0001.jpg"] == 1
+    shutil.copy2(tmp_path / "copy.jpg", path)
+    index.build(rep)
+    assert rows(index)["f0001.jpg"] == 0
+    os.replace(path, tmp_path / "other.jpg")
+    shutil.copy2(tmp_path / "other.jpg", path)
+    index.build(rep)
+    assert extracted == []
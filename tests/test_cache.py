@@ -0,0 +1,31 @@
+"""Tests of the cache of query results."""
+
+import os
+
+from conftest import write_jpeg
+from repository import Index
+
+
+def test_cached_stats_invalidated_by_build(library):
+    index, rep = library(5)
+    assert index.stats()['count'] == 5
+    generation = index.generation
+    write_jpeg(os.path.join(rep.root, "new.jpg"))
+    index.build(rep)
+    assert index.generation > generation
+    assert index.stats()['count'] == 6
+
+
+def test_generation_shared_between_instances(library):
+    index, rep = library(5)
+    other = Index(index._dbname, workers=1)
+    try:
+        assert other.generation == index.generation
+        assert other.stats()['count'] == 5
+        write_jpeg(os.path.join(rep.root, "new.jpg"))
+        index.build(rep)
+        # Results cached by the other instance are discarded.
+        assert other.generation == index.generation
+        assert other.stats()['count'] == 6
+    finally:
+        other.close()
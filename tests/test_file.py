@@ -0,0 +1,55 @@
+"""Tests of repository file handles."""
+
+import pytest
+
+from datetime import datetime
+
+from conftest import write_jpeg
+from repository import RepositoryFile, UuidError
+from repository.local import Repository
+from repository.local.file import RepositoryFile as LocalFile
+
+
+@pytest.fixture
+def rep(tmp_path):
+    write_jpeg(str(tmp_path / "a.jpg"), width=40, height=30, date=datetime(2021, 5, 6, 7, 8, 9), description="Lake")
+    (tmp_path / "b.mov").write_bytes(b"")
+    (tmp_path / "c.txt").write_text("text")
+    return Repository(tmp_path.name, {'root': str(tmp_path)})
+
+
+def test_type_from_extension(rep):
+    assert LocalFile("a.jpg", rep).type == RepositoryFile.TYPE_IMAGE
+    assert LocalFile("b.mov", rep).type == RepositoryFile.TYPE_VIDEO
+    assert LocalFile("c.txt", rep).type == RepositoryFile.TYPE_UNKNOWN
+
+
+def test_metadata_loaded_on_first_access(rep, monkeypatch):
+    calls = list()
+    extract = LocalFile.extract_metadata
+    monkeypatch.setattr(LocalFile, "extract_metadata", lambda self: calls.append(self.uuid) or extract(self))
+    file = LocalFile("a.jpg", rep)
+    assert calls == []
+    assert (file.width, file.height, file.description) == (40, 30, "Lake")
+    assert file.creation_date == datetime(2021, 5, 6, 7, 8, 9)
+    assert calls == ["a.jpg"]
+
+
+def test_metadata_not_extracted_if_disabled(rep):
+    file = LocalFile("a.jpg", rep, extract_metadata=False)
+    assert file.width != 40
+    assert file.last_modified is not None
+
+
+def test_handle_has_no_instance_dict(rep):
+    file = LocalFile("a.jpg", rep)
+    assert not hasattr(file, "__dict__")
+    with pytest.raises(AttributeError):
+        file.unknown = 1
+
+
+def test_missing_file_raises_uuid_error(rep):
+    with pytest.raises(UuidError):
+        LocalFile("missing.jpg", rep)
+    with pytest.raises(UuidError):
+        LocalFile(".", rep)
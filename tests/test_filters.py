@@ -0,0 +1,134 @@
+"""Tests of the filter criteria and statistics of the index."""
+
+import itertools
+
+import pytest
+
+from datetime import date, datetime, time, timedelta
+
+from conftest import write_jpeg
+from repository import ConfigError, Index, RepositoryFile
+from repository.index import calendar_keys
+from repository.local import Repository
+
+
+# Counter used to create unique repository UUIDs.
+_counter = itertools.count()
+
+@pytest.fixture
+def index(tmp_path):
+    """Return index of two repositories with files of varying metadata.
+
+    The UUIDs of the repositories are available as attribute uuids.
+    """
+    files = {
+        'first': [
+            ("a.jpg", 40, 30, datetime(2020, 6, 15, 10), (47.37, 8.54)),
+            ("b.jpg", 30, 40, datetime(2020, 6, 15, 23), (46.95, 7.45)),
+            ("c.jpg", 100, 50, datetime(2021, 6, 15), (40.71, -74.0)),
+            ("d.jpg", 8, 6, datetime(2022, 1, 1), None),
+        ],
+        'second': [
+            ("e.jpg", 8, 6, datetime(2019, 1, 1), None),
+        ],
+    }
+    index = Index(str(tmp_path / "index.sqlite"), workers=1)
+    number = next(_counter)
+    index.uuids = {name: f"filters{number}-{name}" for name in files}
+    for name, entries in files.items():
+        root = tmp_path / name
+        root.mkdir()
+        for file, width, height, created, coordinates in entries:
+            write_jpeg(str(root / file), width=width, height=height, date=created, coordinates=coordinates)
+        index.build(Repository(index.uuids[name], {'root': str(root)}, index))
+    yield index
+    index.close()
+
+
+def test_stats(index):
+    stats = index.stats()
+    assert stats == {
+        'count': 5,
+        'types': {RepositoryFile.TYPE_IMAGE: 5},
+        'orientations': {RepositoryFile.ORIENTATION_LANDSCAPE: 4, RepositoryFile.ORIENTATION_PORTRAIT: 1},
+        'repositories': {index.uuids['first']: 4, index.uuids['second']: 1},
+    }
+    assert index.stats(repositories=[index.uuids['second']])['count'] == 1
+    assert index.stats(orientation=RepositoryFile.ORIENTATION_PORTRAIT)['count'] == 1
+    # Order criteria do not affect statistics.
+    assert index.stats(order="date", direction="descending") == stats
+    assert index.iterator(types=[RepositoryFile.TYPE_VIDEO]).length == 0
+
+
+@pytest.mark.parametrize("criteria, count", [
+    ({'date_from': "2020-06-15", 'date_to': "2020-06-15"}, 2),
+    ({'date_from': date(2020, 6, 15), 'date_to': datetime(2020, 6, 15, 12)}, 1),
+    ({'date_from': "2021-01-01"}, 2),
+    ({'date_to': "2019-12-31"}, 1),
+    ({'min_width': 30}, 3),
+    ({'min_height': 40}, 2),
+    ({'min_width': 30, 'min_height': 40}, 2),
+    ({'most_recent': 2}, 2),
+    ({'most_recent': 2, 'repositories': "second"}, 1),
+])
+def test_range_filters(index, criteria, count):
+    if 'repositories' in criteria:
+        criteria = dict(criteria, repositories=index.uuids[criteria['repositories']])
+    assert index.stats(**criteria)['count'] == count
+    assert index.iterator(order="date", **criteria).length == count
+
+
+@pytest.mark.parametrize("criteria", [
+    {'date_from': "15.06.2020"},
+    {'min_rating': 6},
+    {'min_width': 0},
+])
+def test_invalid_range_filters(index, criteria):
+    with pytest.raises(ConfigError):
+        index.stats(**criteria)
+
+
+@pytest.mark.parametrize("near, count", [
+    ((47.37, 8.54, 10), 1),
+    ((47.37, 8.54, 100), 2),
+    ((47.37, 8.54, 90), 1),
+    ((40.71, -74.0, 1), 1),
+    ((0, 0, 1000), 0),
+])
+def test_near(index, near, count):
+    assert index.stats(near=near)['count'] == count
+
+
+def test_near_across_antimeridian_and_poles(library):
+    coordinates = [(10.0, 179.95), (10.0, -179.95), (89.95, 0.0), (89.95, 180.0), (10.0, 0.0)]
+    index, rep = library(len(coordinates), coordinates=coordinates)
+    assert index.stats(near=(10.0, 180.0, 10))['count'] == 2
+    assert index.stats(near=(90.0, 0.0, 10))['count'] == 2
+    with pytest.raises(ConfigError):
+        index.stats(near=(91.0, 0.0, 10))
+
+
+def past_date(year, function):
+    """Return first valid date returned by function for years before year."""
+    for year in range(year - 1, year - 10, -1):
+        try:
+            return datetime.combine(function(year), time(12))
+        except ValueError:
+            pass
+
+
+def test_on_this_day(library):
+    today = date.today()
+    month_day, week = calendar_keys(today)
+    dates = [
+        past_date(today.year, lambda year: date(year, today.month, today.day)),
+        past_date(today.year, lambda year: date.fromisocalendar(year, week, 7)),
+        past_date(today.year, lambda year: date(year, today.month, today.day)) - timedelta(days=200),
+        # Files of the current year are excluded.
+        datetime.combine(today, time(0)),
+    ]
+    index, rep = library(len(dates), dates=dates)
+    for period, key in (("day", 0), ("week", 1)):
+        expected = [f"f{i:04d}.jpg" for i, created in enumerate(dates[:3]) if calendar_keys(created)[key] == (month_day, week)[key]]
+        assert sorted(file.name for file in index.iterator(on_this_day=period)) == expected
+        assert len(expected) >= 1
@@ -0,0 +1,77 @@
+"""Tests of the caching of reverse geocoding results."""
+
+from collections import namedtuple
+
+import pytest
+
+import repository.index
+
+from conftest import write_places
+from repository import Index
+from repository.geocoder import OfflineGeocoder
+
+
+# Result of the online geocoding service
+Address = namedtuple("Address", ("address",))
+
+
+class Geolocator:
+    """Stub of the online geocoding service counting requests."""
+
+    def __init__(self, fail=False):
+        self.requests = 0
+        self.fail = fail
+
+    def reverse(self, coordinates, exactly_one=True, language=None):
+        self.requests = self.requests + 1
+        if self.fail:
+            raise repository.index.GeopyError("Service not reachable.")
+        return Address(f"{coordinates[0]:.2f}, {coordinates[1]:.2f}")
+
+
+@pytest.fixture
+def geolocator(monkeypatch):
+    geolocator = Geolocator()
+    monkeypatch.setattr(repository.index, "geolocator", geolocator)
+    monkeypatch.setattr(Index, "GEOCODE_DELAY", 0)
+    return geolocator
+
+
+def test_geocode_limits_requests(library, geolocator):
+    # Files in five different grid cells.
+    index, rep = library(5, coordinates=[(48.0 + i, 11.0) for i in range(5)], geocoder_limit=2)
+    assert index.geocode(language="en") == 3
+    assert geolocator.requests == 2
+    assert index.geocode(language="en") == 1
+    assert index.geocode(language="en") == 0
+    assert geolocator.requests == 5
+    assert index.location(48.0, 11.0, language="en") is not None
+    # Cached cells are not looked up again.
+    assert index.geocode(language="en") == 0
+    assert geolocator.requests == 5
+
+
+def test_geocode_stops_at_first_error(library, geolocator):
+    index, rep = library(3, coordinates=[(10.0 + i, 20.0) for i in range(3)])
+    geolocator.fail = True
+    assert index.geocode(language="en") == 3
+    assert geolocator.requests == 1
+
+
+def test_geocode_disabled(library, geolocator):
+    index, rep = library(2, coordinates=[(10.0, 20.0), (11.0, 20.0)], geocoder_fallback=False)
+    assert index.geocode(language="en") == 0
+    assert geolocator.requests == 0
+
+
+def test_geocode_skips_cells_resolved_offline(library, geolocator, tmp_path):
+    path = str(tmp_path / "cities.txt")
+    write_places(path, [("Zurich", 47.37, 8.54, "CH", "ZH")])
+    geocoder = OfflineGeocoder(path)
+    index, rep = library(2, coordinates=[(47.37, 8.54), (10.0, 20.0)], geocoder=geocoder)
+    assert index.location(47.37, 8.54, language="en") == "Zurich, ZH, CH"
+    assert index.location(10.0, 20.0, language="en") is None
+    assert index.geocode(language="en") == 0
+    assert geolocator.requests == 1
+    assert index.location(10.0, 20.0, language="en") == "10.00, 20.00"
+    geocoder.close()
@@ -0,0 +1,79 @@
+"""Tests of the offline reverse geocoder."""
+
+import math
+import os
+import random
+
+import pytest
+
+from conftest import write_places
+from repository import IoError
+from repository.geocoder import OfflineGeocoder
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Return great-circle distance in km."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2)**2
+    return 2 * OfflineGeocoder.EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+@pytest.fixture
+def places(tmp_path):
+    rng = random.Random(1)
+    places = [(f"P{i}", round(rng.uniform(-60, 60), 4), round(rng.uniform(-180, 180), 4), "XX", "01") for i in range(2000)]
+    # Places on both sides of the antimeridian and close to a pole.
+    places += [("East", 0.0, 179.9, "XX", "01"), ("West", 0.0, -179.9, "XX", "01"), ("Pole", 89.9, 0.0, "XX", "01")]
+    path = str(tmp_path / "cities.txt")
+    write_places(path, places)
+    return path, places
+
+
+def test_nearest_place(places):
+    path, places = places
+    geocoder = OfflineGeocoder(path)
+    try:
+        rng = random.Random(2)
+        queries = [(lat + rng.uniform(-0.3, 0.3), lon + rng.uniform(-0.3, 0.3)) for _, lat, lon, _, _ in places[:200]]
+        queries += [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(200)]
+        queries += [(0.0, 179.99), (0.0, -179.99), (90.0, 123.0)]
+        for lat, lon in queries:
+            nearest = min(places, key=lambda place: distance(lat, lon, place[1], place[2]))
+            expected = f"{nearest[0]}, 01, XX" if distance(lat, lon, nearest[1], nearest[2]) <= OfflineGeocoder.MAX_DISTANCE else None
+            assert geocoder.reverse(lat, lon) == expected
+    finally:
+        geocoder.close()
+
+
+def test_region_and_country_names(tmp_path):
+    path = str(tmp_path / "cities.txt")
+    write_places(path, [("Zürich", 47.37, 8.54, "CH", "ZH")])
+    (tmp_path / "admin1CodesASCII.txt").write_text("CH.ZH\tZurich\tZurich\t2657895\n", encoding="utf-8")
+    (tmp_path / "countryInfo.txt").write_text("#ISO\tISO3\tISO-Numeric\tfips\tCountry\nCH\tCHE\t756\tSZ\tSwitzerland\n", encoding="utf-8")
+    geocoder = OfflineGeocoder(path)
+    assert geocoder.reverse(47.4, 8.5) == "Zürich, Zurich, Switzerland"
+    assert geocoder.reverse(46.0, 8.5) is None
+    geocoder.close()
+
+
+def test_tree_rebuilt_if_dataset_is_newer(tmp_path):
+    path = str(tmp_path / "cities.txt")
+    write_places(path, [("Old", 10.0, 10.0, "XX", "01")])
+    OfflineGeocoder(path).close()
+    write_places(path, [("New", 10.0, 10.0, "XX", "01")])
+    os.utime(path, (os.path.getmtime(path) + 10, os.path.getmtime(path) + 10))
+    geocoder = OfflineGeocoder(path)
+    assert geocoder.reverse(10.0, 10.0) == "New, 01, XX"
+    geocoder.close()
+
+
+def test_invalid_tree(tmp_path):
+    path = str(tmp_path / "cities.txt")
+    write_places(path, [("A", 10.0, 10.0, "XX", "01")])
+    with open(path + ".kdtree", "wb") as file:
+        file.write(b"INVALID!" + bytes(8))
+    os.utime(path, (0, 0))
+    with pytest.raises(IoError):
+        OfflineGeocoder(path)
+    with pytest.raises(IoError):
+        OfflineGeocoder(str(tmp_path / "missing.txt"))
@@ -0,0 +1,144 @@
+"""Tests of the index iterator orders."""
+
+import os
+
+import pytest
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+from repository.index import AliasTable, IndexIterator
+
+
+def test_shuffle_beyond_window(library):
+    index, rep = library(IndexIterator.WINDOW_SIZE + 250)
+    iterator = index.iterator(order="shuffle")
+    assert iterator.length == IndexIterator.WINDOW_SIZE + 250
+    names = [next(iterator).name for _ in range(iterator.length)]
+    assert len(set(names)) == iterator.length
+
+
+def test_shuffle_previous(library):
+    index, rep = library(IndexIterator.WINDOW_SIZE + 250)
+    iterator = index.iterator(order="shuffle")
+    names = [next(iterator).name for _ in range(300)]
+    assert iterator.previous().name == names[-2]
+    assert iterator.previous(200).name == names[-202]
+    assert next(iterator).name == names[-201]
+
+
+def test_shuffle_resumes_without_repetition(library):
+    index, rep = library(IndexIterator.WINDOW_SIZE + 50)
+    iterator = index.iterator(order="shuffle")
+    first = [next(iterator).name for _ in range(100)]
+    rest = [file.name for file in index.iterator(order="shuffle")]
+    assert sorted(first + rest) == sorted(f"f{i:04d}.jpg" for i in range(IndexIterator.WINDOW_SIZE + 50))
+
+
+def test_date_order_pages_beyond_window(library):
+    count = IndexIterator.WINDOW_SIZE + 2 * IndexIterator.PAGE_SIZE + 7
+    # Pairs of files share creation dates, which are ordered by id.
+    dates = [datetime(2020, 1, 1) + timedelta(hours=(count - i) // 2) for i in range(count)]
+    index, rep = library(count, dates=dates)
+    expected = [f"f{i:04d}.jpg" for i in sorted(range(count), key=lambda i: (dates[i], i))]
+    iterator = index.iterator(order="date")
+    assert iterator.length == count
+    assert [file.name for file in iterator] == expected
+    iterator = index.iterator(order="date", direction="descending")
+    assert [file.name for file in iterator] == expected[::-1]
+
+
+def test_name_order_previous_across_pages(library):
+    count = IndexIterator.WINDOW_SIZE + 100
+    index, rep = library(count)
+    iterator = index.iterator(order="name", direction="descending")
+    names = [next(iterator).name for _ in range(count)]
+    assert names == sorted(names, reverse=True)
+    with pytest.raises(StopIteration):
+        next(iterator)
+    # Step back beyond the window and forth again.
+    assert iterator.previous(count - 1).name == names[0]
+    assert [next(iterator).name for _ in range(IndexIterator.WINDOW_SIZE + 10)] == names[1:IndexIterator.WINDOW_SIZE + 11]
+    assert iterator.previous().name == names[IndexIterator.WINDOW_SIZE + 9]
+    with pytest.raises(StopIteration):
+        index.iterator(order="name").previous()
+
+
+def test_random_order_covers_all_files(library):
+    index, rep = library(60)
+    names = [file.name for file in index.iterator(order="random")]
+    assert sorted(names) == [f"f{i:04d}.jpg" for i in range(60)]
+    # Cached ids are copied before being shuffled.
+    assert sorted(file.name for file in index.iterator(order="random")) == sorted(names)
+    iterator = index.iterator(order="random")
+    first = [next(iterator).name for _ in range(10)]
+    assert iterator.previous(5).name == first[4]
+
+
+def test_smart_order_series(library):
+    dates = [datetime(2020, 1, 1) + timedelta(hours=i) for i in range(5)] + [datetime(2020, 3, 1) + timedelta(hours=i) for i in range(6)]
+    # Last two files of the first day are located far away.
+    coordinates = [(47.37, 8.54)] * 3 + [(40.71, -74.0)] * 2 + [(47.37, 8.54)] * 6
+    index, rep = library(len(dates), dates=dates, coordinates=coordinates)
+    names = [f"f{i:04d}.jpg" for i in range(len(dates))]
+    for _ in range(20):
+        # Series end before gaps of more than smart_time hours or after
+        # smart_limit files.
+        series = [file.name for file in index.iterator(order="smart", smart_limit=4, smart_time=24)]
+        cluster = names[:5] if series[0] in names[:5] else names[5:]
+        start = cluster.index(series[0])
+        assert series == cluster[start:start + 4]
+        # Series end before files more than smart_distance km away.
+        series = [file.name for file in index.iterator(order="smart", smart_limit=10, smart_time=24, smart_distance=100)]
+        cluster = next(cluster for cluster in (names[:3], names[3:5], names[5:]) if series[0] in cluster)
+        assert series == cluster[cluster.index(series[0]):]
+
+
+def test_alias_table_distribution():
+    table = AliasTable([10, 20, 30], [1, 2, 7])
+    draws = Counter(table.draw() for _ in range(20000))
+    assert len(table) == 3
+    assert draws[30] / 20000 == pytest.approx(0.7, abs=0.03)
+    assert draws[10] / 20000 == pytest.approx(0.1, abs=0.03)
+
+
+def test_weighted_order_favors_recent_files(library):
+    dates = [datetime.now() - timedelta(days=1)] + [datetime(2000, 1, 1)] * 9
+    index, rep = library(len(dates), dates=dates)
+    names = list()
+    for _ in range(40):
+        iterator = index.iterator(order="weighted", weight_rating=0, weight_recent=10)
+        assert iterator.length == len(dates)
+        names.extend(file.name for file in iterator)
+    assert len(names) == 40 * len(dates)
+    # Weight of the recent file is about 11 compared to 1 of the others.
+    assert names.count("f0000.jpg") / len(names) == pytest.approx(11 / 20, abs=0.1)
+    # Drawn files are kept for previous().
+    assert iterator.previous(5).name == names[-6]
+
+
+def test_shuffle_restarts_after_deleted_files(library):
+    index, rep = library(20)
+    for i in range(0, 20, 2):
+        os.remove(os.path.join(rep.root, f"f{i:04d}.jpg"))
+    index.build(rep)
+    expected = [f"f{i:04d}.jpg" for i in range(1, 20, 2)]
+    for _ in range(4):
+        iterator = index.iterator(order="shuffle")
+        assert iterator.length == 10
+        assert sorted(file.name for file in iterator) == expected
+
+
+def test_shuffle_restarts_with_filter(library):
+    index, rep = library(30)
+    criteria = {'order': "shuffle", 'date_from': datetime(2020, 1, 1, 15)}
+    expected = [f"f{i:04d}.jpg" for i in range(15, 30)]
+    for _ in range(3):
+        assert sorted(file.name for file in index.iterator(**criteria)) == expected
+    # Resumed iterations continue the permutation and start a new one once
+    # nothing is left to draw.
+    iterator = index.iterator(**criteria)
+    first = [next(iterator).name for _ in range(5)]
+    rest = [file.name for file in index.iterator(**criteria)]
+    assert sorted(first + rest) == expected
+    assert sorted(file.name for file in index.iterator(**criteria)) == expected
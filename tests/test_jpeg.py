@@ -0,0 +1,108 @@
+"""Tests of the JPEG header parser."""
+
+import struct
+
+import exifread
+import pytest
+
+from datetime import datetime
+from iptcinfo3 import IPTCInfo
+from PIL import Image
+
+from conftest import write_jpeg
+from repository import jpeg
+from repository.file import _image_metadata, extract_image_metadata, extract_jpeg_metadata
+
+
+def reader(content):
+    """Return read callable serving reads from bytes."""
+    return lambda offset, size: content[offset:offset + size]
+
+
+def segment(marker, payload):
+    """Return JPEG segment with marker and payload."""
+    return b"\xff" + bytes([marker]) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def iptc_segment(keywords, charset=b"\x1b%G"):
+    """Return APP13 segment with IPTC keywords."""
+    datasets = b"\x1c\x01\x5a" + struct.pack(">H", len(charset)) + charset if charset is not None else b""
+    for keyword in keywords:
+        datasets = datasets + b"\x1c\x02\x19" + struct.pack(">H", len(keyword)) + keyword
+    # Preceding resource with odd name length, i.e. without padding.
+    resources = b"8BIM\x04\x25\x01a" + struct.pack(">I", 3) + b"xyz\x00"
+    resources = resources + b"8BIM\x04\x04\x00\x00" + struct.pack(">I", len(datasets)) + datasets
+    return segment(jpeg.APP13_MARKER, jpeg.PHOTOSHOP_ID + resources)
+
+
+def insert(content, *segments):
+    """Insert segments following the start of image marker."""
+    return content[:2] + b"".join(segments) + content[2:]
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "a.jpg"
+    write_jpeg(str(path), width=40, height=30, date=datetime(2021, 5, 6, 7, 8, 9), description="Lake", orientation=6, coordinates=(47.5, -8.25))
+    return path
+
+
+def test_read_header(image):
+    header = jpeg.read_header(reader(image.read_bytes()))
+    assert (header.width, header.height, header.keywords) == (40, 30, None)
+    assert header.exif.startswith((b"II*\x00", b"MM\x00*"))
+
+
+def test_metadata(image):
+    data = extract_jpeg_metadata(reader(image.read_bytes()))
+    assert (data['width'], data['height'], data['rotation']) == (40, 30, 270)
+    assert data['orientation'] == 1
+    assert data['creation_date'] == datetime(2021, 5, 6, 7, 8, 9)
+    assert data['description'] == "Lake"
+    assert data['coordinates'][0] == pytest.approx(47.5)
+    assert data['coordinates'][1] == pytest.approx(-8.25)
+
+
+def test_metadata_matches_libraries(image):
+    image.write_bytes(insert(image.read_bytes(), iptc_segment([b"beach", b"sunset"])))
+    data = extract_image_metadata(str(image))
+    with Image.open(image) as img:
+        width, height = img.size
+    with open(image, "rb") as file:
+        tags = exifread.process_file(file)
+    info = IPTCInfo(str(image), force=True, inp_charset="utf8")
+    expected = _image_metadata(width, height, tags, info["keywords"])
+    data.pop('last_updated')
+    expected.pop('last_updated')
+    assert data == expected
+
+
+@pytest.mark.parametrize("keywords, charset, expected", [
+    ([b"beach", "s\xfcd".encode("utf-8")], b"\x1b%G", ["beach", "s\xfcd"]),
+    (["s\xfcd".encode("latin-1")], b"\x1b.A", ["s\xfcd"]),
+    (["s\xfcd".encode("utf-8")], None, ["s\xfcd"]),
+    ([], b"\x1b%G", []),
+])
+def test_iptc_keywords(image, keywords, charset, expected):
+    content = insert(image.read_bytes(), iptc_segment(keywords, charset))
+    assert jpeg.read_header(reader(content)).keywords == expected
+
+
+def test_progressive_and_fill_bytes(tmp_path):
+    path = tmp_path / "p.jpg"
+    Image.new("RGB", (33, 17)).save(str(path), progressive=True)
+    content = path.read_bytes()
+    header = jpeg.read_header(reader(insert(content, b"\xff\xff\xff", segment(0xE2, b"ICC"))))
+    assert (header.width, header.height) == (33, 17)
+
+
+def test_invalid_files(image, tmp_path):
+    content = image.read_bytes()
+    assert jpeg.read_header(reader(b"")) is None
+    assert jpeg.read_header(reader(b"\x89PNG\r\n\x1a\n" + content[2:])) is None
+    # Header truncated before the start of frame segment.
+    assert jpeg.read_header(reader(content[:content.index(b"\xff\xc0")])) is None
+    path = tmp_path / "b.png"
+    Image.new("RGB", (5, 7)).save(str(path))
+    assert extract_jpeg_metadata(reader(path.read_bytes())) is None
+    assert extract_image_metadata(str(path))['width'] == 5
@@ -0,0 +1,98 @@
+"""Tests of schema migrations of the index database."""
+
+import sqlite3
+
+from repository import Index
+from repository.index import MIGRATIONS
+
+
+# Schema of index databases created prior to schema versioning
+BASELINE_SCHEMA = """
+CREATE TABLE files (
+    id INTEGER NOT NULL PRIMARY KEY,
+    rep_uuid VARCHAR(36) NOT NULL,
+    file_uuid VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    type INTEGER,
+    width INTEGER,
+    height INTEGER,
+    rotation INTEGER,
+    orientation INTEGER,
+    creation_date DATETIME,
+    description VARCHAR(255),
+    rating INTEGER,
+    latitude FLOAT,
+    longitude FLOAT,
+    altitude FLOAT,
+    random_number FLOAT,
+    last_modified DATETIME,
+    last_updated DATETIME,
+    verified BOOLEAN
+);
+CREATE INDEX ix_files_name ON files (name);
+CREATE INDEX ix_files_creation_date ON files (creation_date);
+CREATE INDEX ix_files_random_number ON files (random_number);
+CREATE TABLE tags (
+    id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE
+);
+CREATE TABLE tag_file (
+    tag_id INTEGER NOT NULL REFERENCES tags (id) ON DELETE CASCADE,
+    file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag_id, file_id)
+);
+"""
+
+
+def create_baseline(path):
+    """Create index database with baseline schema and some entries."""
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    row = "INSERT INTO files (id, rep_uuid, file_uuid, name, type, width, height, rotation, orientation, creation_date, description, rating, latitude, longitude, altitude, random_number, last_modified, last_updated, verified) VALUES (?, 'rep', ?, ?, 1, 40, 30, 0, 0, ?, ?, 0, ?, ?, NULL, 0.5, '2021-01-01 00:00:00.000000', '2021-01-01 00:00:00.000000', 1)"
+    conn.execute(row, (1, "a.jpg", "a.jpg", "2020-06-15 10:00:00.000000", "Lake shore", 47.5, 8.5))
+    # Duplicate entry left behind by earlier versions.
+    conn.execute(row, (2, "a.jpg", "a.jpg", "2020-06-15 10:00:00.000000", "Lake shore", 47.5, 8.5))
+    conn.execute(row, (3, "b.jpg", "b.jpg", "2019-12-24 18:00:00.000000", None, None, None))
+    conn.execute("INSERT INTO tags (id, name) VALUES (1, 'Holiday')")
+    conn.execute("INSERT INTO tag_file (tag_id, file_id) VALUES (1, 3)")
+    conn.commit()
+    conn.close()
+
+
+def test_migrate_baseline(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    create_baseline(path)
+    index = Index(path, workers=1)
+    index.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+    assert {'size', 'mtime_ns', 'inode', 'deleted', 'month_day', 'week'} <= columns
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(files)")}
+    assert {'ix_files_rep_uuid_file_uuid', 'ix_files_rep_uuid_deleted', 'ix_files_month_day_creation_date', 'ix_files_width_height'} <= indexes
+    # Duplicates are removed and calendar keys derived from creation dates.
+    assert conn.execute("SELECT id, month_day, week FROM files ORDER BY id").fetchall() == [(2, 615, 25), (3, 1224, 52)]
+    # Side tables are populated from existing entries.
+    assert conn.execute("SELECT id FROM files_rtree").fetchall() == [(2,)]
+    assert conn.execute("SELECT rowid FROM files_fts WHERE files_fts MATCH 'lake'").fetchall() == [(2,)]
+    assert conn.execute("SELECT rowid FROM files_fts WHERE files_fts MATCH 'holiday'").fetchall() == [(3,)]
+    conn.close()
+
+
+def test_migrated_database_is_usable(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    create_baseline(path)
+    index = Index(path, workers=1)
+    try:
+        assert index.count() == 2
+        assert index.stats(search="holiday")['count'] == 1
+        assert index.stats(near=(47.5, 8.5, 1.0))['count'] == 1
+    finally:
+        index.close()
+    # Opening the database again does not apply migrations twice.
+    index = Index(path, workers=1)
+    try:
+        assert index.count() == 2
+    finally:
+        index.close()
@@ -0,0 +1,125 @@
+"""Tests of the MP4 and QuickTime header parser."""
+
+import struct
+
+import pytest
+
+from datetime import datetime
+
+from repository import RepositoryFile, mp4
+from repository.file import extract_mp4_metadata, extract_video_metadata
+
+
+# Transformation matrices (a, b, c, d) of the rotate tags reported by ffprobe
+MATRIX = {0: (1, 0, 0, 1), 90: (0, 1, -1, 0), 180: (-1, 0, 0, -1), 270: (0, -1, 1, 0)}
+
+
+def box(type, *payload):
+    """Return box with type and payload."""
+    payload = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(payload), type) + payload
+
+
+def seconds(date):
+    """Return seconds since the epoch of MP4 files."""
+    return int((date - mp4.EPOCH).total_seconds()) if date is not None else 0
+
+
+def mvhd(created):
+    """Return movie header box."""
+    return box(b"mvhd", struct.pack(">IIIII", 0, seconds(created), 0, 1000, 0), bytes(80))
+
+
+def tkhd(width, height, rotate=0, created=None, version=0):
+    """Return track header box."""
+    a, b, c, d = (value << 16 & 0xFFFFFFFF for value in MATRIX[rotate])
+    if version == 1:
+        times = struct.pack(">BxxxQQIIQ", 1, seconds(created), 0, 1, 0, 0)
+    else:
+        times = struct.pack(">IIIIII", 0, seconds(created), 0, 1, 0, 0)
+    matrix = struct.pack(">9I", a, b, 0, c, d, 0, 0, 0, 0x40000000)
+    return box(b"tkhd", times, bytes(16), matrix, struct.pack(">II", width << 16, height << 16))
+
+
+def trak(handler, *boxes):
+    """Return track box with handler type."""
+    hdlr = box(b"hdlr", bytes(8), handler, bytes(12), b"\x00")
+    return box(b"trak", *boxes, box(b"mdia", box(b"mdhd", bytes(24)), hdlr))
+
+
+def movie(*tracks, created=datetime(2020, 2, 3, 4, 5, 6)):
+    """Return movie box with tracks."""
+    return box(b"moov", mvhd(created), *tracks)
+
+
+def reader(content):
+    """Return read callable serving reads from bytes."""
+    return lambda offset, size: content[offset:offset + size]
+
+
+# File type box of MP4 files
+FTYP = box(b"ftyp", b"isom", bytes(4), b"isomiso2mp41")
+
+
+def test_movie_before_media_data():
+    created = datetime(2021, 5, 6, 7, 8, 9)
+    content = FTYP + movie(trak(b"vide", tkhd(1920, 1080, created=created))) + box(b"mdat", bytes(100))
+    header = mp4.read_header(reader(content))
+    assert header == mp4.MovieHeader(1920, 1080, (1.0, 0.0, 0.0, 1.0), created)
+    data = extract_mp4_metadata(reader(content))
+    assert (data['width'], data['height'], data['rotation'], data['orientation']) == (1920, 1080, 0, RepositoryFile.ORIENTATION_LANDSCAPE)
+    assert data['creation_date'] == created
+
+
+def test_movie_after_large_media_data():
+    # Media data with 64 bit size, which are never read.
+    size = 10 * 2**30
+    mdat = struct.pack(">I4sQ", 1, b"mdat", size)
+    moov = movie(trak(b"soun", tkhd(0, 0)), trak(b"vide", tkhd(640, 480, version=1)))
+    start = len(FTYP) + size
+    reads = list()
+
+    def read(offset, size):
+        reads.append(offset)
+        if offset >= start:
+            return moov[offset - start:offset - start + size]
+        return (FTYP + mdat)[offset:offset + size]
+
+    header = mp4.read_header(read)
+    assert (header.width, header.height) == (640, 480)
+    # Creation time of the movie is used if not set for the track.
+    assert header.creation_time == datetime(2020, 2, 3, 4, 5, 6)
+    assert not any(len(FTYP) + 16 <= offset < start for offset in reads)
+
+
+@pytest.mark.parametrize("rotate, rotation, orientation", [
+    (0, 0, RepositoryFile.ORIENTATION_LANDSCAPE),
+    (90, 270, RepositoryFile.ORIENTATION_PORTRAIT),
+    (180, 180, RepositoryFile.ORIENTATION_LANDSCAPE),
+    (270, 90, RepositoryFile.ORIENTATION_PORTRAIT),
+])
+def test_rotation(rotate, rotation, orientation):
+    content = FTYP + movie(trak(b"vide", tkhd(1920, 1080, rotate=rotate, version=rotate // 90 % 2)))
+    data = extract_mp4_metadata(reader(content))
+    assert (data['rotation'], data['orientation']) == (rotation, orientation)
+
+
+def test_invalid_files():
+    assert mp4.read_header(reader(b"")) is None
+    assert mp4.read_header(reader(b"\xff\xd8\xff\xe0" + bytes(100))) is None
+    # Movie without video track.
+    assert mp4.read_header(reader(FTYP + movie(trak(b"soun", tkhd(0, 0))))) is None
+    # Movie box truncated before the end of the handler type.
+    content = FTYP + movie(trak(b"vide", tkhd(1920, 1080)))
+    for end in range(len(FTYP), content.index(b"vide") + 4):
+        assert mp4.read_header(reader(content[:end])) is None
+    # Box with a size smaller than its header.
+    assert mp4.read_header(reader(FTYP + struct.pack(">I4s", 4, b"moov"))) is None
+
+
+def test_local_file(tmp_path):
+    path = tmp_path / "a.mp4"
+    path.write_bytes(FTYP + box(b"free") + movie(trak(b"vide", tkhd(720, 1280))) + box(b"mdat", bytes(1000)))
+    data = extract_video_metadata(str(path))
+    assert (data['width'], data['height'], data['orientation']) == (720, 1280, RepositoryFile.ORIENTATION_PORTRAIT)
+    assert data['creation_date'] == datetime(2020, 2, 3, 4, 5, 6)
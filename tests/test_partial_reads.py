@@ -0,0 +1,65 @@
+"""Tests of metadata extraction from partial reads of the file content."""
+
+from datetime import datetime
+
+from conftest import write_jpeg
+from repository import RepositoryFile
+from repository.file import RangeReader, extract_image_metadata, extract_metadata_from_reader
+from repository.local import Repository
+from repository.local.file import RepositoryFile as LocalFile
+
+
+class PartialFile(LocalFile):
+    """Local file read via partial reads as by remote repositories."""
+
+    PARTIAL_READS = True
+
+    __slots__ = ('reads',)
+
+    def _read_range(self, offset, size):
+        self.reads = getattr(self, 'reads', 0) + 1
+        with open(self.source, "rb") as file:
+            file.seek(offset)
+            return file.read(size)
+
+
+def test_range_reader_serves_reads_from_windows():
+    content = bytes(range(256)) * 1024
+    fetches = list()
+
+    def fetch(offset, size):
+        fetches.append((offset, size))
+        return content[offset:offset + size]
+
+    reader = RangeReader(fetch)
+    for offset in range(0, 200000, 1000):
+        assert reader(offset, 100) == content[offset:offset + 100]
+    # Window at the start grows by doubling, i.e. few fetches are needed.
+    assert len(fetches) <= 4
+    assert reader(len(content) - 10, 100) == content[-10:]
+    assert reader(len(content), 100) == b""
+
+
+def test_partial_reads_match_full_extraction(tmp_path):
+    write_jpeg(str(tmp_path / "a.jpg"), width=40, height=30, date=datetime(2021, 5, 6, 7, 8, 9), description="Lake", orientation=6)
+    rep = Repository("partial", {'root': str(tmp_path)})
+    file = PartialFile("a.jpg", rep, extract_metadata=False)
+    data = file.extract_partial_metadata()
+    assert data is not None and file.reads > 0
+    expected = extract_image_metadata(str(tmp_path / "a.jpg"))
+    expected.pop('last_updated')
+    assert {key: data.get(key) for key in expected} == expected
+
+
+def test_partial_reads_require_capability(tmp_path):
+    write_jpeg(str(tmp_path / "a.jpg"))
+    rep = Repository("local", {'root': str(tmp_path)})
+    file = LocalFile("a.jpg", rep, extract_metadata=False)
+    assert not RepositoryFile.PARTIAL_READS
+    assert file.extract_partial_metadata() is None
+
+
+def test_unsupported_format_is_not_parsed():
+    content = b"GIF89a" + bytes(100)
+    read = RangeReader(lambda offset, size: content[offset:offset + size])
+    assert extract_metadata_from_reader(read, RepositoryFile.TYPE_UNKNOWN) is None
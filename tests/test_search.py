@@ -0,0 +1,34 @@
+"""Tests of the full text search."""
+
+import pytest
+
+from repository import ConfigError
+from repository.index import fts_query
+
+
+def test_fts_query():
+    assert fts_query('beach "sunset') == '"beach"* """sunset"*'
+    assert fts_query("  \t ") == ""
+    assert fts_query("!!! - ?") == ""
+    assert fts_query("beach !!!") == '"beach"*'
+
+
+def test_search_by_name_prefix(library):
+    index, rep = library(12)
+    assert [file.name for file in index.search("f0011")] == ["f0011.jpg"]
+    assert sorted(file.name for file in index.search("f001 jpg ...")) == ["f0010.jpg", "f0011.jpg"]
+
+
+@pytest.mark.parametrize("text", ["", "   ", "!!!", "- ?"])
+def test_search_without_words(library, text):
+    index, rep = library(3)
+    assert index.search(text) == []
+    with pytest.raises(ConfigError):
+        index.iterator(search=text)
+
+
+def test_search_criterion(library):
+    index, rep = library(12)
+    iterator = index.iterator(search="f001", order="name")
+    assert [file.name for file in iterator] == ["f0010.jpg", "f0011.jpg"]
+    assert index.stats(search="f001")['count'] == 2
@@ -0,0 +1,163 @@
+"""Tests of partial reads of WebDAV files via HTTP range requests."""
+
+import importlib.util
+import re
+import sys
+import types
+
+import pytest
+
+from datetime import datetime
+
+from conftest import write_jpeg
+from repository import IoError
+
+
+class ResponseErrorCode(Exception):
+    """Stand-in for webdav3.exceptions.ResponseErrorCode."""
+
+    def __init__(self, url, code, message):
+        super().__init__(message)
+        self.url, self.code, self.message = url, code, message
+
+
+class Urn:
+    """Stand-in for webdav3.urn.Urn."""
+
+    def __init__(self, path):
+        self._path = path
+
+    def quote(self):
+        return self._path
+
+
+@pytest.fixture
+def webdav(monkeypatch):
+    """Return module repository.webdav.file.
+
+    Minimal stand-ins for the modules of the webdav3 package are used if the
+    package is not installed.
+    """
+    if importlib.util.find_spec("webdav3") is None:
+        package = types.ModuleType("webdav3")
+        client = types.ModuleType("webdav3.client")
+        client.Client = object
+        exceptions = types.ModuleType("webdav3.exceptions")
+        exceptions.ResponseErrorCode = ResponseErrorCode
+        urn = types.ModuleType("webdav3.urn")
+        urn.Urn = Urn
+        for name, module in (("webdav3", package), ("webdav3.client", client), ("webdav3.exceptions", exceptions), ("webdav3.urn", urn)):
+            monkeypatch.setitem(sys.modules, name, module)
+        imported = set(sys.modules)
+        from repository.webdav import file
+        yield file
+        # Drop modules imported with stand-ins.
+        for name in set(sys.modules) - imported:
+            if name.startswith("repository.webdav"):
+                del sys.modules[name]
+    else:
+        from repository.webdav import file
+        yield file
+
+
+class FakeResponse:
+    """Response to a download request."""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    """WebDAV client serving a single file.
+
+    Serves range requests unless ranges are ignored, i.e. the complete file
+    is returned with status 200 instead.
+    """
+
+    def __init__(self, content, error_code, ranges=True):
+        self._content = content
+        self._error_code = error_code
+        self.ranges = ranges
+        self.requests = list()
+        self.responses = list()
+        self.downloads = 0
+
+    def execute_request(self, action, path, headers_ext=None):
+        start, end = map(int, re.fullmatch(r"Range: bytes=(\d+)-(\d+)", headers_ext[0]).groups())
+        self.requests.append((start, end))
+        if not self.ranges:
+            response = FakeResponse(200, self._content)
+        elif start >= len(self._content):
+            raise self._error_code(path, 416, "Requested range not satisfiable")
+        else:
+            response = FakeResponse(206, self._content[start:end + 1])
+        self.responses.append(response)
+        return response
+
+    def download_from(self, buffer, path):
+        self.downloads = self.downloads + 1
+        buffer.write(self._content)
+        buffer.flush()
+
+
+@pytest.fixture
+def server(webdav, tmp_path):
+    """Return repository stand-in with a fake client serving a JPEG image."""
+    path = tmp_path / "source.jpg"
+    write_jpeg(str(path), width=40, height=30, date=datetime(2021, 5, 6, 7, 8, 9))
+
+    class FakeRepository:
+        uuid = "dav"
+        cache_dir = str(tmp_path)
+        range_requests = True
+        client = FakeClient(path.read_bytes(), webdav.ResponseErrorCode)
+
+    return FakeRepository()
+
+
+def test_partial_content(webdav, server):
+    file = webdav.RepositoryFile("a.jpg", server, extract_metadata=False)
+    assert file._read_range(2, 10) == server.client._content[2:12]
+    assert server.client.requests == [(2, 11)]
+    data = file.extract_partial_metadata()
+    assert (data['width'], data['height']) == (40, 30)
+    assert data['creation_date'] == datetime(2021, 5, 6, 7, 8, 9)
+    # Metadata are extracted without download.
+    assert server.client.downloads == 0
+    assert all(response.closed for response in server.client.responses)
+
+
+def test_range_beyond_end_of_file(webdav, server):
+    file = webdav.RepositoryFile("a.jpg", server, extract_metadata=False)
+    size = len(server.client._content)
+    assert file._read_range(size, 100) == b""
+    assert file._read_range(size - 5, 100) == server.client._content[-5:]
+
+
+def test_request_error(webdav, server, monkeypatch):
+    def fail(action, path, headers_ext=None):
+        raise webdav.ResponseErrorCode(path, 500, "Internal server error")
+
+    monkeypatch.setattr(server.client, "execute_request", fail)
+    file = webdav.RepositoryFile("a.jpg", server, extract_metadata=False)
+    with pytest.raises(IoError):
+        file._read_range(0, 100)
+
+
+def test_range_ignored(webdav, server):
+    server.client.ranges = False
+    files = [webdav.RepositoryFile(f"{i}.jpg", server, extract_metadata=False) for i in range(3)]
+    assert files[0]._read_range(2, 10) == server.client._content[2:12]
+    assert server.client.responses[0].closed
+    for file in files:
+        assert file.extract_partial_metadata()['width'] == 40
+    # Only the first file issues a range request. Each file is downloaded
+    # once and read from the local cache file.
+    assert not server.range_requests
+    assert len(server.client.requests) == 1
+    assert server.client.downloads == len(files)
@@ -0,0 +1,79 @@
+"""Tests of the metadata extraction worker pool."""
+
+import os
+import stat
+import time
+
+import pytest
+
+from conftest import write_jpeg
+from repository import IoError, RepositoryFile
+from repository.file import WorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(2, timeout=10)
+    yield pool
+    pool.close()
+
+
+def test_extracts_metadata(pool, tmp_path):
+    paths = [str(tmp_path / f"f{i}.jpg") for i in range(4)]
+    for i, path in enumerate(paths):
+        write_jpeg(path, width=10 + i, height=5, description=f"Image {i}")
+    futures = [pool.submit(path, RepositoryFile.TYPE_IMAGE) for path in paths]
+    results = [future.result() for future in futures]
+    assert [data['width'] for data in results] == [10, 11, 12, 13]
+    assert [data['description'] for data in results] == [f"Image {i}" for i in range(4)]
+
+
+def test_error_raises_io_error(pool, tmp_path):
+    future = pool.submit(str(tmp_path / "missing.jpg"), RepositoryFile.TYPE_IMAGE)
+    with pytest.raises(IoError, match="FileNotFoundError"):
+        future.result()
+
+
+def test_timeout_replaces_worker(pool, tmp_path):
+    # Opening a FIFO blocks until a writer opens it, i.e. forever.
+    fifo = str(tmp_path / "blocking.jpg")
+    os.mkfifo(fifo)
+    start = time.time()
+    with pytest.raises(IoError, match="Timeout"):
+        pool.submit(fifo, RepositoryFile.TYPE_IMAGE, timeout=1).result()
+    assert time.time() - start < 5
+    # The replaced worker serves further requests.
+    path = str(tmp_path / "f.jpg")
+    write_jpeg(path, width=7, height=3)
+    assert pool.submit(path, RepositoryFile.TYPE_IMAGE).result()['width'] == 7
+
+
+def test_timeout_kills_ffprobe(monkeypatch, tmp_path):
+    # Fake ffprobe, which records its process id and hangs.
+    pid_file = tmp_path / "ffprobe.pid"
+    ffprobe = tmp_path / "ffprobe"
+    ffprobe.write_text(f"#!/bin/sh\necho $$ > {pid_file}\nexec sleep 60\n")
+    ffprobe.chmod(ffprobe.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    # Spawned workers inherit the modified environment.
+    monkeypatch.setattr(WorkerPool, "START_METHOD", "spawn")
+    # Video, which is not an MP4 file and thus passed on to ffprobe.
+    video = tmp_path / "video.avi"
+    video.write_bytes(b"RIFF\x00\x00\x00\x00AVI LIST")
+    pool = WorkerPool(1)
+    try:
+        with pytest.raises(IoError, match="Timeout"):
+            pool.submit(str(video), RepositoryFile.TYPE_VIDEO, timeout=3).result()
+        pid = int(pid_file.read_text())
+        # Killed processes may remain as zombies until reaped by init.
+        for _ in range(50):
+            try:
+                with open(f"/proc/{pid}/stat") as file:
+                    if file.read().split()[2] == "Z": break
+            except FileNotFoundError:
+                break
+            time.sleep(0.1)
+        else:
+            pytest.fail("ffprobe has not been killed.")
+    finally:
+        pool.close()